@@ -0,0 +1,154 @@
+"""
+Batched upserts into SQLite, shared by the cost and performance pipelines.
+
+Usage (benchmark):
+    python bulk_load.py --bench 10000 1000000 10000000
+"""
+import argparse
+import itertools
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+BATCH_SIZE = 50_000
+
+
+def column_arrays(df, columns):
+    """Columns of `df` as Python lists, in `columns` order, with missing values as None."""
+    arrays = []
+    for col in columns:
+        series = df[col]
+        values = series.astype(object).where(series.notna(), None)
+        arrays.append(values.tolist())
+    return arrays
+
+
+def _upsert_sql(table, columns, conflict_key, source=None):
+    cols = ", ".join(columns)
+    updates = ",\n            ".join(f"{c}=excluded.{c}" for c in columns if c != conflict_key)
+    if source is None:
+        values = f"VALUES ({', '.join('?' for _ in columns)})"
+    else:
+        # "WHERE true" keeps SQLite from reading ON CONFLICT as a join constraint
+        values = f"SELECT {cols} FROM {source} WHERE true ORDER BY rowid"
+    return f"""
+        INSERT INTO {table} ({cols})
+        {values}
+        ON CONFLICT({conflict_key}) DO UPDATE SET
+            {updates}
+    """
+
+
+def bulk_upsert(conn, table, columns, rows, conflict_key, batch_size=BATCH_SIZE, method="executemany"):
+    """
+    Insert or update many rows with the same semantics as a per-row
+    `INSERT ... ON CONFLICT(conflict_key) DO UPDATE`.
+
+    Args:
+        conn (sqlite3.Connection): Open connection; the caller commits.
+        table (str): Target table.
+        columns (list[str]): Target columns, in the order of each row.
+        rows (iterable[tuple]): Row tuples, e.g. `zip(*column_arrays(df, cols))`.
+        conflict_key (str): Unique column used for the upsert.
+        batch_size (int): Rows per `executemany` call.
+        method (str): "executemany" upserts each batch directly; "staging"
+            loads batches into a temporary table, then runs one
+            INSERT ... SELECT ... ON CONFLICT DO UPDATE.
+
+    Returns:
+        int: Number of rows processed.
+    """
+    rows = iter(rows)
+    count = 0
+    if method == "executemany":
+        sql = _upsert_sql(table, columns, conflict_key)
+        while batch := list(itertools.islice(rows, batch_size)):
+            conn.executemany(sql, batch)
+            count += len(batch)
+        return count
+
+    if method != "staging":
+        raise ValueError(f"Unknown bulk upsert method: {method}")
+    stage = f"_stage_{table}"
+    conn.execute(f"DROP TABLE IF EXISTS temp.{stage}")
+    conn.execute(f"CREATE TEMP TABLE {stage} AS SELECT {', '.join(columns)} FROM {table} WHERE 0")
+    insert = f"INSERT INTO {stage} VALUES ({', '.join('?' for _ in columns)})"
+    while batch := list(itertools.islice(rows, batch_size)):
+        conn.executemany(insert, batch)
+        count += len(batch)
+    conn.execute(_upsert_sql(table, columns, conflict_key, source=stage))
+    conn.execute(f"DROP TABLE temp.{stage}")
+    return count
+
+
+def upsert_dataframe(conn, df, table, columns, conflict_key, **kwargs):
+    """`bulk_upsert` over the columns of a DataFrame."""
+    return bulk_upsert(conn, table, columns, zip(*column_arrays(df, columns)), conflict_key, **kwargs)
+
+
+# --- Benchmark ---
+BENCH_COLUMNS = ["portfolio_id", "advisor_type", "platform_name", "expense_ratio",
+                 "transaction_costs", "document_date", "extraction_notes"]
+
+
+def _bench_frame(start, n, rng):
+    return pd.DataFrame({
+        "portfolio_id": [f"RA_{i}" for i in range(start, start + n)],
+        "advisor_type": rng.choice(["Robo-advisor", "Hybrid", "Traditional"], n),
+        "platform_name": rng.choice(["Alpha LLC", "Beta Inc.", "Gamma LP"], n),
+        "expense_ratio": rng.uniform(0, 2.5, n),
+        "transaction_costs": np.where(rng.random(n) < 0.2, np.nan, rng.uniform(0, 0.5, n)),
+        "document_date": "2025-01-01 00:00:00",
+        "extraction_notes": "- synthetic row",
+    })
+
+
+def _bench_rows(n, chunk=1_000_000, seed=0):
+    rng = np.random.default_rng(seed)
+    for start in range(0, n, chunk):
+        yield from zip(*column_arrays(_bench_frame(start, min(chunk, n - start), rng), BENCH_COLUMNS))
+
+
+def _bench_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE bench (
+            id INTEGER PRIMARY KEY, portfolio_id TEXT UNIQUE, advisor_type TEXT, platform_name TEXT,
+            expense_ratio REAL, transaction_costs REAL, document_date DATETIME, extraction_notes TEXT
+        )
+    """)
+    return conn
+
+
+def run_benchmark(sizes, iterrows_limit=100_000):
+    """Print rows/sec for the per-row baseline and both bulk methods."""
+    print(f"{'rows':>12} {'method':>12} {'seconds':>10} {'rows/sec':>12}")
+    for n in sizes:
+        methods = ["executemany", "staging"] + (["iterrows"] if n <= iterrows_limit else [])
+        for method in methods:
+            with tempfile.TemporaryDirectory() as tmp:
+                conn = _bench_db(os.path.join(tmp, "bench.db"))
+                start = time.perf_counter()
+                if method == "iterrows":
+                    sql = _upsert_sql("bench", BENCH_COLUMNS, "portfolio_id")
+                    df = _bench_frame(0, n, np.random.default_rng(0))
+                    for _, row in df.iterrows():
+                        conn.execute(sql, tuple(row[c] for c in BENCH_COLUMNS))
+                else:
+                    bulk_upsert(conn, "bench", BENCH_COLUMNS, _bench_rows(n), "portfolio_id", method=method)
+                conn.commit()
+                elapsed = time.perf_counter() - start
+                conn.close()
+            print(f"{n:>12,} {method:>12} {elapsed:>10.2f} {n / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bulk upserts into SQLite.")
+    parser.add_argument("--bench", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000],
+                        help="Row counts to benchmark")
+    args = parser.parse_args()
+    run_benchmark(args.bench)
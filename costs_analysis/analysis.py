@@ -1,62 +1,82 @@
+import argparse
 import os
-import sqlite3
+import sys
 from datetime import datetime
 
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import scipy.stats as stats
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend for compatibility
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage
+from figures import GREYS, render_figures
+from inference import resampling_tests
+from fee_drag import bootstrap_model, fee_drag, load_platforms, print_report, simulate_gross
+from streaming_export import export_dataframe, export_table
+from streaming_stats import streaming_summary, streaming_tests
 
 # --- Config ---
-DB_PATH = "../data/portfolio_data.db"
+DB_PATH = storage.DB_PATH
 TABLE = "portfolios_reprocessed"
 PLOT_DIR = "results/plots"
 EXPORT_FILE = f"results/cost_analysis_result_{datetime.now().timestamp()}.xlsx"
 os.makedirs(PLOT_DIR, exist_ok=True)
 
-# --- Load filtered data (exclude manually flagged rows) ---
-conn = sqlite3.connect(DB_PATH)
-df = pd.read_sql_query(f"SELECT * FROM {TABLE} WHERE excluded IS NULL OR excluded = 0", conn)
-conn.close()
-
-# --- Preprocessing ---
-# Create new group: automated (Robo + Hybrid) vs Traditional
-AUTOMATED = ["Robo-advisor", "Hybrid"]
-df["advisor_group"] = df["advisor_type"].apply(lambda x: "Automated" if x in AUTOMATED else "Traditional")
-
-# Convert AUM to log scale for analysis
-df["Log AUM"] = np.log1p(df["assets_under_management"])
-df.rename(columns={"expense_ratio": "Expense Ratio", "transaction_costs": "Transaction Costs", "tax_efficiency": "Tax Efficiency"}, inplace=True)
-
-# --- Descriptive Statistics ---
-summary = df.groupby("advisor_group")[
-    ["Expense Ratio", "Transaction Costs", "Tax Efficiency", "Log AUM"]
-].agg(["mean", "std", "median", "count"])
+# --- Mode ---
+parser = argparse.ArgumentParser(description="Phase 1 cost analysis by advisor group.")
+parser.add_argument("--streaming", action="store_true",
+                    help="Compute statistics out-of-core in chunks (no plots)")
+parser.add_argument("--raw-data", choices=["none", "xlsx", "parquet"], default="none",
+                    help="Also export the analysed rows, streamed to a separate file")
+parser.add_argument("--workers", type=int, default=None, help="Plotting/resampling processes (default: all cores)")
+parser.add_argument("--resamples", type=int, default=0,
+                    help="Bootstrap and permutation resamples, e.g. 10000 (0 = skip; needs the in-memory mode)")
+parser.add_argument("--seed", type=int, default=0, help="Seed for the resampling tests")
+parser.add_argument("--force-plots", action="store_true", help="Re-render plots even if unchanged")
+parser.add_argument("--fee-paths", type=int, default=0,
+                    help="Monte Carlo paths for the fee drag simulation (0 = skip)")
+parser.add_argument("--fee-years", type=int, default=10, help="Fee drag horizon in years")
+args = parser.parse_args()
+
+VARIABLES = ["Expense Ratio", "Transaction Costs", "Tax Efficiency", "Log AUM"]
+conn = storage.connect(DB_PATH, readonly=True)
+
+if args.streaming:
+    df = None
+    summary = streaming_summary(TABLE, conn=conn)
+else:
+    # --- Load filtered data (exclude manually flagged rows) ---
+    df = storage.select(TABLE, where="excluded IS NULL OR excluded = 0", conn=conn)
+
+    # --- Preprocessing ---
+    # Create new group: automated (Robo + Hybrid) vs Traditional
+    AUTOMATED = ["Robo-advisor", "Hybrid"]
+    df["advisor_group"] = df["advisor_type"].apply(lambda x: "Automated" if x in AUTOMATED else "Traditional")
+
+    # Convert AUM to log scale for analysis
+    df["Log AUM"] = np.log1p(df["assets_under_management"])
+    df.rename(columns={"expense_ratio": "Expense Ratio", "transaction_costs": "Transaction Costs", "tax_efficiency": "Tax Efficiency"}, inplace=True)
+
+    # --- Descriptive Statistics ---
+    summary = df.groupby("advisor_group")[VARIABLES].agg(["mean", "std", "median", "count"])
 
 print("\nDescriptive Statistics by Advisor Group:\n")
 print(summary)
 
 # --- Visualizations ---
-sns.set(style="whitegrid")
-plt.rcParams.update({"font.family": "Times New Roman"})  # Set font to Times New Roman
-colors = ["#444444", "#888888"]  # Greyscale colors for academic look
-
-for var in ["Expense Ratio", "Transaction Costs", "Tax Efficiency", "Log AUM"]:
-    plt.figure(figsize=(8, 5))
-    sns.boxplot(x="advisor_group", y=var, data=df, palette=colors)
-    plt.title(f"{var} by Advisor Group", fontsize=14)
-    plt.ylabel(var, fontsize=12)
-    plt.xlabel("")
-    plt.xticks(fontsize=11)
-    plt.yticks(fontsize=11)
-    plt.tight_layout()
-    filename = os.path.join(PLOT_DIR, f"{var.replace(' ', '_').lower()}_by_advisor_group.png")
-    plt.savefig(filename, dpi=300)
-    print(f"Plot saved: {filename}")
-    plt.close()
+if df is not None:
+    specs = [{
+        "path": os.path.join(PLOT_DIR, f"{var.replace(' ', '_').lower()}_by_advisor_group.png"),
+        "kind": "boxplot",
+        "data": df[["advisor_group", var]],
+        "plot": {"x": "advisor_group", "y": var, "palette": GREYS},
+        "title": f"{var} by Advisor Group",
+        "ylabel": var,
+        "figsize": (8, 5),
+        "xticks": {"fontsize": 11},
+        "yticks": {"fontsize": 11},
+    } for var in VARIABLES]
+    render_figures(specs, workers=args.workers, force=args.force_plots)
 
 # --- Statistical Tests: Mann–Whitney U ---
 def run_mannwhitney(var):
@@ -64,17 +84,38 @@ def run_mannwhitney(var):
     group2 = df[df["advisor_group"] == "Traditional"][var].dropna()
     return stats.mannwhitneyu(group1, group2, alternative='two-sided')
 
-results = {}
-for var in ["Expense Ratio", "Transaction Costs", "Tax Efficiency", "Log AUM"]:
-    stat, pval = run_mannwhitney(var)
-    results[var] = {"U-statistic": stat, "p-value": pval}
+if args.streaming:
+    results_df = streaming_tests(TABLE, conn=conn)
+else:
+    results = {}
+    for var in VARIABLES:
+        stat, pval = run_mannwhitney(var)
+        results[var] = {"U-statistic": stat, "p-value": pval}
 
-results_df = pd.DataFrame(results).T
-results_df.index.name = "Variable"
+    results_df = pd.DataFrame(results).T
+    results_df.index.name = "Variable"
 
 print("\nMann–Whitney U Test Results:\n")
 print(results_df.round(4))
 
+# --- Resampling: bootstrap CIs and permutation p-values ---
+resampling_df = None
+if df is not None and args.resamples > 0:
+    resampling_df = resampling_tests(df, "advisor_group", VARIABLES, n_resamples=args.resamples,
+                                     seed=args.seed, workers=args.workers or os.cpu_count())
+    print(f"\nBootstrap / Permutation Results ({args.resamples:,} resamples):\n")
+    print(resampling_df.round(4).to_string(index=False))
+
+# --- Fee drag: terminal wealth of $500,000 (50/50) under each platform's costs ---
+fee_group_df = fee_platform_df = None
+if args.fee_paths > 0:
+    workers = args.workers or os.cpu_count()
+    growth, report = simulate_gross(bootstrap_model(), args.fee_paths, args.fee_years, seed=args.seed, workers=workers)
+    print_report(report, workers)
+    fee_group_df, fee_platform_df = fee_drag(load_platforms(conn), growth, args.fee_years, seed=args.seed)
+    print(f"\nTerminal Wealth after {args.fee_years} Years by Advisor Group:\n")
+    print(fee_group_df.to_string(index=False))
+
 # --- Interpretation ---
 print("\nInterpretation Summary:")
 for var in results_df.index:
@@ -86,8 +127,19 @@ for var in results_df.index:
 
 # --- Export to Excel ---
 with pd.ExcelWriter(EXPORT_FILE, engine="xlsxwriter") as writer:
-    df.to_excel(writer, sheet_name="Raw Data", index=False)
     summary.to_excel(writer, sheet_name="Summary Stats")
     results_df.to_excel(writer, sheet_name="MannWhitneyU")
+    if resampling_df is not None:
+        resampling_df.to_excel(writer, sheet_name="Resampling", index=False)
+    if fee_group_df is not None:
+        fee_group_df.to_excel(writer, sheet_name="Fee Drag by Group", index=False)
+        fee_platform_df.to_excel(writer, sheet_name="Fee Drag by Platform", index=False)
 
 print(f"\n✅ Analysis exported to {EXPORT_FILE}")
+
+if args.raw_data != "none":
+    raw_file = EXPORT_FILE.replace(".xlsx", f"_raw_data.{args.raw_data}")
+    if df is not None:
+        export_dataframe(df, raw_file, sheet_name="Raw Data")
+    else:
+        export_table(TABLE, raw_file, where="excluded IS NULL OR excluded = 0", conn=conn, sheet_name="Raw Data")
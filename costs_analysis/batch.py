@@ -0,0 +1,195 @@
+"""
+Offline batch mode for ADV extraction.
+
+Phase 1 writes one chat-completions request per PDF to a JSONL file (the
+OpenAI Batch API input format). Phase 2 ingests a results JSONL file and
+parses every response into `portfolios` in a single transaction, tracking
+each document in the job ledger like `main.py` does.
+
+Usage:
+    python batch.py prepare --out batch/requests.jsonl
+    python batch.py submit --requests batch/requests.jsonl
+    python batch.py download --batch-id <id> --out batch/results.jsonl
+    python batch.py ingest --results batch/results.jsonl --manifest batch/requests.jsonl.manifest.json
+    python batch.py fake-results --requests batch/requests.jsonl --out batch/results.jsonl
+"""
+import argparse
+import json
+import os
+
+from job_ledger import JobLedger
+from main import (ADV_FOLDER, ADVExtractor, client, init_db, insert_record, parse_response,
+                  portfolio_id_for)
+from page_store import PageStore, build_store
+from stub_llm_server import STUB_RESPONSE
+
+BATCH_DIR = "batch"
+ENDPOINT = "/v1/chat/completions"
+
+
+def doc_id_for(doc_hash):
+    """Deterministic batch custom_id for a document."""
+    return f"adv_{doc_hash[:16]}"
+
+
+def write_batch_requests(out_path, folder=ADV_FOLDER, token_budget=None):
+    """
+    Phase 1: write one batch request line per PDF in `folder`.
+
+    A `<out_path>.manifest.json` file maps each custom_id to its source file.
+
+    Returns:
+        int: Number of requests written.
+    """
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    store = PageStore()
+    build_store([folder], store=store)
+
+    manifest = {}
+    with open(out_path, "w", encoding="utf-8") as f:
+        for filename in sorted(os.listdir(folder)):
+            if not filename.endswith(".pdf"):
+                continue
+            extractor = ADVExtractor(os.path.join(folder, filename), token_budget=token_budget, store=store)
+            doc_id = doc_id_for(extractor.doc_hash())
+            if doc_id in manifest:
+                continue  # same bytes under another filename
+            manifest[doc_id] = {"filename": filename, "doc_hash": extractor.doc_hash()}
+            f.write(json.dumps({
+                "custom_id": doc_id,
+                "method": "POST",
+                "url": ENDPOINT,
+                "body": extractor.build_request()
+            }) + "\n")
+    store.close()
+
+    with open(out_path + ".manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"📝 Wrote {len(manifest)} batch requests to {out_path}")
+    return len(manifest)
+
+
+def read_results(results_path):
+    """Yield (custom_id, response text or None, error) from a batch results file."""
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                yield record["custom_id"], None, record.get("error") or response.get("status_code")
+                continue
+            content = response["body"]["choices"][0]["message"]["content"]
+            yield record["custom_id"], content, None
+
+
+def ingest_batch_results(results_path, manifest_path=None, conn=None):
+    """
+    Phase 2: parse every response of a results file into `portfolios`.
+
+    The manifest written in phase 1 maps each custom_id back to its document,
+    which is tracked in the job ledger: documents already inserted (by an
+    earlier ingest or by `main.py`) are skipped. All inserts happen in one
+    transaction, which is rolled back on failure. Works on local files only.
+
+    Returns:
+        dict: Counts of ingested, skipped and failed responses.
+    """
+    if manifest_path is None:
+        manifest_path = os.path.join(BATCH_DIR, "requests.jsonl.manifest.json")
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if conn is None:
+        conn, _ = init_db()
+    cursor = conn.cursor()
+    ledger = JobLedger(conn)
+    counts = {"ingested": 0, "skipped": 0, "failed": 0}
+    with conn:
+        for custom_id, content, error in read_results(results_path):
+            entry = manifest.get(custom_id)
+            if entry is None:
+                print(f"❌ {custom_id}: not in {manifest_path}")
+                counts["failed"] += 1
+                continue
+            doc_hash = entry["doc_hash"]
+            portfolio_id = portfolio_id_for(doc_hash)
+            ledger.register(doc_hash, entry["filename"], portfolio_id)
+            if ledger.reached(doc_hash, "inserted"):
+                counts["skipped"] += 1
+                continue
+            if content is None:
+                print(f"❌ {custom_id}: request failed ({error})")
+                ledger.fail(doc_hash, f"batch request failed ({error})")
+                counts["failed"] += 1
+                continue
+            ledger.advance(doc_hash, "llm_done", content)
+            record = parse_response(content, portfolio_id)
+            if record is None:
+                ledger.fail(doc_hash, "response could not be parsed or had no numeric data", clear_response=True)
+                counts["failed"] += 1
+                continue
+            ledger.advance(doc_hash, "parsed")
+            insert_record(record, portfolio_id, cursor)
+            ledger.advance(doc_hash, "inserted")
+            counts["ingested"] += 1
+    print(f"✅ Ingested {counts['ingested']} responses ({counts['skipped']} already inserted, "
+          f"{counts['failed']} failed) from {results_path}")
+    return counts
+
+
+def write_fake_results(requests_path, out_path, content=STUB_RESPONSE):
+    """Generate a results file answering every request with `content`, for offline testing."""
+    with open(requests_path, encoding="utf-8") as src, open(out_path, "w", encoding="utf-8") as dst:
+        for line in src:
+            request = json.loads(line)
+            dst.write(json.dumps({
+                "id": f"batch_req_{request['custom_id']}",
+                "custom_id": request["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+                },
+                "error": None
+            }) + "\n")
+    print(f"🧪 Wrote fake results to {out_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Two-phase batch extraction of ADV filings.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    prep = sub.add_parser("prepare", help="Write the batch requests JSONL")
+    prep.add_argument("--out", default=os.path.join(BATCH_DIR, "requests.jsonl"))
+    prep.add_argument("--token-budget", type=int, default=None)
+    submit = sub.add_parser("submit", help="Upload a requests file and create a batch")
+    submit.add_argument("--requests", default=os.path.join(BATCH_DIR, "requests.jsonl"))
+    download = sub.add_parser("download", help="Download the results of a completed batch")
+    download.add_argument("--batch-id", required=True)
+    download.add_argument("--out", default=os.path.join(BATCH_DIR, "results.jsonl"))
+    ingest = sub.add_parser("ingest", help="Parse a results JSONL into the database")
+    ingest.add_argument("--results", default=os.path.join(BATCH_DIR, "results.jsonl"))
+    ingest.add_argument("--manifest", default=os.path.join(BATCH_DIR, "requests.jsonl.manifest.json"),
+                        help="Manifest written by prepare")
+    fake = sub.add_parser("fake-results", help="Generate a local results file for testing")
+    fake.add_argument("--requests", default=os.path.join(BATCH_DIR, "requests.jsonl"))
+    fake.add_argument("--out", default=os.path.join(BATCH_DIR, "results.jsonl"))
+    args = parser.parse_args()
+
+    if args.command == "prepare":
+        write_batch_requests(args.out, token_budget=args.token_budget)
+    elif args.command == "submit":
+        with open(args.requests, "rb") as f:
+            batch_file = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(input_file_id=batch_file.id, endpoint=ENDPOINT, completion_window="24h")
+        print(f"🚀 Submitted batch {batch.id} ({batch.status})")
+    elif args.command == "download":
+        batch = client.batches.retrieve(args.batch_id)
+        if batch.status != "completed":
+            raise SystemExit(f"Batch {batch.id} is {batch.status}, not completed yet.")
+        with open(args.out, "wb") as f:
+            f.write(client.files.content(batch.output_file_id).read())
+        print(f"📥 Saved results to {args.out}")
+    elif args.command == "ingest":
+        ingest_batch_results(args.results, args.manifest)
+    else:
+        write_fake_results(args.requests, args.out)
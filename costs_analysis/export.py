@@ -1,5 +1,11 @@
+import argparse
+import os
 import sqlite3
-import pandas as pd
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage
+from streaming_export import export_table
 
 class DatabaseExporter:
     def __init__(self, db_path):
@@ -8,7 +14,7 @@ class DatabaseExporter:
     def connect(self):
         """Establish a connection to the SQLite database."""
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            self.conn = storage.connect(self.db_path, readonly=True)
             self.cursor = self.conn.cursor()
         except sqlite3.Error as e:
             print(f"Error connecting to database: {e}")
@@ -17,29 +23,32 @@ class DatabaseExporter:
     def close(self):
         """Close the database connection."""
         if self.conn:
-            self.conn.close()
+            storage.close(self.db_path, readonly=True)
 
-def export_to_excel(db_path, table_name, output_file):
+def export_to_excel(db_path, table_name, output_file, columns=None):
     """
     Export a specific table from the SQLite database to an Excel file.
 
+    Rows are streamed from the database in constant memory; tables larger
+    than Excel's row limit continue on additional sheets.
+
     Args:
         db_path (str): Path to the SQLite database file.
         table_name (str): Name of the table to export.
-        output_file (str): Path to the output Excel file.
+        output_file (str): Path to the output Excel file (or .parquet).
+        columns (list[str] | None): Columns to export (None = all).
+
+    Returns:
+        dict | None: rows, seconds and peak_rss_mb of the export.
     """
     exporter = DatabaseExporter(db_path)
     exporter.connect()
 
     if exporter.conn:
         try:
-            # Read the table into a pandas DataFrame
-            query = f"SELECT * FROM {table_name}"
-            df = pd.read_sql_query(query, exporter.conn)
-
-            # Export the DataFrame to an Excel file
-            df.to_excel(output_file, index=False)
+            report = export_table(table_name, output_file, columns=columns, conn=exporter.conn)
             print(f"Table '{table_name}' exported successfully to '{output_file}'.")
+            return report
         except Exception as e:
             print(f"Error exporting table: {e}")
         finally:
@@ -49,7 +58,11 @@ def export_to_excel(db_path, table_name, output_file):
 
 
 if __name__ == "__main__":
-    db_path = "../data/portfolio_data.db"
-    table_name = "portfolios"
-    output_file = "data/portfolios_export.xlsx"
-    export_to_excel(db_path, table_name, output_file)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Export a table of the portfolio database.")
+    parser.add_argument("--table", default="portfolios")
+    parser.add_argument("--out", default="data/portfolios_export.xlsx",
+                        help="Output file; use a .parquet extension for Parquet")
+    parser.add_argument("--columns", nargs="+", default=None, help="Columns to export (default: all)")
+    args = parser.parse_args()
+
+    export_to_excel(storage.DB_PATH, args.table, args.out, columns=args.columns)
@@ -0,0 +1,208 @@
+"""
+Monte Carlo fee drag: terminal wealth of the $500,000, 50/50 portfolio assumed
+in the extraction prompt, under each platform's fee and cost schedule.
+
+Fees are proportional to wealth, so they do not change the shape of a path.
+With an annual cost rate f charged once a year (expense ratio + turnover x
+transaction costs, the cost model of backtest.py), terminal wealth is gross
+wealth x (1 - f)^T. Only the gross growth factor is simulated. Every
+platform and advisor group is then a scaling of the same paths.
+
+Gross paths are drawn in vectorized blocks from one of two models:
+- bootstrap: months resampled with replacement from the equal-weighted
+  average of the traditional funds in the monthly returns store written by
+  download_returns.py (balanced funds, used as the 50/50 proxy). Months are drawn two at a time
+  from a table of all month-pair log returns, which halves the draws.
+- parametric: the monthly log return of a 50/50 equity/bond mix, monthly
+  rebalanced, is treated as normal with the mix's mean and variance.
+  Twelve months then sum to a single normal draw per year.
+
+Each block has its own child of `seed`, so results do not depend on
+`workers`; the assignment of paths to platforms uses a separate child.
+
+Usage:
+    python fee_drag.py --paths 10000000 --years 10 --model bootstrap --workers 8
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage
+from streaming_stats import AUTOMATED, FILTER_SQL, cost_rates
+
+PERFORMANCE_DIR = os.path.join(storage.ROOT_DIR, "performance_analysis")
+sys.path.append(PERFORMANCE_DIR)
+from timeseries_store import MONTHLY_RETURNS, TimeSeriesStore
+
+# --- Config ---
+TABLE = "portfolios_reprocessed"
+RETURNS_STORE = os.path.join(PERFORMANCE_DIR, MONTHLY_RETURNS)
+INITIAL_WEALTH = 500_000
+HORIZON_YEARS = 10
+N_PATHS = 1_000_000
+BLOCK = 100_000  # paths per vectorized block
+# Annual arithmetic assumptions of the parametric model
+PARAMETRIC = {"equity_return": 0.07, "equity_vol": 0.16, "bond_return": 0.035, "bond_vol": 0.06,
+              "correlation": 0.2, "equity_weight": 0.5}
+ASSIGNMENT_KEY = 2 ** 32  # spawn key of the platform assignment stream, above any block index
+QUANTILES = {"P5": 0.05, "P25": 0.25, "Median": 0.5, "P75": 0.75, "P95": 0.95}
+
+
+def load_platforms(conn=None):
+    """Platforms with their advisor group and annual cost rate (fraction), from the cost table."""
+    conn = conn or storage.connect(readonly=True)
+    df = pd.read_sql_query(
+        f"SELECT platform_name, advisor_type, expense_ratio, transaction_costs, turnover_rate FROM {TABLE} "
+        f"WHERE {FILTER_SQL} AND expense_ratio IS NOT NULL", conn)
+    df["advisor_group"] = np.where(df["advisor_type"].isin(AUTOMATED), "Automated", "Traditional")
+    fee, trading = cost_rates(df)
+    df["annual_cost"] = fee + trading
+    return df
+
+
+def bootstrap_model(path=RETURNS_STORE):
+    """Month-pair log return table of the fund-average monthly return."""
+    monthly = TimeSeriesStore(path).read().mean(axis=1).dropna().to_numpy()
+    logs = np.log1p(monthly)
+    return {"kind": "bootstrap", "pairs": (logs[:, None] + logs[None, :]).ravel().astype(np.float32)}
+
+
+def parametric_model(equity_return, equity_vol, bond_return, bond_vol, correlation, equity_weight=0.5):
+    """Annual log-return mean and volatility of the monthly rebalanced mix (lognormal months)."""
+    w, v = equity_weight, 1 - equity_weight
+    mean = (w * equity_return + v * bond_return) / 12
+    var = (w ** 2 * equity_vol ** 2 + v ** 2 * bond_vol ** 2 + 2 * w * v * correlation * equity_vol * bond_vol) / 12
+    log_var = np.log1p(var / (1 + mean) ** 2)
+    return {"kind": "parametric", "mu": 12 * (np.log1p(mean) - log_var / 2), "sigma": np.sqrt(12 * log_var)}
+
+
+def _simulate_block(task):
+    """Gross growth factors of one block of paths, and the seconds spent."""
+    model, seed, n, years = task
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    if model["kind"] == "bootstrap":
+        pairs = model["pairs"]
+        picks = rng.integers(0, len(pairs), size=(n, 6 * years), dtype=np.int32)
+        log_growth = pairs[picks].sum(axis=1, dtype=np.float64)
+    else:
+        draws = rng.standard_normal((n, years), dtype=np.float32)
+        log_growth = model["mu"] * years + model["sigma"] * draws.sum(axis=1, dtype=np.float64)
+    return np.exp(log_growth), time.perf_counter() - start
+
+
+def simulate_gross(model, n_paths=N_PATHS, years=HORIZON_YEARS, seed=0, block=BLOCK, workers=1):
+    """
+    Gross terminal growth factors of `n_paths` paths.
+
+    Returns:
+        tuple: (growth factors, report dict with paths, years, path_years,
+        seconds, path_years_per_sec and path_years_per_core_sec).
+    """
+    start = time.perf_counter()
+    sizes = [min(block, n_paths - i) for i in range(0, n_paths, block)]
+    tasks = [(model, s, n, years) for s, n in zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes)]
+    # Workers must be forked: analysis.py runs at module level
+    if workers > 1 and len(tasks) > 1 and "fork" in multiprocessing.get_all_start_methods():
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as executor:
+            parts = list(executor.map(_simulate_block, tasks))
+    else:
+        parts = [_simulate_block(task) for task in tasks]
+    growth = np.concatenate([g for g, _ in parts]) if parts else np.empty(0)
+    seconds = time.perf_counter() - start
+    busy = sum(s for _, s in parts)
+    path_years = n_paths * years
+    report = {
+        "paths": n_paths,
+        "years": years,
+        "path_years": path_years,
+        "seconds": round(seconds, 3),
+        "path_years_per_sec": path_years / seconds if seconds > 0 else float("nan"),
+        "path_years_per_core_sec": path_years / busy if busy > 0 else float("nan"),
+    }
+    return growth, report
+
+
+def _distribution(wealth):
+    row = {"Mean": wealth.mean()}
+    row.update(zip(QUANTILES, np.quantile(wealth, list(QUANTILES.values()))))
+    return row
+
+
+def fee_drag(platforms, growth, years=HORIZON_YEARS, initial=INITIAL_WEALTH, seed=0):
+    """
+    Terminal wealth distributions per platform and per advisor group.
+
+    Platform quantiles are exact scalings of the gross quantiles. A group
+    mixes its platforms equally: every path is assigned one of the group's
+    platforms at random.
+
+    Returns:
+        tuple: (per-group DataFrame incl. a gross "No fees" row, per-platform DataFrame).
+    """
+    factor = (1 - platforms["annual_cost"].to_numpy()) ** years
+    gross_q = np.quantile(growth, list(QUANTILES.values()))
+    mean_growth = growth.mean()
+
+    by_platform = pd.DataFrame({
+        "Platform": platforms["platform_name"].to_numpy(),
+        "Advisor Group": platforms["advisor_group"].to_numpy(),
+        "Annual Cost (%)": platforms["annual_cost"].to_numpy() * 100,
+        "Mean": initial * mean_growth * factor,
+        **{q: initial * v * factor for q, v in zip(QUANTILES, gross_q)},
+        "Mean Fee Drag ($)": initial * mean_growth * (1 - factor),
+        "Fee Drag (%)": (1 - factor) * 100,
+    }).sort_values(["Advisor Group", "Annual Cost (%)"], ignore_index=True)
+
+    # Own stream: spawn keys (0,), (1,), ... are the simulated blocks' seeds
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(ASSIGNMENT_KEY,)))
+    rows = [{"Advisor Group": "No fees", "Platforms": 0, "Paths": len(growth), **_distribution(initial * growth),
+             "Mean Fee Drag ($)": 0.0}]
+    for group, members in platforms.groupby("advisor_group"):
+        k = factor[members.index.to_numpy()]
+        assigned = k[rng.integers(0, len(k), size=len(growth))]
+        wealth = initial * growth * assigned
+        rows.append({"Advisor Group": group, "Platforms": len(k), "Paths": len(growth), **_distribution(wealth),
+                     "Mean Fee Drag ($)": (initial * growth * (1 - assigned)).mean()})
+    return pd.DataFrame(rows).round(2), by_platform.round(2)
+
+
+def print_report(report, workers):
+    print(f"🎲 {report['paths']:,} paths x {report['years']} years in {report['seconds']:.2f}s "
+          f"({workers} workers): {report['path_years_per_sec'] / 1e6:.1f}M path-years/s, "
+          f"{report['path_years_per_core_sec'] / 1e6:.1f}M per core")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo terminal wealth under each platform's fees.")
+    parser.add_argument("--paths", type=int, default=N_PATHS)
+    parser.add_argument("--years", type=int, default=HORIZON_YEARS)
+    parser.add_argument("--initial", type=float, default=INITIAL_WEALTH)
+    parser.add_argument("--model", choices=["bootstrap", "parametric"], default="bootstrap")
+    parser.add_argument("--returns-store", default=RETURNS_STORE, help="Monthly returns store for the bootstrap")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--block", type=int, default=BLOCK, help="Paths per vectorized block")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", default=f"results/fee_drag_{datetime.now().timestamp()}.xlsx")
+    args = parser.parse_args()
+
+    model = bootstrap_model(args.returns_store) if args.model == "bootstrap" else parametric_model(**PARAMETRIC)
+    platforms = load_platforms()
+    growth, report = simulate_gross(model, args.paths, args.years, args.seed, args.block, args.workers)
+    print_report(report, args.workers)
+    by_group, by_platform = fee_drag(platforms, growth, args.years, args.initial, args.seed)
+    print(f"\nTerminal wealth after {args.years} years (${args.initial:,.0f}, 50/50):\n")
+    print(by_group.to_string(index=False))
+
+    with pd.ExcelWriter(args.out, engine="xlsxwriter") as writer:
+        by_group.to_excel(writer, sheet_name="Fee Drag by Group", index=False)
+        by_platform.to_excel(writer, sheet_name="Fee Drag by Platform", index=False)
+    print(f"\n✅ Fee drag simulation exported to {args.out}")
@@ -1,9 +1,14 @@
-import sqlite3
+import os
+import sys
 import pandas as pd
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage
+from bulk_load import upsert_dataframe
+
 # --- Configuration ---
 CSV_PATH = "data/portfolios_reprocessed.csv"
-DB_PATH = "../data/portfolio_data.db"
+DB_PATH = storage.DB_PATH
 TABLE_NAME = "portfolios_reprocessed"
 
 try:
@@ -30,7 +35,7 @@ if not all(col in df.columns for col in expected_columns):
     raise ValueError(f"Missing expected columns in CSV: {missing}")
 
 # --- Connect to SQLite ---
-conn = sqlite3.connect(DB_PATH)
+conn = storage.connect(DB_PATH)
 cursor = conn.cursor()
 
 cursor.execute(f'''
@@ -54,35 +59,18 @@ cursor.execute(f'''
 
 # Insert or update data
 print("Importing data into table 'portfolios_reprocess'...")
-for _, row in df.iterrows():
-    cursor.execute(f'''
-        INSERT INTO {TABLE_NAME} (
-            portfolio_id, advisor_type, platform_name, fund_name,
-            expense_ratio, transaction_costs, turnover_rate,
-            tax_efficiency, assets_under_management,
-            document_date, extraction_notes, excluded
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(portfolio_id) DO UPDATE SET
-            advisor_type=excluded.advisor_type,
-            platform_name=excluded.platform_name,
-            fund_name=excluded.fund_name,
-            expense_ratio=excluded.expense_ratio,
-            transaction_costs=excluded.transaction_costs,
-            turnover_rate=excluded.turnover_rate,
-            tax_efficiency=excluded.tax_efficiency,
-            assets_under_management=excluded.assets_under_management,
-            document_date=excluded.document_date,
-            extraction_notes=excluded.extraction_notes,
-            excluded=excluded.excluded
-    ''', (
-        row["portfolio_id"], row["advisor_type"], (row["platform_name"] if row["platform_name"] != 0 else ""), row["fund_name"],
-        row["expense_ratio"], row["transaction_costs"], row["turnover_rate"],
-        row["tax_efficiency"], row["assets_under_management"],
-        row["document_date"].strftime('%Y-%m-%d %H:%M:%S') if pd.notnull(row["document_date"]) else None,
-        row["extraction_notes"], row["excluded"]
-    ))
+columns = [
+    "portfolio_id", "advisor_type", "platform_name", "fund_name",
+    "expense_ratio", "transaction_costs", "turnover_rate",
+    "tax_efficiency", "assets_under_management",
+    "document_date", "extraction_notes", "excluded"
+]
+# Same fix-ups as the former per-row loop, applied column-wise
+df["platform_name"] = df["platform_name"].where(df["platform_name"] != 0, "")
+df["document_date"] = df["document_date"].dt.strftime('%Y-%m-%d %H:%M:%S')
+upsert_dataframe(conn, df, TABLE_NAME, columns, conflict_key="portfolio_id")
 
-# Commit and close
+# Commit and add any indexes the new table needs
 conn.commit()
-conn.close()
+storage.migrate(conn)
 print("✅ Import complete.")
\ No newline at end of file
@@ -0,0 +1,103 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage
+
+# --- Configuration ---
+DB_PATH = storage.DB_PATH
+TABLE_NAME = "adv_jobs"
+
+# Stages, in order; a document only ever moves forward (or to "error")
+STAGES = ["pending", "text_extracted", "llm_done", "parsed", "inserted"]
+ERROR = "error"
+
+
+class JobLedger:
+    """
+    Per-document job state for ADV processing, stored in `portfolio_data.db`.
+
+    One row per document hash records the furthest stage reached and the raw
+    LLM response once paid for, so a restarted run never repeats finished work.
+    """
+    def __init__(self, conn):
+        self.conn = conn
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+                doc_hash TEXT PRIMARY KEY,
+                filename TEXT,
+                portfolio_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                response TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_status ON {TABLE_NAME}(status)")
+        self.conn.commit()
+
+    def register(self, doc_hash, filename, portfolio_id):
+        """Add a document as pending unless it is already tracked."""
+        self.conn.execute(f"""
+            INSERT OR IGNORE INTO {TABLE_NAME} (doc_hash, filename, portfolio_id, status, updated_at)
+            VALUES (?, ?, ?, 'pending', ?)
+        """, (doc_hash, filename, portfolio_id, time.time()))
+
+    def get(self, doc_hash):
+        row = self.conn.execute(
+            f"SELECT status, response, error, portfolio_id FROM {TABLE_NAME} WHERE doc_hash = ?", (doc_hash,)).fetchone()
+        if row is None:
+            return None
+        return {"status": row[0], "response": row[1], "error": row[2], "portfolio_id": row[3]}
+
+    def advance(self, doc_hash, status, response=None):
+        """Move a document to `status`, keeping the stored response unless a new one is given."""
+        self.conn.execute(f"""
+            UPDATE {TABLE_NAME}
+            SET status = ?, response = COALESCE(?, response), error = NULL, updated_at = ?
+            WHERE doc_hash = ?
+        """, (status, response, time.time(), doc_hash))
+
+    def fail(self, doc_hash, error, clear_response=False):
+        """Mark a document as failed; `clear_response` drops a stored response so the LLM is asked again."""
+        self.conn.execute(f"""
+            UPDATE {TABLE_NAME}
+            SET status = 'error', error = ?, attempts = attempts + 1, updated_at = ?,
+                response = CASE WHEN ? THEN NULL ELSE response END
+            WHERE doc_hash = ?
+        """, (str(error), time.time(), bool(clear_response), doc_hash))
+
+    def reached(self, doc_hash, stage):
+        """True if the document has completed `stage` (or a later one)."""
+        job = self.get(doc_hash)
+        if job is None or job["status"] == ERROR:
+            return False
+        return STAGES.index(job["status"]) >= STAGES.index(stage)
+
+    def summary(self):
+        counts = dict(self.conn.execute(
+            f"SELECT status, COUNT(*) FROM {TABLE_NAME} GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in STAGES + [ERROR]}
+
+    def errors(self):
+        return self.conn.execute(
+            f"SELECT filename, attempts, error FROM {TABLE_NAME} WHERE status = 'error' ORDER BY updated_at").fetchall()
+
+
+def print_status(ledger):
+    print("\nADV job ledger:")
+    for status, n in ledger.summary().items():
+        print(f"  {status:<15}{n}")
+    for filename, attempts, error in ledger.errors():
+        print(f"  ❌ {filename} ({attempts} attempts): {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the ADV processing job ledger.")
+    parser.add_argument("command", choices=["status"])
+    parser.parse_args()
+
+    print_status(JobLedger(storage.connect(DB_PATH)))
@@ -0,0 +1,191 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# --- Configuration ---
+CACHE_PATH = "../data/llm_cache.db"
+MAX_BYTES = 512 * 1024 * 1024  # evict least-recently-used entries above this size
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """SHA-256 of a file's content, read in chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def make_key(doc_hash, prompt_version, model, params):
+    """Cache key over document content, prompt version, model and request parameters."""
+    payload = json.dumps([doc_hash, prompt_version, model, params], sort_keys=True)
+    return hash_bytes(payload.encode())
+
+
+class LLMCache:
+    """
+    Persistent, content-addressed cache of LLM extraction responses.
+
+    Entries are keyed by `make_key` and evicted least-recently-used once the
+    stored responses exceed `max_bytes`. Safe to share across worker threads.
+    """
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                doc_hash TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                model TEXT NOT NULL,
+                params TEXT,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_access ON llm_responses(last_access)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_doc ON llm_responses(doc_hash)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache_stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, key):
+        """Return the cached response for `key`, or None on a miss."""
+        with self.lock:
+            row = self.conn.execute("SELECT response FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                self._bump("misses")
+                self.conn.commit()
+                return None
+            self.hits += 1
+            self._bump("hits")
+            self.conn.execute("UPDATE llm_responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            return row[0]
+
+    def put(self, key, doc_hash, prompt_version, model, params, response):
+        if not response:  # empty completions are not worth replaying
+            return
+        now = time.time()
+        with self.lock:
+            self.conn.execute("""
+                INSERT OR REPLACE INTO llm_responses
+                    (key, doc_hash, prompt_version, model, params, response, size, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (key, doc_hash, prompt_version, model, json.dumps(params, sort_keys=True),
+                  response, len(response.encode()), now, now))
+            self._evict()
+            self.conn.commit()
+
+    def _bump(self, name):
+        self.conn.execute("""
+            INSERT INTO llm_cache_stats (name, value) VALUES (?, 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1
+        """, (name,))
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self.conn.execute("SELECT key, size FROM llm_responses ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        print(f"🧹 Evicted {evicted} cached responses (cache size now {total / 1e6:.1f} MB)")
+
+    def invalidate(self, doc_hash=None, model=None, prompt_version=None):
+        """Delete matching entries (all entries if no filter is given). Returns the count."""
+        clauses, params = [], []
+        for column, value in (("doc_hash", doc_hash), ("model", model), ("prompt_version", prompt_version)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.lock:
+            deleted = self.conn.execute(f"DELETE FROM llm_responses{where}", params).rowcount
+            self.conn.commit()
+        return deleted
+
+    def iter_responses(self, prompt_version=None, model=None, params=None):
+        """
+        Yield (doc_hash, response) for cached entries, optionally filtered.
+
+        With `prompt_version`, `model` and `params` all given there is at most
+        one entry per document: the one `make_key` would look up for them.
+        """
+        query = "SELECT doc_hash, response FROM llm_responses WHERE 1 = 1"
+        args = []
+        if prompt_version:
+            query += " AND prompt_version = ?"
+            args.append(prompt_version)
+        if model:
+            query += " AND model = ?"
+            args.append(model)
+        if params is not None:
+            query += " AND params = ?"
+            args.append(json.dumps(params, sort_keys=True))
+        with self.lock:
+            rows = self.conn.execute(query + " ORDER BY created_at", args).fetchall()
+        yield from rows
+
+    def stats(self):
+        with self.lock:
+            entries, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+            totals = dict(self.conn.execute("SELECT name, value FROM llm_cache_stats").fetchall())
+        return {
+            "entries": entries,
+            "size_mb": round(size / 1e6, 2),
+            "session_hits": self.hits,
+            "session_misses": self.misses,
+            "total_hits": totals.get("hits", 0),
+            "total_misses": totals.get("misses", 0),
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the LLM response cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Show entry count, size and hit/miss counters")
+    inv = sub.add_parser("invalidate", help="Delete cached responses")
+    inv.add_argument("--all", action="store_true", help="Delete every entry")
+    inv.add_argument("--doc", help="Document SHA-256 (or path to the PDF)")
+    inv.add_argument("--model")
+    inv.add_argument("--prompt-version")
+    args = parser.parse_args()
+
+    cache = LLMCache()
+    if args.command == "stats":
+        for name, value in cache.stats().items():
+            print(f"{name}: {value}")
+    else:
+        doc = hash_file(args.doc) if args.doc and os.path.exists(args.doc) else args.doc
+        if not (args.all or doc or args.model or args.prompt_version):
+            parser.error("invalidate needs --all or at least one filter")
+        print(f"🗑️ Invalidated {cache.invalidate(doc, args.model, args.prompt_version)} cached responses.")
+    cache.close()
@@ -1,58 +1,36 @@
+import argparse
 import os
-import sqlite3
+import sys
 import fitz  # PyMuPDF
 import openai
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import re
-from datetime import datetime, timezone
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage
+from llm_cache import LLMCache, hash_bytes, hash_file, make_key
+from near_duplicates import NearDuplicateIndex
+from page_index import has_fee_section, select_pages
+from job_ledger import JobLedger, print_status
+from page_store import PageStore, build_store
+from rule_extractor import CONFIDENCE_THRESHOLD, extract_fields, format_response, is_resolved, merge_with_llm
+from scheduler import extract_concurrently
+
 # Load API key
 load_dotenv()
 client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 # Paths
 ADV_FOLDER = "adv_form"
-DB_PATH = "../data/portfolio_data.db"
-PROCESSED_FOLDER = os.path.join(ADV_FOLDER, "processed")
-
-# Database setup
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS portfolios (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            portfolio_id TEXT,
-            advisor_type TEXT NOT NULL,
-            platform_name TEXT NOT NULL,
-            fund_name TEXT,
-            expense_ratio REAL,
-            transaction_costs REAL,
-            turnover_rate REAL,
-            tax_efficiency REAL,
-            assets_under_management REAL,
-            document_date TEXT,
-            extraction_notes TEXT
-        )
-    ''')
-    conn.commit()
-    return conn, cursor
-
-# PDF text extraction
-class ADVExtractor:
-    def __init__(self, filepath):
-        self.filepath = filepath
+DB_PATH = storage.DB_PATH
 
-    def extract_text(self):
-        with fitz.open(self.filepath) as doc:
-            return " ".join(page.get_text() for page in doc)
-
-    def get_fee_structure(self):
-        text = self.extract_text()
-        prompt = f"""
+# LLM settings
+MODEL = 'gpt-4.1-mini'
+TEMPERATURE = 0.0
+SYSTEM_PROMPT = "You are a financial data extraction assistant. Do not infer or fabricate data."
+PROMPT_TEMPLATE = """
         From the following SEC Form ADV text, assume an investment of $500,000 with a 50/50 allocation between equities and bonds.
 
         Extract only if explicitly stated in the text (do not infer or invent):
@@ -90,18 +68,151 @@ class ADVExtractor:
         - <bullet point explanation>
         - ...
         """
-        response = client.chat.completions.create(
-            model='gpt-4.1-mini',
-            messages=[
-                {"role": "system", "content": "You are a financial data extraction assistant. Do not infer or fabricate data."},
+# Changing the prompt changes its version, which invalidates cached responses
+PROMPT_VERSION = hash_bytes((SYSTEM_PROMPT + PROMPT_TEMPLATE).encode())[:12]
+
+# Database setup
+def init_db():
+    conn = storage.connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS portfolios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            portfolio_id TEXT,
+            advisor_type TEXT NOT NULL,
+            platform_name TEXT NOT NULL,
+            fund_name TEXT,
+            expense_ratio REAL,
+            transaction_costs REAL,
+            turnover_rate REAL,
+            tax_efficiency REAL,
+            assets_under_management REAL,
+            document_date TEXT,
+            extraction_notes TEXT
+        )
+    ''')
+    conn.commit()
+    storage.migrate(conn)
+    return conn, cursor
+
+def extraction_params(token_budget=None):
+    """Request parameters that, with the PDF and prompt version, determine the response."""
+    params = {"temperature": TEMPERATURE}
+    if token_budget is not None:
+        params["token_budget"] = token_budget
+    return params
+
+# PDF text extraction
+class ADVExtractor:
+    def __init__(self, filepath, cache=None, token_budget=None, store=None, use_rules=False):
+        self.filepath = filepath
+        self.cache = cache
+        self.store = store
+        self.token_budget = token_budget
+        self.use_rules = use_rules
+        self.page_report = None
+        self.resolved_locally = False
+        self._doc_hash = None
+
+    def doc_hash(self):
+        """SHA-256 of the PDF content (computed once)."""
+        if self._doc_hash is None:
+            self._doc_hash = hash_file(self.filepath)
+        return self._doc_hash
+
+    def iter_pages(self):
+        """Yield page texts, from the page store when the document is in it."""
+        if self.store is not None and self.store.has(self.doc_hash()):
+            yield from self.store.iter_pages(self.doc_hash())
+            return
+        with fitz.open(self.filepath) as doc:
+            for page in doc:
+                yield page.get_text()
+
+    def extract_pages(self):
+        return list(self.iter_pages())
+
+    def extract_text(self):
+        return " ".join(self.iter_pages())
+
+    def prompt_text(self):
+        """Document text for the prompt: relevant pages only when a token budget is set."""
+        if self.token_budget is None:
+            return self.extract_text()
+        pages = self.extract_pages()
+        selected, self.page_report = select_pages(pages, self.token_budget)
+        return " ".join(pages[i] for i in selected)
+
+    def request_params(self):
+        return extraction_params(self.token_budget)
+
+    def build_request(self):
+        """Build the chat-completions request body for this filing."""
+        prompt = PROMPT_TEMPLATE.format(text=self.prompt_text())
+        return {
+            "model": MODEL,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.0
-        )
-        return response.choices[0].message.content
+            "temperature": TEMPERATURE
+        }
 
-# Parse response and insert into DB
-def parse_and_insert(response_text, portfolio_id, cursor):
+    def get_fee_structure(self, llm_client=None, call=None):
+        """
+        Return the LLM extraction for this filing, from the cache when possible.
+
+        With `use_rules`, the rule-based extractor runs first; if it resolves the
+        required fields confidently no request is made, otherwise its confident
+        fields take precedence over the LLM's answer.
+
+        Args:
+            llm_client (openai.OpenAI | None): Client to use (defaults to the module client).
+            call (callable | None): Wrapper `call(send, request)` around the API call,
+                used by the scheduler for rate limiting and retries.
+        """
+        if self.use_rules:
+            rule_record, confidence = extract_fields(self.extract_pages())
+            self.resolved_locally = is_resolved(confidence)
+            if self.resolved_locally:
+                return format_response(rule_record)
+
+        content = self._llm_response(llm_client, call)
+        if self.use_rules:
+            llm_record = parse_response(content, self.filepath)
+            if llm_record is not None:
+                content = format_response(merge_with_llm(rule_record, confidence, llm_record))
+        return content
+
+    def _llm_response(self, llm_client, call):
+        key = None
+        if self.cache is not None:
+            key = make_key(self.doc_hash(), PROMPT_VERSION, MODEL, self.request_params())
+            cached = self.cache.get(key)
+            if cached is not None:
+                if self.token_budget is not None:
+                    self.prompt_text()  # fills page_report, so savings are reported for cached documents too
+                return cached
+
+        llm_client = llm_client or client
+        request = self.build_request()
+
+        def send():
+            response = llm_client.chat.completions.create(**request)
+            return response.choices[0].message.content
+
+        content = call(send, request) if call else send()
+        if self.cache is not None:
+            self.cache.put(key, self.doc_hash(), PROMPT_VERSION, MODEL, self.request_params(), content)
+        return content
+
+# Deterministic portfolio ID for a document hash
+def portfolio_id_for(doc_hash):
+    return f"RA_{doc_hash[:12]}"
+
+# Parse response into a portfolios record
+def parse_response(response_text, portfolio_id=""):
+    """Return the `portfolios` fields of an extraction response, or None if unusable."""
     try:
         platform = re.search(r"Platform: (.+)", response_text).group(1).strip()
         advisor_type = re.search(r"Advisor Type: (.+)", response_text).group(1).strip()
@@ -125,66 +236,283 @@ def parse_and_insert(response_text, portfolio_id, cursor):
 
         notes_match = re.search(r"Notes:\s*(.+)$", response_text, re.DOTALL)
         notes = notes_match.group(1).strip() if notes_match else ""
+    except Exception as e:
+        print(f"Failed to parse {portfolio_id}: {e}")
+        return None
 
-        if mgmt_fee is None and txn_fee is None and turnover is None and tax_eff is None and aum is None:
-            print(f"Skipping {portfolio_id}: no extractable numeric data.")
-            return
+    if mgmt_fee is None and txn_fee is None and turnover is None and tax_eff is None and aum is None:
+        print(f"Skipping {portfolio_id}: no extractable numeric data.")
+        return None
 
-        cursor.execute('''
-            INSERT INTO portfolios (
-                portfolio_id, advisor_type, platform_name, fund_name,
-                expense_ratio, transaction_costs, turnover_rate, 
-                tax_efficiency, assets_under_management, 
-                document_date, extraction_notes
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            portfolio_id,
-            advisor_type,
-            platform,
-            fund_name,
-            mgmt_fee,
-            txn_fee,
-            turnover,
-            tax_eff,
-            aum,
-            document_date,
-            notes
-        ))
-    except Exception as e:
-        print(f"Failed to insert {portfolio_id}: {e}")
+    return {
+        "advisor_type": advisor_type,
+        "platform_name": platform,
+        "fund_name": fund_name,
+        "expense_ratio": mgmt_fee,
+        "transaction_costs": txn_fee,
+        "turnover_rate": turnover,
+        "tax_efficiency": tax_eff,
+        "assets_under_management": aum,
+        "document_date": document_date,
+        "extraction_notes": notes
+    }
+
+# Insert a parsed record into DB, replacing any earlier rows of the same portfolio
+def insert_record(record, portfolio_id, cursor):
+    cursor.execute("DELETE FROM portfolios WHERE portfolio_id = ?", (portfolio_id,))
+    cursor.execute('''
+        INSERT INTO portfolios (
+            portfolio_id, advisor_type, platform_name, fund_name,
+            expense_ratio, transaction_costs, turnover_rate,
+            tax_efficiency, assets_under_management,
+            document_date, extraction_notes
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        portfolio_id,
+        record["advisor_type"],
+        record["platform_name"],
+        record["fund_name"],
+        record["expense_ratio"],
+        record["transaction_costs"],
+        record["turnover_rate"],
+        record["tax_efficiency"],
+        record["assets_under_management"],
+        record["document_date"],
+        record["extraction_notes"]
+    ))
 
 # Extraction and insertion loop
-def process_adv_forms():
+def process_adv_forms(workers=1, rpm=None, tpm=None, use_cache=True, token_budget=None, use_page_store=True,
+                      use_rules=False, dedupe_threshold=None):
+    """
+    Extract every PDF in ADV_FOLDER and insert the results into `portfolios`.
+
+    Progress is tracked per document hash in the job ledger, so the run can be
+    interrupted and restarted: inserted documents are skipped and documents
+    whose LLM response is already stored are not sent again.
+
+    Args:
+        workers (int): Number of LLM requests in flight. 1 keeps the original
+            sequential loop; more uses the rate-limited scheduler.
+        rpm (int | None): Requests-per-minute limit for the scheduler.
+        tpm (int | None): Tokens-per-minute limit for the scheduler.
+        use_cache (bool): Reuse cached responses for unchanged PDFs and prompts.
+        token_budget (int | None): Send only the most fee-relevant pages, up to
+            this many estimated tokens. None sends the full text.
+        use_page_store (bool): Extract page text up front, in parallel, into the
+            page store and read it from there instead of re-parsing each PDF.
+        use_rules (bool): Try the rule-based extractor first and only call the
+            LLM for documents it cannot resolve confidently.
+        dedupe_threshold (float | None): Reuse the extraction of an already
+            processed filing whose estimated similarity is at least this high,
+            as long as none of the differing pages are fee-relevant. Every
+            inserted filing is added to the near-duplicate index whatever this
+            is set to, and inserted filings missing from it are backfilled.
+    """
     conn, cursor = init_db()
+    ledger = JobLedger(conn)
+    index = NearDuplicateIndex()
+    cache = LLMCache() if use_cache else None
+    store = None
+    if use_page_store:
+        store = PageStore()
+        build_store([ADV_FOLDER], store=store)
     count = 0
-    for filename in os.listdir(ADV_FOLDER):
-        if filename.endswith(".pdf"):
-            portfolio_id = f"RA_{int(datetime.now(timezone.utc).timestamp())}"
-            path = os.path.join(ADV_FOLDER, filename)
-            extractor = ADVExtractor(path)
-            print(f"Processing {filename}...")
-            response = extractor.get_fee_structure()
-            print(response)
-            parse_and_insert(response, portfolio_id, cursor)
+    tokens_saved = 0
+
+    # Register every document, one job per distinct content hash
+    extractors, seen = [], set()
+    for filename in sorted(f for f in os.listdir(ADV_FOLDER) if f.endswith(".pdf")):
+        extractor = ADVExtractor(os.path.join(ADV_FOLDER, filename), cache=cache,
+                                 token_budget=token_budget, store=store, use_rules=use_rules)
+        doc_hash = extractor.doc_hash()
+        if doc_hash in seen:
+            continue
+        seen.add(doc_hash)
+        ledger.register(doc_hash, filename, portfolio_id_for(doc_hash))
+        if store is not None and store.has(doc_hash) and ledger.get(doc_hash)["status"] == "pending":
+            ledger.advance(doc_hash, "text_extracted")
+        if not ledger.reached(doc_hash, "inserted"):
+            extractors.append(extractor)
+        elif not index.contains(doc_hash):
+            index.add(doc_hash, extractor.extract_pages())
+    conn.commit()
+
+    # Only documents without a stored (or reusable near-duplicate) response need the LLM
+    stored = {e.doc_hash(): ledger.get(e.doc_hash())["response"] for e in extractors}
+    reused = 0
+    if dedupe_threshold is not None:
+        for extractor in extractors:
+            doc_hash = extractor.doc_hash()
+            if stored[doc_hash] is None:
+                response = _reuse_near_duplicate(index, ledger, doc_hash, extractor.extract_pages(),
+                                                 dedupe_threshold)
+                if response is not None:
+                    ledger.advance(doc_hash, "llm_done", response)
+                    stored[doc_hash] = response
+                    reused += 1
+        conn.commit()
+        print(f"Reused {reused} extractions from near-duplicate filings.")
+    need_llm = [e for e in extractors if stored[e.doc_hash()] is None]
+    print(f"{len(extractors)} documents to process, {len(need_llm)} need the LLM.")
+    if workers > 1:
+        llm_results = extract_concurrently(need_llm, client, workers=workers, rpm=rpm, tpm=tpm)
+    else:
+        llm_results = ((e, _safe_extract(e)) for e in need_llm)
+
+    # Documents are handled in file order; this loop is the only database writer
+    for extractor in extractors:
+        doc_hash = extractor.doc_hash()
+        portfolio_id = portfolio_id_for(doc_hash)
+        filename = os.path.basename(extractor.filepath)
+        print(f"Processing {filename}...")
+
+        response = stored[doc_hash]
+        if response is None:
+            _, response = next(llm_results)
+            if isinstance(response, Exception):
+                print(f"❌ Extraction failed for {filename}: {response}")
+                ledger.fail(doc_hash, response)
+                conn.commit()
+                continue
+            ledger.advance(doc_hash, "llm_done", response)
             conn.commit()
-            count += 1
+            if extractor.page_report:
+                report = extractor.page_report
+                tokens_saved += report["tokens_saved"]
+                print(f"Sent {report['pages_selected']}/{report['pages_total']} pages, "
+                      f"{report['tokens_sent']}/{report['tokens_full']} tokens "
+                      f"(saved {report['tokens_saved']}{', full-text fallback' if report['fallback_full_text'] else ''})")
+        print(response)
 
-            if not os.path.exists(PROCESSED_FOLDER):
-                os.makedirs(PROCESSED_FOLDER)
+        record = parse_response(response, portfolio_id)
+        if record is None:
+            # Drop the unusable response (and its cache entry) so the next run asks the LLM again
+            ledger.fail(doc_hash, "response could not be parsed or had no numeric data", clear_response=True)
+            if cache is not None:
+                cache.invalidate(doc_hash=doc_hash)
+            conn.commit()
+            continue
+        ledger.advance(doc_hash, "parsed")
+        conn.commit()
 
-            processed_path = os.path.join(PROCESSED_FOLDER, filename)
-            os.rename(path, processed_path)
-            print(f"Inserted {portfolio_id} into database.")
+        # The row and the ledger update commit together, so a document is inserted exactly once
+        try:
+            insert_record(record, portfolio_id, cursor)
+        except Exception as e:
+            conn.rollback()
+            print(f"Failed to insert {portfolio_id}: {e}")
+            ledger.fail(doc_hash, e)
+            conn.commit()
+            continue
+        ledger.advance(doc_hash, "inserted")
+        conn.commit()
+        index.add(doc_hash, extractor.extract_pages())
+        count += 1
+        print(f"Inserted {portfolio_id} into database.")
 
+    index.close()
     print(f"Processed {count} files.")
-    conn.close()
+    if use_rules and need_llm:
+        local = sum(e.resolved_locally for e in need_llm)
+        print(f"Rule-based extractor resolved {local}/{len(need_llm)} documents "
+              f"({local / len(need_llm):.0%}) without a network call.")
+    if token_budget is not None:
+        print(f"Page selection saved ~{tokens_saved} prompt tokens.")
+    if cache is not None:
+        print(f"LLM cache: {cache.hits} hits, {cache.misses} misses.")
+        cache.close()
+    if store is not None:
+        store.close()
+    print_status(ledger)
+
+def _reuse_near_duplicate(index, ledger, doc_hash, pages, threshold):
+    """
+    Response of the closest processed filing, if only pages without a fee section differ.
+
+    When the cover page differs (e.g. an affiliated entity's brochure), its
+    fields are re-extracted from this filing instead of being copied.
+    """
+    for match_hash, similarity in index.query(pages, threshold=threshold, exclude=doc_hash):
+        match = ledger.get(match_hash)
+        if match is None or match["response"] is None:
+            continue
+        changed = index.changed_pages(match_hash, pages)
+        fee_pages = [i for i in changed if has_fee_section(pages[i])]
+        if fee_pages:
+            print(f"Near-duplicate {match_hash[:12]} ({similarity:.2f}) differs on fee pages {fee_pages}.")
+            continue
+        response = match["response"]
+        if 0 in changed:
+            response = _with_cover_fields(response, pages[0])
+            if response is None:
+                print(f"Near-duplicate {match_hash[:12]} ({similarity:.2f}) has another cover page "
+                      f"whose firm name could not be read.")
+                continue
+        print(f"Reusing extraction of near-duplicate {match_hash[:12]} (similarity {similarity:.2f}).")
+        return response + f"\n- Reused from near-duplicate filing {match_hash[:12]} (similarity {similarity:.2f})."
+    return None
+
+def _with_cover_fields(response, cover):
+    """`response` with Platform and Document Date taken from `cover`, or None without a confident firm name."""
+    record, confidence = extract_fields([cover])
+    if record["platform_name"] is None or confidence["platform_name"] < CONFIDENCE_THRESHOLD:
+        return None
+    for label, field in (("Platform", "platform_name"), ("Document Date", "document_date")):
+        value = record[field] or ""
+        response = re.sub(rf"^{label}:.*$", lambda _: f"{label}: {value}", response, flags=re.M)
+    return response
+
+def _safe_extract(extractor):
+    try:
+        return extractor.get_fee_structure()
+    except Exception as e:
+        return e
+
+# Re-run parsing over every cached response, without any network calls
+def replay_from_cache(token_budget=None):
+    """
+    Re-parse every cached response and replace the documents' rows in `portfolios`.
+
+    Only the responses an extraction run with the same settings would reuse
+    are replayed: the current prompt version and model, and the request
+    parameters of `token_budget`. A document cached under other parameters
+    (e.g. another page budget) is skipped, so the result does not depend on
+    which variant was cached last.
+
+    Each document's rows and ledger entry are written in one transaction, so
+    replaying again (e.g. after a parser change) never duplicates rows.
+
+    Args:
+        token_budget (int | None): Page budget whose cached responses are
+            replayed. None replays full-text responses.
+    """
+    conn, cursor = init_db()
+    ledger = JobLedger(conn)
+    cache = LLMCache()
+    count = failed = 0
+    responses = cache.iter_responses(prompt_version=PROMPT_VERSION, model=MODEL,
+                                     params=extraction_params(token_budget))
+    for doc_hash, response in responses:
+        portfolio_id = portfolio_id_for(doc_hash)
+        with conn:
+            ledger.register(doc_hash, None, portfolio_id)
+            ledger.advance(doc_hash, "llm_done", response)
+            record = parse_response(response, portfolio_id)
+            if record is None:
+                ledger.fail(doc_hash, "response could not be parsed or had no numeric data")
+                failed += 1
+                continue
+            ledger.advance(doc_hash, "parsed")
+            insert_record(record, portfolio_id, cursor)
+            ledger.advance(doc_hash, "inserted")
+            count += 1
+    cache.close()
+    print(f"Replayed {count} cached responses ({failed} could not be parsed).")
 
 # Data analysis
 def load_data():
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM portfolios", conn)
-    conn.close()
-    return df
+    return storage.select("portfolios")
 
 def show_descriptive_stats(df):
     print("\nDescriptive Statistics:\n", df.describe())
@@ -198,7 +526,32 @@ def plot_costs(df):
 
 # Main runner
 if __name__ == "__main__":
-    process_adv_forms()
-    df = load_data()
-    show_descriptive_stats(df)
-    # plot_costs(df)
+    parser = argparse.ArgumentParser(description="Extract fee structures from SEC Form ADV filings.")
+    parser.add_argument("--workers", type=int, default=1, help="LLM requests in flight (default: 1, sequential)")
+    parser.add_argument("--rpm", type=int, default=None, help="Requests-per-minute limit")
+    parser.add_argument("--tpm", type=int, default=None, help="Tokens-per-minute limit")
+    parser.add_argument("--token-budget", type=int, default=None,
+                        help="Send only the most fee-relevant pages, up to this many tokens")
+    parser.add_argument("--no-page-store", action="store_true",
+                        help="Parse PDFs with PyMuPDF directly instead of the page store")
+    parser.add_argument("--rules", action="store_true",
+                        help="Try the local rule-based extractor before calling the LLM")
+    parser.add_argument("--dedupe", type=float, default=None, metavar="THRESHOLD",
+                        help="Reuse extractions of near-duplicate filings at this similarity (e.g. 0.9)")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the LLM, bypassing the response cache")
+    parser.add_argument("--status", action="store_true", help="Show the job ledger summary and exit")
+    parser.add_argument("--replay", action="store_true", help="Only re-parse cached responses (offline) made with --token-budget")
+    args = parser.parse_args()
+
+    if args.status:
+        conn, _ = init_db()
+        print_status(JobLedger(conn))
+    elif args.replay:
+        replay_from_cache(token_budget=args.token_budget)
+    else:
+        process_adv_forms(workers=args.workers, rpm=args.rpm, tpm=args.tpm, use_cache=not args.no_cache,
+                          token_budget=args.token_budget, use_page_store=not args.no_page_store,
+                          use_rules=args.rules, dedupe_threshold=args.dedupe)
+        df = load_data()
+        show_descriptive_stats(df)
+        # plot_costs(df)
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import re
+import sqlite3
+import time
+import zlib
+
+import numpy as np
+
+# --- Configuration ---
+INDEX_PATH = "../data/minhash_index.db"
+NUM_PERM = 128
+BANDS = 16              # 16 bands x 8 rows: candidate probability is 50% at Jaccard ~0.71
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5        # words per shingle
+THRESHOLD = 0.9         # estimated Jaccard similarity needed to reuse an extraction
+SEED = 20250501
+
+MERSENNE = np.uint64((1 << 31) - 1)
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+_rng = np.random.default_rng(SEED)
+_A = _rng.integers(1, int(MERSENNE), size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, int(MERSENNE), size=NUM_PERM, dtype=np.uint64)
+
+
+def normalize(text):
+    return WORD_RE.findall(text.lower())
+
+
+def shingle_hashes(text, k=SHINGLE_SIZE):
+    """32-bit hashes of the distinct k-word shingles of a text."""
+    words = normalize(text)
+    if len(words) < k:
+        words = words + [""] * (k - len(words))
+    shingles = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+    return np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def minhash(text, chunk_size=8192):
+    """MinHash signature of a document (NUM_PERM uint32 values)."""
+    x = shingle_hashes(text) % MERSENNE
+    signature = np.full(NUM_PERM, MERSENNE, dtype=np.uint64)
+    # (a * x + b) mod p per permutation, over shingle chunks to bound memory;
+    # a, x < 2^31 so the product cannot overflow uint64
+    for start in range(0, len(x), chunk_size):
+        values = (np.outer(_A, x[start:start + chunk_size]) + _B[:, None]) % MERSENNE
+        np.minimum(signature, values.min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def page_hashes(pages):
+    """Content hash of each page, insensitive to whitespace and case."""
+    return [hashlib.sha1(" ".join(normalize(p)).encode()).hexdigest() for p in pages]
+
+
+def _bucket_keys(signature):
+    return [hashlib.blake2b(signature[b * ROWS:(b + 1) * ROWS].tobytes(), digest_size=8).hexdigest()
+            for b in range(BANDS)]
+
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash/LSH index over ADV filings.
+
+    Each filing is stored with its signature, its LSH band buckets and its
+    per-page hashes. Lookups only compare against filings sharing at least
+    one bucket, so query cost does not grow with the size of the corpus.
+    """
+    def __init__(self, path=INDEX_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS minhash_signatures (
+                doc_hash TEXT PRIMARY KEY,
+                signature BLOB NOT NULL,
+                page_hashes TEXT NOT NULL,
+                added_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS minhash_buckets (
+                band INTEGER NOT NULL,
+                bucket TEXT NOT NULL,
+                doc_hash TEXT NOT NULL,
+                PRIMARY KEY (band, bucket, doc_hash)
+            )
+        """)
+        self.conn.commit()
+
+    def contains(self, doc_hash):
+        return self.conn.execute(
+            "SELECT 1 FROM minhash_signatures WHERE doc_hash = ?", (doc_hash,)).fetchone() is not None
+
+    def add(self, doc_hash, pages):
+        """Index one filing (no-op if already indexed)."""
+        if self.contains(doc_hash):
+            return
+        signature = minhash(" ".join(pages))
+        self.conn.execute("INSERT INTO minhash_signatures VALUES (?, ?, ?, ?)",
+                          (doc_hash, signature.tobytes(), json.dumps(page_hashes(pages)), time.time()))
+        self.conn.executemany("INSERT OR IGNORE INTO minhash_buckets VALUES (?, ?, ?)",
+                              [(band, key, doc_hash) for band, key in enumerate(_bucket_keys(signature))])
+        self.conn.commit()
+
+    def query(self, pages, threshold=THRESHOLD, exclude=None):
+        """
+        Find indexed filings similar to `pages`.
+
+        Returns:
+            list[tuple]: (doc_hash, estimated Jaccard similarity), most similar first.
+        """
+        signature = minhash(" ".join(pages))
+        candidates = set()
+        for band, key in enumerate(_bucket_keys(signature)):
+            rows = self.conn.execute(
+                "SELECT doc_hash FROM minhash_buckets WHERE band = ? AND bucket = ?", (band, key)).fetchall()
+            candidates.update(r[0] for r in rows)
+        candidates.discard(exclude)
+
+        matches = []
+        for doc_hash in candidates:
+            blob = self.conn.execute(
+                "SELECT signature FROM minhash_signatures WHERE doc_hash = ?", (doc_hash,)).fetchone()[0]
+            similarity = float(np.mean(np.frombuffer(blob, dtype=np.uint32) == signature))
+            if similarity >= threshold:
+                matches.append((doc_hash, similarity))
+        return sorted(matches, key=lambda m: m[1], reverse=True)
+
+    def changed_pages(self, doc_hash, pages):
+        """Indices of `pages` whose content does not appear in the indexed filing."""
+        row = self.conn.execute(
+            "SELECT page_hashes FROM minhash_signatures WHERE doc_hash = ?", (doc_hash,)).fetchone()
+        known = set(json.loads(row[0])) if row else set()
+        return [i for i, h in enumerate(page_hashes(pages)) if h not in known]
+
+    def close(self):
+        self.conn.close()
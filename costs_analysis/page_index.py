@@ -0,0 +1,113 @@
+import math
+import re
+from collections import Counter
+
+from scheduler import CHARS_PER_TOKEN
+
+# --- Relevance vocabulary ---
+# Single terms scored with TF-IDF across the pages of one filing
+QUERY_TERMS = {
+    "fee": 2.0, "fees": 2.0, "compensation": 2.0, "schedule": 1.5, "annual": 1.0,
+    "advisory": 1.0, "wrap": 1.5, "management": 1.0, "billed": 1.5, "quarterly": 1.0,
+    "percent": 1.0, "basis": 1.0, "points": 0.5, "tier": 1.5, "breakpoint": 1.5,
+    "aum": 2.0, "assets": 1.0, "turnover": 2.0, "transaction": 1.5, "trading": 1.0,
+    "commissions": 1.0, "expense": 1.5, "ratio": 1.0, "harvesting": 2.5, "tax": 1.5,
+    "etf": 1.0, "etfs": 1.0, "index": 0.5, "minimum": 0.5,
+}
+# Phrases of the fee section itself (Item 5, tier rows, AUM statement)
+FEE_SECTION_PATTERNS = [
+    (re.compile(r"item\s*5\b", re.I), 6.0),
+    (re.compile(r"fees\s+and\s+compensation", re.I), 6.0),
+    (re.compile(r"regulatory\s+assets\s+under\s+management", re.I), 5.0),
+    (re.compile(r"assets\s+under\s+management", re.I), 2.0),
+    (re.compile(r"(first|next|over|above)\s+\$\s?[\d,]+", re.I), 3.0),
+]
+# Phrases that mark the sections we extract from, scored per occurrence
+PHRASE_PATTERNS = FEE_SECTION_PATTERNS + [
+    (re.compile(r"\d+(\.\d+)?\s?%"), 0.5),
+    (re.compile(r"tax[-\s]loss\s+harvest", re.I), 4.0),
+    (re.compile(r"asset\s+location", re.I), 3.0),
+    (re.compile(r"portfolio\s+turnover", re.I), 4.0),
+]
+WORD_RE = re.compile(r"[a-z]+")
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def score_pages(pages):
+    """
+    Relevance score of each page of one filing for fee extraction.
+
+    Term scores use sublinear TF and a per-document IDF, so words present on
+    every page (e.g. the firm name in a running header) count for little.
+    """
+    counts = [Counter(w for w in WORD_RE.findall(page.lower()) if w in QUERY_TERMS) for page in pages]
+    n_pages = len(pages)
+    doc_freq = Counter(term for c in counts for term in c)
+    idf = {term: math.log((1 + n_pages) / (1 + df)) + 1 for term, df in doc_freq.items()}
+
+    scores = []
+    for page, c in zip(pages, counts):
+        score = sum(QUERY_TERMS[t] * (1 + math.log(tf)) * idf[t] for t, tf in c.items())
+        score += sum(weight * len(pattern.findall(page)) for pattern, weight in PHRASE_PATTERNS)
+        scores.append(score)
+    return scores
+
+
+def has_fee_section(page):
+    """True if the page contains any fee-section phrase."""
+    return any(pattern.search(page) for pattern, _ in FEE_SECTION_PATTERNS)
+
+
+def select_pages(pages, token_budget, keep_first=True):
+    """
+    Pick the highest-scoring pages that fit in `token_budget`, in document order.
+
+    The cover page is kept whenever it fits the budget since it carries the
+    firm name and the brochure date. Every page is sent when the whole filing
+    already fits in the budget, and as a fallback when no relevant page (the
+    cover counts if it scores) fits.
+
+    Args:
+        pages (list[str]): Page texts of one filing.
+        token_budget (int): Maximum estimated prompt tokens for the document text.
+        keep_first (bool): Always include the first page (if it fits).
+
+    Returns:
+        tuple: (selected page indices, report dict)
+    """
+    sizes = [estimate_tokens(p) for p in pages]
+    full_tokens = sum(sizes)
+    all_pages = list(range(len(pages)))
+    scores = score_pages(pages)
+
+    needs_selection = full_tokens > token_budget
+    selected, relevant, used = [], 0, 0
+    if needs_selection and any(s > 0 for s in scores):
+        if keep_first and pages and sizes[0] <= token_budget:
+            selected.append(0)
+            relevant = int(scores[0] > 0)
+            used = sizes[0]
+        for i in sorted(all_pages, key=lambda i: scores[i], reverse=True):
+            if i in selected or scores[i] <= 0:
+                continue
+            if used + sizes[i] <= token_budget:
+                selected.append(i)
+                relevant += 1
+                used += sizes[i]
+    # A cover without fee data alone is useless, so send the full text instead
+    fallback = needs_selection and relevant == 0
+    if relevant == 0:
+        selected, used = all_pages, full_tokens
+
+    report = {
+        "pages_total": len(pages),
+        "pages_selected": len(selected),
+        "tokens_full": full_tokens,
+        "tokens_sent": used,
+        "tokens_saved": full_tokens - used,
+        "fallback_full_text": fallback,
+    }
+    return sorted(selected), report
@@ -0,0 +1,142 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+
+from llm_cache import hash_file
+
+# --- Configuration ---
+STORE_DIR = "../data/page_store"
+SOURCE_FOLDERS = ["adv_form", os.path.join("adv_form", "processed")]
+
+
+class PageStore:
+    """
+    On-disk store of per-page PDF text keyed by (document hash, page number).
+
+    Page texts are zlib-compressed and appended to a single `pages.bin` file;
+    `index.db` records each page's offset and length so pages can be read
+    lazily, one at a time.
+    """
+    def __init__(self, store_dir=STORE_DIR):
+        os.makedirs(store_dir, exist_ok=True)
+        self.data_path = os.path.join(store_dir, "pages.bin")
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(store_dir, "index.db"), check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_hash TEXT PRIMARY KEY,
+                filename TEXT,
+                page_count INTEGER NOT NULL,
+                added_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                doc_hash TEXT NOT NULL,
+                page_no INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                raw_length INTEGER NOT NULL,
+                PRIMARY KEY (doc_hash, page_no)
+            )
+        """)
+        self.conn.commit()
+
+    def has(self, doc_hash):
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM documents WHERE doc_hash = ?", (doc_hash,)).fetchone()
+        return row is not None
+
+    def page_count(self, doc_hash):
+        with self.lock:
+            row = self.conn.execute("SELECT page_count FROM documents WHERE doc_hash = ?", (doc_hash,)).fetchone()
+        return row[0] if row else 0
+
+    def add(self, doc_hash, filename, compressed_pages, raw_lengths):
+        """Append one document's compressed pages and index them."""
+        with self.lock:
+            with open(self.data_path, "ab") as f:
+                offset = f.tell()
+                rows = []
+                for page_no, (blob, raw_length) in enumerate(zip(compressed_pages, raw_lengths)):
+                    f.write(blob)
+                    rows.append((doc_hash, page_no, offset, len(blob), raw_length))
+                    offset += len(blob)
+            self.conn.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)", rows)
+            self.conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+                              (doc_hash, filename, len(rows), time.time()))
+            self.conn.commit()
+
+    def iter_pages(self, doc_hash):
+        """Yield the text of each page of a document, decompressing lazily."""
+        with self.lock:
+            entries = self.conn.execute(
+                "SELECT offset, length FROM pages WHERE doc_hash = ? ORDER BY page_no", (doc_hash,)).fetchall()
+        with open(self.data_path, "rb") as f:
+            for offset, length in entries:
+                f.seek(offset)
+                yield zlib.decompress(f.read(length)).decode()
+
+    def get_page(self, doc_hash, page_no):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT offset, length FROM pages WHERE doc_hash = ? AND page_no = ?", (doc_hash, page_no)).fetchone()
+        if row is None:
+            raise KeyError(f"No page {page_no} for document {doc_hash}")
+        with open(self.data_path, "rb") as f:
+            f.seek(row[0])
+            return zlib.decompress(f.read(row[1])).decode()
+
+    def close(self):
+        self.conn.close()
+
+
+def _extract_pdf(path):
+    """Worker: extract and compress every page of one PDF."""
+    with fitz.open(path) as doc:
+        texts = [page.get_text().encode() for page in doc]
+    return [zlib.compress(t, 6) for t in texts], [len(t) for t in texts]
+
+
+def build_store(folders=SOURCE_FOLDERS, store=None, workers=None):
+    """
+    Extract every PDF in `folders` into the page store, in parallel across cores.
+
+    Documents already in the store (same content hash) are skipped.
+
+    Returns:
+        dict: filepath -> document hash for every PDF found.
+    """
+    store = store or PageStore()
+    paths = [os.path.join(folder, f) for folder in folders if os.path.isdir(folder)
+             for f in sorted(os.listdir(folder)) if f.endswith(".pdf")]
+    hashes = {path: hash_file(path) for path in paths}
+
+    todo, seen = [], set()
+    for path, doc_hash in hashes.items():
+        if doc_hash not in seen and not store.has(doc_hash):
+            todo.append(path)
+        seen.add(doc_hash)
+
+    start = time.perf_counter()
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # The parent is the only writer; workers only parse and compress
+            for path, (blobs, raw_lengths) in zip(todo, executor.map(_extract_pdf, todo)):
+                store.add(hashes[path], os.path.basename(path), blobs, raw_lengths)
+    print(f"📄 Page store: {len(todo)} new / {len(paths)} PDFs extracted in {time.perf_counter() - start:.1f}s")
+    return hashes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract ADV PDFs into the per-page text store.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    build_store(workers=args.workers)
@@ -0,0 +1,215 @@
+import re
+from datetime import datetime
+
+# --- Scenario (same as the LLM prompt) ---
+INVESTMENT = 500_000
+CONFIDENCE_THRESHOLD = 0.7
+# A document is resolved without the LLM when these fields are confident
+REQUIRED_FIELDS = ["platform_name", "advisor_type", "expense_ratio"]
+
+FIELDS = [
+    "advisor_type", "platform_name", "fund_name", "expense_ratio", "transaction_costs",
+    "turnover_rate", "tax_efficiency", "assets_under_management", "document_date", "extraction_notes"
+]
+
+# --- Precompiled patterns ---
+AMOUNT = r"\$\s?([\d,]+(?:\.\d+)?)\s*(million|mm|m|billion|bn|b)?\b"
+RATE = r"(\d{1,2}(?:\.\d{1,3})?)\s?%"
+MULTIPLIERS = {"million": 1e6, "mm": 1e6, "m": 1e6, "billion": 1e9, "bn": 1e9, "b": 1e9}
+
+TIER_FIRST = re.compile(r"(?:first|on the first|up to|less than|under)\s+" + AMOUNT + r"[^%$\n]{0,60}?" + RATE, re.I)
+TIER_NEXT = re.compile(r"(?:next|following)\s+" + AMOUNT + r"[^%$\n]{0,60}?" + RATE, re.I)
+TIER_OVER = re.compile(r"(?:over|above|in excess of|more than|greater than)\s+" + AMOUNT + r"[^%$\n]{0,60}?" + RATE, re.I)
+TIER_RANGE = re.compile(AMOUNT + r"\s*(?:-|–|to)\s*" + AMOUNT + r"[^%$\n]{0,40}?" + RATE, re.I)
+FLAT_FEE = re.compile(r"(?:annual|annualized|yearly)\s+(?:advisory|management|wrap|program)?\s*fee\s+(?:of|is|equal to)\s+"
+                      + RATE, re.I)
+AUM_RE = re.compile(r"(?:regulatory\s+)?assets\s+under\s+management\s+(?:of|totaling|totalling|were|was|is|in the amount of)?"
+                    r"\s*(?:approximately\s+)?" + AMOUNT, re.I)
+DATE_RE = re.compile(r"(?:as of|dated?|effective)\s+(January|February|March|April|May|June|July|August|September|"
+                     r"October|November|December)\s+(\d{1,2}),?\s+(\d{4})", re.I)
+TURNOVER_RE = re.compile(r"portfolio\s+turnover(?:\s+rate)?\s+(?:was|of|is|averaged)\s+(?:approximately\s+)?" + RATE, re.I)
+NO_TXN_FEE_RE = re.compile(r"(?:no|not charge any|without)\s+(?:transaction|trading)\s+(?:fees|costs|commissions)", re.I)
+TXN_FEE_RE = re.compile(r"(?:transaction|trading)\s+(?:fee|charge)s?\s+(?:of|equal to)\s+" + RATE, re.I)
+FIRM_RE = re.compile(r"^\s*([A-Z][\w.&,' -]{2,80}?(?:LLC|L\.L\.C\.|L\.P\.|LP|Inc\.?|Incorporated|Corporation|Company|N\.A\.))\s*$",
+                     re.M)
+ROBO_RE = re.compile(r"robo[- ]?advis|digital advi|automated investment|algorithm|online platform|mobile app", re.I)
+HUMAN_RE = re.compile(r"(?:access to|work with|speak with)\s+(?:a|an|your)\s+(?:dedicated\s+)?"
+                      r"(?:financial (?:advisor|planner)|investment professional|CFP)", re.I)
+TAX_FEATURES = {
+    "tax-loss harvesting": re.compile(r"tax[-\s]loss\s+harvest", re.I),
+    "tax-optimized asset location": re.compile(r"asset\s+location|tax[-\s](?:optimized|efficient)\s+placement", re.I),
+    "ETFs or index funds": re.compile(r"\bETFs?\b|exchange[-\s]traded funds?|index funds?", re.I),
+    "client-specific tax optimization": re.compile(r"tax[-\s](?:managed|sensitive|aware|optimi[sz]ation)|"
+                                                   r"tax\s+preferences", re.I),
+}
+
+
+def _amount(number, unit):
+    value = float(number.replace(",", ""))
+    return value * MULTIPLIERS.get((unit or "").lower(), 1)
+
+
+def parse_fee_tiers(text):
+    """
+    Parse a tiered fee schedule into [(lower, upper, rate %)] sorted by lower bound.
+
+    Understands "First $X … a%", "Next $Y … b%", "Over $Z … c%" and
+    "$X - $Y … a%" rows. Returns an empty list when no schedule is found.
+    """
+    tiers = []
+    for m in TIER_RANGE.finditer(text):
+        tiers.append((_amount(m.group(1), m.group(2)), _amount(m.group(3), m.group(4)), float(m.group(5))))
+    if not tiers:
+        first = TIER_FIRST.search(text)
+        if first:
+            upper = _amount(first.group(1), first.group(2))
+            tiers.append((0.0, upper, float(first.group(3))))
+            for m in TIER_NEXT.finditer(text, first.end()):
+                size = _amount(m.group(1), m.group(2))
+                tiers.append((upper, upper + size, float(m.group(3))))
+                upper += size
+            over = TIER_OVER.search(text, first.end())
+            if over:
+                tiers.append((_amount(over.group(1), over.group(2)), float("inf"), float(over.group(3))))
+    return sorted(set(tiers))
+
+
+def applicable_fee(tiers, amount=INVESTMENT):
+    """Highest rate of any tier that applies to `amount`, and the blended rate."""
+    applicable = [(lo, hi, rate) for lo, hi, rate in tiers if lo < amount]
+    if not applicable:
+        return None, None
+    charged = sum((min(hi, amount) - lo) * rate for lo, hi, rate in applicable)
+    return max(rate for _, _, rate in applicable), charged / amount
+
+
+def extract_fields(pages):
+    """
+    Rule-based extraction over page texts.
+
+    Returns:
+        tuple: (record with the `portfolios` fields, {field: confidence 0-1})
+    """
+    text = "\n".join(pages)
+    cover = "\n".join(pages[:2])
+    record = {field: None for field in FIELDS}
+    record.update(fund_name="", document_date="")
+    confidence = {field: 0.0 for field in FIELDS}
+    confidence["fund_name"] = 0.5
+    notes = []
+
+    firm = FIRM_RE.search(cover)
+    if firm:
+        record["platform_name"] = firm.group(1).strip()
+        confidence["platform_name"] = 0.75
+        notes.append(f'- Platform name "{record["platform_name"]}" matched on the cover page.')
+
+    robo_hits = len(ROBO_RE.findall(text))
+    human_hits = len(HUMAN_RE.findall(text))
+    if robo_hits >= 3:
+        record["advisor_type"] = "Hybrid" if human_hits else "Robo-advisor"
+        confidence["advisor_type"] = 0.8
+        notes.append(f"- Advisor type from {robo_hits} automated-advice mentions ({human_hits} human-advisor mentions).")
+    else:
+        record["advisor_type"] = "Traditional"
+        confidence["advisor_type"] = 0.5
+
+    tiers = parse_fee_tiers(text)
+    if len(tiers) >= 2:
+        highest, blended = applicable_fee(tiers)
+        if highest is not None and all(0 < rate <= 3 for _, _, rate in tiers):
+            record["expense_ratio"] = highest
+            confidence["expense_ratio"] = 0.9
+            notes.append(f"- Management fee {highest}% is the highest tier rate applying to $500,000 "
+                         f"(blended {blended:.3f}%) in a {len(tiers)}-tier schedule.")
+    if record["expense_ratio"] is None:
+        flat = {float(r) for r in FLAT_FEE.findall(text)}
+        if flat:
+            record["expense_ratio"] = max(flat)
+            confidence["expense_ratio"] = 0.8 if len(flat) == 1 else 0.4
+            notes.append(f"- Management fee {record['expense_ratio']}% from a stated flat annual fee.")
+
+    txn = TXN_FEE_RE.search(text)
+    if txn:
+        record["transaction_costs"] = float(txn.group(1))
+        confidence["transaction_costs"] = 0.8
+        notes.append(f"- Transaction fee {record['transaction_costs']}% stated explicitly.")
+    elif NO_TXN_FEE_RE.search(text):
+        record["transaction_costs"] = 0.0
+        confidence["transaction_costs"] = 0.7
+        notes.append("- Document states no transaction or trading fees.")
+
+    turnover = TURNOVER_RE.search(text)
+    if turnover:
+        record["turnover_rate"] = float(turnover.group(1))
+        confidence["turnover_rate"] = 0.8
+        notes.append(f"- Portfolio turnover {record['turnover_rate']}% stated explicitly.")
+
+    aum = AUM_RE.search(text)
+    if aum:
+        record["assets_under_management"] = _amount(aum.group(1), aum.group(2))
+        confidence["assets_under_management"] = 0.85
+        notes.append(f"- AUM {record['assets_under_management']:,.0f} from the assets under management statement.")
+
+    date = DATE_RE.search(cover)
+    if date:
+        parsed = datetime.strptime(f"{date.group(1)} {date.group(2)} {date.group(3)}", "%B %d %Y")
+        record["document_date"] = parsed.strftime("%Y-%m-%d")
+        confidence["document_date"] = 0.8
+        notes.append(f"- Document date {record['document_date']} from the cover page.")
+
+    # Same standardized rule as the prompt: five features, 2 points each
+    features = [name for name, pattern in TAX_FEATURES.items() if pattern.search(text)]
+    if record["turnover_rate"] is not None and record["turnover_rate"] < 50:
+        features.append("turnover rate < 50%")
+    record["tax_efficiency"] = float(min(10, 2 * len(features)))
+    # Almost every brochure mentions ETFs, and a missing feature may just be a garbled text layer,
+    # so the score is only trusted over the LLM's with at least two specific features
+    specific = len([f for f in features if f != "ETFs or index funds"])
+    confidence["tax_efficiency"] = 0.75 if specific >= 2 else 0.5 if specific == 1 else 0.3
+    notes.append(f"- Tax efficiency {record['tax_efficiency']:.0f}/10 from features: {', '.join(features) or 'none'}.")
+
+    record["extraction_notes"] = "\n".join(notes)
+    confidence["extraction_notes"] = 1.0
+    return record, confidence
+
+
+def is_resolved(confidence, threshold=CONFIDENCE_THRESHOLD):
+    """True when every required field reaches the confidence threshold."""
+    return all(confidence[field] >= threshold for field in REQUIRED_FIELDS)
+
+
+def format_response(record):
+    """Render a record in the LLM response format, so it flows through `parse_response`."""
+    def fmt(value):
+        if value is None:
+            return ""
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    return "\n".join([
+        f"Platform: {fmt(record['platform_name'])}",
+        f"Advisor Type: {fmt(record['advisor_type'])}",
+        f"Fund Name: {fmt(record['fund_name'])}",
+        f"Management Fees: {fmt(record['expense_ratio'])}",
+        f"Transaction Fees: {fmt(record['transaction_costs'])}",
+        f"AUM: {fmt(record['assets_under_management'])}",
+        f"Turnover Rate: {fmt(record['turnover_rate'])}",
+        f"Tax Efficiency: {fmt(record['tax_efficiency'])}",
+        f"Document Date: {fmt(record['document_date'])}",
+        "Notes:",
+        record["extraction_notes"] or "- Extracted by local rules.",
+    ])
+
+
+def merge_with_llm(record, confidence, llm_record, threshold=CONFIDENCE_THRESHOLD):
+    """Keep confident rule-based fields and take every other field from the LLM record."""
+    merged = dict(llm_record)
+    kept = [f for f in FIELDS if f != "extraction_notes" and confidence[f] >= threshold and record[f] not in (None, "")]
+    for field in kept:
+        merged[field] = record[field]
+    if kept:
+        merged["extraction_notes"] = (llm_record["extraction_notes"] +
+                                      f"\n- Rule-based values kept for: {', '.join(kept)}.")
+    return merged
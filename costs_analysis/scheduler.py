@@ -0,0 +1,146 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+# --- Defaults ---
+DEFAULT_WORKERS = 4
+MAX_RETRIES = 6
+BASE_DELAY = 1.0   # seconds, first backoff ceiling
+MAX_DELAY = 60.0   # seconds, backoff ceiling cap
+CHARS_PER_TOKEN = 4  # rough estimate used for token-per-minute budgeting
+
+
+def estimate_tokens(request):
+    """Rough token count of a chat-completions request body."""
+    chars = sum(len(m["content"]) for m in request["messages"])
+    return chars // CHARS_PER_TOKEN + 1
+
+
+class RateLimiter:
+    """
+    Sliding one-minute window limiter on requests and tokens.
+
+    Args:
+        rpm (int | None): Maximum requests per minute (None = unlimited).
+        tpm (int | None): Maximum tokens per minute (None = unlimited).
+    """
+    def __init__(self, rpm=None, tpm=None, clock=time.monotonic, sleep=time.sleep):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.events = deque()  # (timestamp, tokens)
+        self.tokens_in_window = 0
+
+    def _expire(self, now):
+        while self.events and now - self.events[0][0] >= 60:
+            _, tokens = self.events.popleft()
+            self.tokens_in_window -= tokens
+
+    def _wait_time(self, now, tokens):
+        """Seconds until a request of `tokens` fits in the window (0 if it fits now)."""
+        if not self.events:
+            return 0.0
+        if self.rpm and len(self.events) >= self.rpm:
+            return 60 - (now - self.events[0][0])
+        if self.tpm and self.tokens_in_window + tokens > self.tpm:
+            # Free the oldest entries until the request fits
+            freed = self.tokens_in_window
+            for ts, used in self.events:
+                freed -= used
+                if freed + tokens <= self.tpm:
+                    return 60 - (now - ts)
+        return 0.0
+
+    def acquire(self, tokens=0):
+        """Block until one request of `tokens` tokens may be sent, then record it."""
+        while True:
+            with self.lock:
+                now = self.clock()
+                self._expire(now)
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    self.events.append((now, tokens))
+                    self.tokens_in_window += tokens
+                    return
+            self.sleep(wait)
+
+
+def is_retryable(error):
+    """True for rate-limit (429), server-side (5xx) and connection errors."""
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def call_with_retry(fn, max_retries=MAX_RETRIES, base_delay=BASE_DELAY, max_delay=MAX_DELAY, sleep=time.sleep):
+    """
+    Call `fn()` and retry retryable API errors with full-jitter exponential backoff.
+
+    Args:
+        fn (callable): Zero-argument function performing the API call.
+        max_retries (int): Number of retries after the first attempt.
+        base_delay (float): Backoff ceiling for the first retry, doubled each time.
+        max_delay (float): Upper bound on the backoff ceiling.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            print(f"⚠️ Retryable error ({type(e).__name__}), retrying in {delay:.1f}s...")
+            sleep(delay)
+
+
+def extract_concurrently(extractors, llm_client, workers=DEFAULT_WORKERS, rpm=None, tpm=None):
+    """
+    Run `get_fee_structure` for many filings on a bounded worker pool.
+
+    Results are yielded in the same order as `extractors`, so the caller can stay
+    the single writer to the database. Failed extractions yield the exception
+    instead of a response.
+
+    Args:
+        extractors (list[ADVExtractor]): Filings to process.
+        llm_client (openai.OpenAI): Client to use. Point `base_url` (or the
+            OPENAI_BASE_URL environment variable) at a local stub to test offline.
+        workers (int): Maximum number of requests in flight.
+        rpm (int | None): Requests-per-minute limit.
+        tpm (int | None): Tokens-per-minute limit.
+
+    Yields:
+        tuple: (extractor, response text or Exception)
+    """
+    limiter = RateLimiter(rpm=rpm, tpm=tpm)
+    # Retries are handled here, with jitter, so disable the SDK's own retry loop
+    llm_client = llm_client.with_options(max_retries=0)
+
+    def call(send, request):
+        tokens = estimate_tokens(request)
+
+        def limited_send():
+            limiter.acquire(tokens)
+            return send()
+
+        return call_with_retry(limited_send)
+
+    def run(extractor):
+        # Cache hits return before `call` is reached, so they cost no rate budget
+        return extractor.get_fee_structure(llm_client, call=call)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run, extractor) for extractor in extractors]
+        for extractor, future in zip(extractors, futures):
+            try:
+                yield extractor, future.result()
+            except Exception as e:
+                yield extractor, e
@@ -0,0 +1,247 @@
+"""
+Out-of-core group statistics for the cost analysis.
+
+Reads `portfolios_reprocessed` in chunks with only the needed columns and
+produces the same tables as the in-memory path of analysis.py.
+
+Tolerances against the in-memory results:
+- mean, std (ddof=1) and count: exact up to floating-point rounding
+  (Welford updates merged with Chan's formula, relative error ~1e-12).
+- median: exact while a group has fewer than `k` values (default 200);
+  beyond that the KLL sketch's rank error is about 1.7/k (under 1% of n).
+- Mann–Whitney U: exact (ranks come from a sorted SQLite scan, ties
+  averaged as in scipy).
+- p-value: normal approximation with tie and continuity correction, which is
+  what scipy uses whenever a group has more than 8 values or there are ties.
+  For two tiny tie-free groups scipy uses the exact distribution instead.
+"""
+import math
+import os
+import random
+import statistics
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage
+
+AUTOMATED = ["Robo-advisor", "Hybrid"]
+# Output label -> SQL column (Log AUM is log1p of AUM; ranks are unchanged by it)
+VARIABLES = {
+    "Expense Ratio": "expense_ratio",
+    "Transaction Costs": "transaction_costs",
+    "Tax Efficiency": "tax_efficiency",
+    "Log AUM": "assets_under_management",
+}
+GROUP_SQL = ("CASE WHEN advisor_type IN ('Robo-advisor', 'Hybrid') "
+             "THEN 'Automated' ELSE 'Traditional' END")
+FILTER_SQL = "(excluded IS NULL OR excluded = 0)"
+
+
+def cost_rates(df):
+    """
+    Annual management fee and trading cost rates (fractions) of cost records.
+
+    `transaction_costs` is a cost per traded amount, so it is scaled by
+    `turnover_rate`; missing turnover or transaction costs count as zero.
+    The cost models of fee_drag.py and backtest.py both use this.
+
+    Returns:
+        tuple: (fee, trading) Series aligned with `df`.
+    """
+    fee = df["expense_ratio"] / 100
+    trading = (df["turnover_rate"].fillna(0) / 100) * (df["transaction_costs"].fillna(0) / 100)
+    return fee, trading
+
+
+class Welford:
+    """Running count, mean and sum of squared deviations; mergeable."""
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        """Fold in a batch of values (merged as one block)."""
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return
+        other = Welford()
+        other.n = values.size
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        self.merge(other)
+
+    def merge(self, other):
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta ** 2 * self.n * other.n / n
+        self.n = n
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else float("nan")
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch: a stack of compactors where level h items weigh 2^h.
+
+    Exact while fewer than `k` values have been added.
+    """
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.n = 0
+        self.compactors = [[]]
+        self.rng = random.Random(seed)
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def update(self, values):
+        values = [float(v) for v in values]
+        self.compactors[0].extend(values)
+        self.n += len(values)
+        self._compress()
+
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.n += other.n
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.compactors):
+            if len(self.compactors[level]) >= self._capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+                items = sorted(self.compactors[level])
+                leftover = [items.pop()] if len(items) % 2 else []
+                # Keep every other item (random offset), each now weighing double
+                self.compactors[level + 1].extend(items[self.rng.random() < 0.5::2])
+                self.compactors[level] = leftover
+            level += 1
+
+    def quantile(self, q):
+        if self.n == 0:
+            return float("nan")
+        if len(self.compactors) == 1:
+            return float(np.quantile(self.compactors[0], q))
+        weighted = sorted((x, 2 ** level) for level, items in enumerate(self.compactors) for x in items)
+        target = q * sum(w for _, w in weighted)
+        cumulative = 0
+        for x, w in weighted:
+            cumulative += w
+            if cumulative >= target:
+                return x
+        return weighted[-1][0]
+
+    def median(self):
+        if len(self.compactors) == 1 and self.n:
+            return float(statistics.median(self.compactors[0]))
+        return self.quantile(0.5)
+
+
+def streaming_summary(table="portfolios_reprocessed", conn=None, chunksize=50_000, k=200):
+    """
+    Per-group mean/std/median/count, reading the table in column-projected chunks.
+
+    Returns:
+        pd.DataFrame: Same layout as `df.groupby("advisor_group")[vars].agg(["mean", "std", "median", "count"])`.
+    """
+    conn = conn or storage.connect(readonly=True)
+    accumulators = {}
+    chunks = storage.select(table, ["advisor_type"] + list(VARIABLES.values()),
+                            where=FILTER_SQL, conn=conn, chunksize=chunksize)
+    for chunk in chunks:
+        groups = np.where(chunk["advisor_type"].isin(AUTOMATED), "Automated", "Traditional")
+        for label, column in VARIABLES.items():
+            values = chunk[column].astype(float)
+            if label == "Log AUM":
+                values = np.log1p(values)
+            for group in np.unique(groups):
+                selected = values[groups == group].dropna().to_numpy()
+                welford, sketch = accumulators.setdefault((group, label), (Welford(), KLLSketch(k=k)))
+                welford.update(selected)
+                sketch.update(selected)
+
+    rows = {}
+    for (group, label), (welford, sketch) in accumulators.items():
+        row = rows.setdefault(group, {})
+        row[(label, "mean")] = welford.mean if welford.n else float("nan")
+        row[(label, "std")] = welford.std
+        row[(label, "median")] = sketch.median()
+        row[(label, "count")] = welford.n
+    summary = pd.DataFrame.from_dict(rows, orient="index").sort_index()
+    summary = summary[[(label, stat) for label in VARIABLES for stat in ["mean", "std", "median", "count"]]]
+    summary.columns = pd.MultiIndex.from_tuples(summary.columns)
+    summary.index.name = "advisor_group"
+    return summary
+
+
+def streaming_mannwhitney(column, table="portfolios_reprocessed", conn=None):
+    """
+    Two-sided Mann–Whitney U (Automated vs Traditional) from one sorted scan.
+
+    SQLite sorts the values (spilling to disk if needed); ranks, tie groups
+    and the rank sum of the first group are accumulated while streaming.
+
+    Returns:
+        tuple: (U statistic of the Automated group, p-value)
+    """
+    conn = conn or storage.connect(readonly=True)
+    query = (f"SELECT {column}, {GROUP_SQL} = 'Automated' FROM {table} "
+             f"WHERE {FILTER_SQL} AND {column} IS NOT NULL ORDER BY {column}")
+    n = n1 = 0
+    rank_sum1 = 0.0
+    tie_term = 0.0
+    current, tie_size, tie_in_1 = None, 0, 0
+
+    def close_tie():
+        nonlocal rank_sum1, tie_term
+        # Tied values share the average of ranks n - tie_size + 1 .. n
+        rank_sum1 += tie_in_1 * (n - (tie_size - 1) / 2)
+        tie_term += tie_size ** 3 - tie_size
+
+    for value, is_auto in storage.iter_rows(query, conn=conn):
+        if tie_size and value != current:
+            close_tie()
+            tie_size = tie_in_1 = 0
+        current = value
+        n += 1
+        tie_size += 1
+        n1 += is_auto
+        tie_in_1 += is_auto
+    if tie_size:
+        close_tie()
+
+    n2 = n - n1
+    if n1 == 0 or n2 == 0:
+        return float("nan"), float("nan")
+    u1 = rank_sum1 - n1 * (n1 + 1) / 2
+    mu = n1 * n2 / 2
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+    u = max(u1, n1 * n2 - u1)
+    p = 2 * norm.sf((u - mu - 0.5) / sigma) if sigma > 0 else 1.0
+    return u1, min(p, 1.0)
+
+
+def streaming_tests(table="portfolios_reprocessed", conn=None):
+    """Mann–Whitney results table in the same layout as analysis.py."""
+    results = {}
+    for label, column in VARIABLES.items():
+        stat, pval = streaming_mannwhitney(column, table=table, conn=conn)
+        results[label] = {"U-statistic": stat, "p-value": pval}
+    results_df = pd.DataFrame(results).T
+    results_df.index.name = "Variable"
+    return results_df
@@ -0,0 +1,82 @@
+"""
+Local stand-in for the chat-completions endpoint, for testing the extraction
+pipeline without network access or API costs.
+
+Usage:
+    python stub_llm_server.py --port 8765 --fail-rate 0.2
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python main.py --workers 8 --rpm 120
+"""
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Canned extraction response (same format as the real prompt asks for) ---
+STUB_RESPONSE = """Platform: Stub Advisers, LLC
+Advisor Type: Robo-advisor
+Fund Name:
+Management Fees: 0.25
+Transaction Fees: 0
+AUM: 1000000
+Turnover Rate:
+Tax Efficiency: 6
+Document Date: 2025-03-31
+Notes:
+- Stub response generated locally."""
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    fail_rate = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.latency)
+
+        # Simulate rate limiting and server errors so retries get exercised
+        if random.random() < self.fail_rate:
+            status = random.choice([429, 500, 503])
+            self._send(status, {"error": {"message": "stub failure", "type": "stub", "code": status}})
+            return
+
+        prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+        self._send(200, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": STUB_RESPONSE},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": prompt_chars // 4, "completion_tokens": 60,
+                      "total_tokens": prompt_chars // 4 + 60}
+        })
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local chat-completions stub.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 429/5xx")
+    args = parser.parse_args()
+
+    StubHandler.latency = args.latency
+    StubHandler.fail_rate = args.fail_rate
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StubHandler)
+    print(f"🧪 Stub LLM listening on http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
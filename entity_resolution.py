@@ -0,0 +1,314 @@
+"""
+Fuzzy linking of performance funds (`performance_mutual_funds`) to cost
+records (`portfolios_reprocessed`), which share no key.
+
+Names are normalized first:
+- case, accents and trademark signs are folded;
+- punctuation becomes spaces, "&" becomes "and", and runs of single
+  letters are joined ("J.P. Morgan" -> "jp morgan");
+- legal suffixes and generic words such as "advisers" or "fund" are dropped;
+- trailing share-class tokens are dropped ("Balanced Investor A" -> "balanced").
+
+Each name is then a TF-IDF vector of word-padded character trigrams. The
+index keeps a gram x name posting matrix, i.e. a character n-gram inverted
+index. Grams found in more than MAX_DF of the names are left out, so a query
+only meets names that share a reasonably rare gram. The cosine similarities
+of a whole batch of queries are a single sparse product over those postings,
+so the work grows with shared grams rather than with n x m.
+
+Every cost record is indexed under its platform name and its fund name.
+A name only counts when its brand (first normalized token, or the first two
+joined: "jp morgan" -> "jpmorgan") matches the fund's, so "Morgan Stanley"
+never lands on "J.P. Morgan". A record scores the better of its names. Ties
+between records are broken by the fund-name score, then in favour of
+traditional advisers; records still tied are reported as ambiguous and left
+unmatched. The best record per ticker is persisted in `fund_cost_map`. Rows
+in `fund_cost_overrides` always win, and a NULL portfolio_id there means
+"no match".
+
+Usage:
+    python entity_resolution.py resolve
+    python entity_resolution.py override SWOBX RA_1746368732 --note "Charles Schwab, brand not leading"
+    python entity_resolution.py show
+"""
+import argparse
+import re
+import time
+import unicodedata
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import storage
+
+# --- Configuration ---
+N = 3            # characters per gram
+MAX_DF = 0.2     # grams in more than this share of indexed names do not generate candidates
+MIN_SCORE = 0.4  # cosine similarity needed to record a match (below it, use an override)
+LEGAL_SUFFIXES = {"inc", "incorporated", "llc", "lp", "llp", "ltd", "co", "corp", "corporation", "company",
+                  "plc", "sa", "ag", "na"}
+GENERIC_WORDS = {"the", "and", "of", "fund", "funds", "trust", "advisers", "advisors", "advisory", "management",
+                 "investment", "investments", "services", "financial", "group", "associates", "wealth"}
+SHARE_CLASSES = {"a", "b", "c", "d", "i", "k", "l", "m", "p", "r", "t", "y", "z", "inv", "investor", "admiral",
+                 "institutional", "inst", "adv", "retail", "class", "shares"}
+EMPTY_NAMES = {"", "0", "none", "n a"}
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_name(name):
+    """Canonical form of a fund, platform or firm name ("" when nothing is left)."""
+    if name is None or (isinstance(name, float) and np.isnan(name)):
+        return ""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode().lower().replace("&", " and ")
+    tokens = TOKEN_RE.findall(text)
+    if " ".join(tokens) in EMPTY_NAMES:
+        return ""
+
+    joined, previous_single = [], False
+    for token in tokens:
+        # Runs of single letters are initials: "j p morgan" -> "jp morgan"
+        single = len(token) == 1 and token.isalpha()
+        if single and previous_single:
+            joined[-1] += token
+        else:
+            joined.append(token)
+        previous_single = single
+    tokens = [t for t in joined if t not in LEGAL_SUFFIXES and t not in GENERIC_WORDS]
+    while len(tokens) > 1 and tokens[-1] in SHARE_CLASSES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def ngrams(name, n=N):
+    """Character n-grams of each word, padded with spaces at both ends."""
+    grams = []
+    for word in name.split():
+        padded = f" {word} "
+        grams.extend(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+    return grams
+
+
+class NgramIndex:
+    """Inverted character n-gram index with TF-IDF cosine scoring."""
+    def __init__(self, names, n=N, max_df=MAX_DF):
+        self.n = n
+        self.names = [normalize_name(name) for name in names]
+        self.vocabulary = {}
+        counts = self._counts(self.names, grow=True)
+        df = np.bincount(counts.indices, minlength=len(self.vocabulary))
+        self.idf = np.log((1 + len(self.names)) / (1 + df)) + 1
+        # Over-common grams neither block nor score
+        self.idf[df > max(1, max_df * len(self.names))] = 0.0
+        self.postings = self._weights(counts).T.tocsr()  # gram x name
+
+    def _counts(self, names, grow=False):
+        rows, cols = [], []
+        for i, name in enumerate(names):
+            for gram in ngrams(name, self.n):
+                j = self.vocabulary.get(gram)
+                if j is None and grow:
+                    j = self.vocabulary[gram] = len(self.vocabulary)
+                if j is not None:
+                    rows.append(i)
+                    cols.append(j)
+        counts = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(names), len(self.vocabulary)))
+        counts.data[:] = 1.0  # presence, not frequency: repeated words in long lists do not dominate
+        return counts
+
+    def _weights(self, counts):
+        weighted = counts.multiply(self.idf[None, :]).tocsr()
+        norms = np.sqrt(weighted.multiply(weighted).sum(axis=1)).A1
+        norms[norms == 0] = 1.0
+        return sparse.diags(1 / norms) @ weighted
+
+    def query(self, names, min_score=MIN_SCORE):
+        """
+        Cosine similarity of each query name to every indexed name sharing a gram.
+
+        Returns:
+            pd.DataFrame: query, candidate (positions), score >= min_score.
+        """
+        queries = self._weights(self._counts([normalize_name(name) for name in names]))
+        scores = (queries @ self.postings).tocoo()
+        keep = scores.data >= min_score
+        return pd.DataFrame({"query": scores.row[keep], "candidate": scores.col[keep], "score": scores.data[keep]})
+
+
+def brand_keys(normalized):
+    """Brand forms of a normalized name: its first token and its first two tokens joined."""
+    tokens = normalized.split()
+    return {tokens[0], "".join(tokens[:2])} if tokens else set()
+
+
+def cost_documents(records):
+    """One indexed name per platform name and per fund name of each cost record."""
+    docs = pd.concat([
+        pd.DataFrame({"portfolio_id": records["portfolio_id"], "name": records["platform_name"], "field": "platform"}),
+        pd.DataFrame({"portfolio_id": records["portfolio_id"], "name": records["fund_name"], "field": "fund"}),
+    ], ignore_index=True)
+    docs["normalized"] = docs["name"].map(normalize_name)
+    return docs[docs["normalized"] != ""].reset_index(drop=True)
+
+
+def resolve(funds, records, min_score=MIN_SCORE):
+    """
+    Best cost record for each fund.
+
+    Args:
+        funds (pd.DataFrame): Ticker and Name columns.
+        records (pd.DataFrame): portfolio_id, platform_name, fund_name and
+            (optionally) advisor_type columns.
+
+    Returns:
+        pd.DataFrame: Ticker, portfolio_id, score, ambiguous (the tied
+        portfolio_ids, comma-separated, with portfolio_id None; "" otherwise).
+        Funds without a brand-matching candidate above `min_score` are left out.
+    """
+    columns = ["Ticker", "portfolio_id", "score", "ambiguous"]
+    docs = cost_documents(records)
+    index = NgramIndex(docs["name"])
+    hits = index.query(funds["Name"].tolist(), min_score)
+    fund_brands = [brand_keys(normalize_name(name)) for name in funds["Name"]]
+    doc_brands = [brand_keys(name) for name in docs["normalized"]]
+    hits = hits[[bool(fund_brands[q] & doc_brands[c]) for q, c in zip(hits["query"], hits["candidate"])]]
+    if hits.empty:
+        return pd.DataFrame(columns=columns)
+    hits["Ticker"] = funds["Ticker"].to_numpy()[hits["query"]]
+    hits["portfolio_id"] = docs["portfolio_id"].to_numpy()[hits["candidate"]]
+    hits["fund_score"] = np.where(docs["field"].to_numpy()[hits["candidate"]] == "fund", hits["score"], 0.0)
+
+    # One row per (fund, record): its best name and its fund-name score
+    pairs = hits.groupby(["Ticker", "portfolio_id"], as_index=False)[["score", "fund_score"]].max()
+    advisor_types = records.drop_duplicates("portfolio_id").set_index("portfolio_id").get("advisor_type")
+    types = pairs["portfolio_id"].map(advisor_types) if advisor_types is not None else pd.Series("", index=pairs.index)
+    pairs["traditional"] = (types == "Traditional").astype(int)
+    keys = ["score", "fund_score", "traditional"]
+    pairs[keys[:2]] = pairs[keys[:2]].round(9)  # same name, same score: compare without float noise
+    pairs = pairs.sort_values(["Ticker"] + keys + ["portfolio_id"], ascending=[True, False, False, False, True])
+
+    rows = []
+    for ticker, group in pairs.groupby("Ticker", sort=False):
+        best = group.iloc[0]
+        tied = group[(group[keys] == best[keys]).all(axis=1)]["portfolio_id"].tolist()
+        rows.append({"Ticker": ticker, "portfolio_id": None if len(tied) > 1 else best["portfolio_id"],
+                     "score": best["score"], "ambiguous": ", ".join(tied) if len(tied) > 1 else ""})
+    return pd.DataFrame(rows, columns=columns)
+
+
+def ensure_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS fund_cost_map (
+            ticker TEXT PRIMARY KEY,
+            portfolio_id TEXT,
+            score REAL,
+            method TEXT NOT NULL,
+            matched_at REAL NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS fund_cost_overrides (
+            ticker TEXT PRIMARY KEY,
+            portfolio_id TEXT,
+            note TEXT,
+            created_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_fund_cost_map_portfolio ON fund_cost_map(portfolio_id)")
+    conn.commit()
+
+
+def build_mapping(conn=None, min_score=MIN_SCORE):
+    """Resolve every performance fund and rewrite `fund_cost_map` (ambiguous ties unmatched). Returns the mapping."""
+    conn = conn or storage.connect()
+    ensure_tables(conn)
+    funds = storage.select("performance_mutual_funds", ["Ticker", "Name"], conn=conn)
+    records = storage.select("portfolios_reprocessed", ["portfolio_id", "platform_name", "fund_name", "advisor_type"],
+                             where="excluded IS NULL OR excluded = 0", conn=conn)
+    now = time.time()
+    mapping = resolve(funds, records, min_score)
+    mapping["method"] = np.where(mapping["ambiguous"] != "", "ambiguous", "auto")
+    overridden = set(pd.read_sql_query("SELECT ticker FROM fund_cost_overrides", conn)["ticker"])
+    for ticker, tied in mapping.loc[mapping["ambiguous"] != "", ["Ticker", "ambiguous"]].itertuples(index=False):
+        if ticker not in overridden:
+            print(f"⚠️ {ticker}: equally good cost records {tied}; left unmatched (pin one with `override`)")
+
+    overrides = pd.read_sql_query("SELECT ticker AS Ticker, portfolio_id FROM fund_cost_overrides", conn)
+    overrides["score"] = np.nan
+    overrides["method"] = "override"
+    mapping = pd.concat([mapping[~mapping["Ticker"].isin(overrides["Ticker"])], overrides], ignore_index=True)
+
+    with conn:
+        conn.execute("DELETE FROM fund_cost_map")
+        conn.executemany(
+            "INSERT INTO fund_cost_map (ticker, portfolio_id, score, method, matched_at) VALUES (?, ?, ?, ?, ?)",
+            [(t, None if pd.isna(p) else p, None if pd.isna(s) else float(s), m, now)
+             for t, p, s, m in mapping[["Ticker", "portfolio_id", "score", "method"]].itertuples(index=False)])
+    return mapping
+
+
+def set_override(ticker, portfolio_id, note=None, conn=None):
+    """Pin `ticker` to a cost record (or to no record when `portfolio_id` is None)."""
+    conn = conn or storage.connect()
+    ensure_tables(conn)
+    with conn:
+        conn.execute("""
+            INSERT INTO fund_cost_overrides (ticker, portfolio_id, note, created_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(ticker) DO UPDATE SET portfolio_id = excluded.portfolio_id, note = excluded.note,
+                created_at = excluded.created_at
+        """, (ticker, portfolio_id, note, time.time()))
+        conn.execute("""
+            INSERT INTO fund_cost_map (ticker, portfolio_id, score, method, matched_at) VALUES (?, ?, NULL, 'override', ?)
+            ON CONFLICT(ticker) DO UPDATE SET portfolio_id = excluded.portfolio_id, score = NULL,
+                method = 'override', matched_at = excluded.matched_at
+        """, (ticker, portfolio_id, time.time()))
+
+
+def fund_costs(tickers=None, conn=None):
+    """
+    Cost record matched to each ticker (an indexed join through `fund_cost_map`).
+
+    Returns:
+        pd.DataFrame: Ticker, Platform, Portfolio ID, Match Score, Match Method and the cost columns.
+    """
+    conn = conn or storage.connect(readonly=True)
+    query = """
+        SELECT m.ticker AS Ticker, r.platform_name AS Platform, m.portfolio_id AS "Portfolio ID",
+               m.score AS "Match Score", m.method AS "Match Method",
+               r.advisor_type, r.expense_ratio, r.transaction_costs, r.turnover_rate, r.tax_efficiency
+        FROM fund_cost_map m
+        LEFT JOIN portfolios_reprocessed r ON r.portfolio_id = m.portfolio_id
+    """
+    params = ()
+    if tickers is not None:
+        tickers = list(tickers)
+        query += f" WHERE m.ticker IN ({', '.join('?' for _ in tickers)})"
+        params = tickers
+    return pd.read_sql_query(query, conn, params=params)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Link performance funds to cost records.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    res = sub.add_parser("resolve", help="Rebuild fund_cost_map from names (overrides kept)")
+    res.add_argument("--min-score", type=float, default=MIN_SCORE)
+    ovr = sub.add_parser("override", help="Pin a ticker to a portfolio_id ('none' = no match)")
+    ovr.add_argument("ticker")
+    ovr.add_argument("portfolio_id")
+    ovr.add_argument("--note", default=None)
+    sub.add_parser("show", help="Print the current mapping with platform names")
+    args = parser.parse_args()
+
+    conn = storage.connect()
+    ensure_tables(conn)
+    if args.command == "resolve":
+        start = time.perf_counter()
+        mapping = build_mapping(conn, args.min_score)
+        print(f"🔗 Matched {mapping['portfolio_id'].notna().sum()} funds "
+              f"({(mapping['method'] == 'override').sum()} overrides) in {time.perf_counter() - start:.3f}s")
+    elif args.command == "override":
+        set_override(args.ticker, None if args.portfolio_id.lower() == "none" else args.portfolio_id, args.note, conn)
+        print(f"📌 {args.ticker} -> {args.portfolio_id}")
+    else:
+        print(fund_costs(conn=conn)[["Ticker", "Platform", "Portfolio ID", "Match Score", "Match Method"]]
+              .to_string(index=False))
@@ -0,0 +1,136 @@
+"""
+Shared figure styling and incremental, parallel rendering for the analysis plots.
+
+Each figure is described up front by a spec (a plain dict holding the data
+slice it plots and its labels). Specs are hashed together with the shared
+style, and a figure is only re-rendered when that hash differs from the one
+recorded in the manifest for its output path.
+
+Spec keys:
+    path (str): Output PNG.
+    kind (str): Seaborn function, e.g. "boxplot" or "barplot".
+    data (pd.DataFrame): Only the columns the figure plots.
+    plot (dict): Keyword arguments for the seaborn call (x, y, hue, palette, ...).
+    title, ylabel (str); figsize (tuple); title_size (int);
+    xticks, yticks, legend (dict | None): kwargs for plt.xticks/yticks/legend.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")  # Use non-interactive backend for compatibility
+import matplotlib.pyplot as plt
+import pandas as pd
+import seaborn as sns
+
+MANIFEST_PATH = "results/figure_manifest.json"
+DPI = 300
+
+# Times New Roman, black axes, greyscale palettes: the look of every thesis figure
+STYLE = {
+    "axes.edgecolor": "black",
+    "axes.linewidth": 1.2,
+    "xtick.color": "black",
+    "ytick.color": "black",
+    "font.family": "Times New Roman",
+}
+GREYS = ["#444444", "#888888"]
+BLACK_WHITE = {"Automated": "black", "Traditional": "white"}
+
+# Bump when the rendering code changes in a way that alters output
+RENDER_VERSION = 1
+
+
+def apply_style():
+    sns.set(style="whitegrid")
+    plt.rcParams.update(STYLE)
+
+
+def spec_hash(spec):
+    """Hash of a figure's data slice, options and the shared style."""
+    h = hashlib.sha256()
+    data = spec["data"]
+    h.update(json.dumps([str(c) for c in data.columns]).encode())
+    h.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    options = {k: v for k, v in spec.items() if k not in ("data", "path")}
+    h.update(json.dumps([options, STYLE, DPI, RENDER_VERSION], sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def render_figure(spec):
+    """Render one spec to its PNG. Returns the seconds it took."""
+    start = time.perf_counter()
+    apply_style()
+    plt.figure(figsize=spec.get("figsize", (8, 5)))
+    getattr(sns, spec["kind"])(data=spec["data"], **spec["plot"])
+    plt.title(spec["title"], fontsize=spec.get("title_size", 14))
+    plt.ylabel(spec["ylabel"], fontsize=12)
+    plt.xlabel("")
+    plt.xticks(**(spec.get("xticks") or {}))
+    plt.yticks(**(spec.get("yticks") or {}))
+    if spec.get("legend"):
+        plt.legend(**spec["legend"])
+    plt.tight_layout()
+    os.makedirs(os.path.dirname(spec["path"]) or ".", exist_ok=True)
+    plt.savefig(spec["path"], dpi=DPI)
+    plt.close()
+    return time.perf_counter() - start
+
+
+def _load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(path, manifest):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def render_figures(specs, manifest_path=MANIFEST_PATH, workers=None, force=False):
+    """
+    Render every spec whose hash changed since the last run, in a process pool.
+
+    Args:
+        specs (list[dict]): Figure specs (see module docstring).
+        manifest_path (str): JSON file mapping output path -> hash of its last render.
+        workers (int | None): Worker processes (default: all cores; 1 = in-process).
+        force (bool): Re-render everything.
+
+    Returns:
+        dict: Counts of rendered and skipped figures.
+    """
+    manifest = _load_manifest(manifest_path)
+    hashes = [spec_hash(spec) for spec in specs]
+    todo = [(spec, h) for spec, h in zip(specs, hashes)
+            if force or manifest.get(spec["path"], {}).get("hash") != h or not os.path.exists(spec["path"])]
+
+    start = time.perf_counter()
+    # The analysis scripts run at module level, so workers must be forked:
+    # "spawn" would re-import (and re-run) the calling script in every worker.
+    can_fork = "fork" in multiprocessing.get_all_start_methods()
+    if workers == 1 or len(todo) <= 1 or not can_fork:
+        durations = [render_figure(spec) for spec, _ in todo]
+    else:
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            durations = list(executor.map(render_figure, [spec for spec, _ in todo]))
+
+    for (spec, h), seconds in zip(todo, durations):
+        manifest[spec["path"]] = {"hash": h, "seconds": round(seconds, 3), "rendered_at": time.time()}
+        print(f"Plot saved: {spec['path']} ({seconds:.2f}s)")
+    _save_manifest(manifest_path, manifest)
+
+    counts = {"rendered": len(todo), "skipped": len(specs) - len(todo)}
+    print(f"🖼️ Figures: {counts['rendered']} rendered, {counts['skipped']} unchanged "
+          f"in {time.perf_counter() - start:.1f}s")
+    return counts
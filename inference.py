@@ -0,0 +1,145 @@
+"""
+Vectorized bootstrap and permutation inference for two-group comparisons.
+
+Every resample is a row of a weight matrix over the observations (bootstrap
+counts, or 0/1 labels for a permutation), so the group sums behind the mean
+difference and Welch's t for all metrics are one matrix product per chunk of
+resamples. Mann–Whitney U uses weighted cumulative sums over each metric's
+sorted values, so no per-resample ranking is needed. Missing values are
+dropped per metric, as `dropna()` does in the analysis scripts.
+
+The Mann–Whitney statistic is reported on the U / (n1 * n2) scale (the
+probability that an Automated value exceeds a Traditional one, ties counted
+as half). That scale does not depend on the group sizes, so it stays
+comparable across bootstrap resamples.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+STATISTICS = ["mean_diff", "welch_t", "mwu_auc"]
+NULL_VALUE = {"mean_diff": 0.0, "welch_t": 0.0, "mwu_auc": 0.5}
+MAX_CELLS = 5_000_000  # resamples x observations per weight matrix (~40 MB)
+
+
+def _prepare(df, group_col, metrics, group_a, group_b):
+    sub = df[df[group_col].isin([group_a, group_b])]
+    X = sub[metrics].to_numpy(dtype=float)
+    valid = ~np.isnan(X)
+    # Centre each metric: differences are unchanged and variances lose less precision
+    X = np.where(valid, X - np.nanmean(X, axis=0), 0.0)
+    sorted_info = []
+    for j in range(X.shape[1]):
+        rows = np.flatnonzero(valid[:, j])
+        order = rows[np.argsort(X[rows, j], kind="stable")]
+        values = X[order, j]
+        sorted_info.append((order, np.searchsorted(values, values, "left"), np.searchsorted(values, values, "right")))
+    is_a = (sub[group_col] == group_a).to_numpy()
+    return (X, valid.astype(float), sorted_info), is_a
+
+
+def _statistics(W1, W2, data):
+    """All statistics for every resample (row of W1/W2) and every metric."""
+    X, valid, sorted_info = data
+    n1, n2 = W1 @ valid, W2 @ valid
+    with np.errstate(divide="ignore", invalid="ignore"):
+        m1, m2 = (W1 @ X) / n1, (W2 @ X) / n2
+        v1 = ((W1 @ X ** 2) - n1 * m1 ** 2) / (n1 - 1)
+        v2 = ((W2 @ X ** 2) - n2 * m2 ** 2) / (n2 - 1)
+        diff = m1 - m2
+        welch = diff / np.sqrt(v1 / n1 + v2 / n2)
+        auc = np.empty_like(diff)
+        for j, (order, lo, hi) in enumerate(sorted_info):
+            w1, w2 = W1[:, order], W2[:, order]
+            cum = np.zeros((w2.shape[0], len(order) + 1))
+            np.cumsum(w2, axis=1, out=cum[:, 1:])
+            # Weight of group-2 values below (plus half of those equal to) each value
+            below = cum[:, lo] + 0.5 * (cum[:, hi] - cum[:, lo])
+            auc[:, j] = (w1 * below).sum(axis=1) / (n1[:, j] * n2[:, j])
+    return {"mean_diff": diff, "welch_t": welch, "mwu_auc": auc}
+
+
+def _bootstrap_weights(rng, rows, n, size):
+    """Resample `rows` with replacement `size` times, as a (size, n) count matrix."""
+    picks = rows[rng.integers(0, len(rows), size=(size, len(rows)))]
+    flat = (picks + n * np.arange(size)[:, None]).ravel()
+    return np.bincount(flat, minlength=size * n).reshape(size, n).astype(float)
+
+
+def _resample_chunk(task):
+    kind, seed, size, data, is_a = task
+    rng = np.random.default_rng(seed)
+    if kind == "permutation":
+        W1 = rng.permuted(np.tile(is_a.astype(float), (size, 1)), axis=1)
+        W2 = 1.0 - W1
+    else:
+        n = len(is_a)
+        W1 = _bootstrap_weights(rng, np.flatnonzero(is_a), n, size)
+        W2 = _bootstrap_weights(rng, np.flatnonzero(~is_a), n, size)
+    return kind, _statistics(W1, W2, data)
+
+
+def resampling_tests(df, group_col, metrics, group_a="Automated", group_b="Traditional",
+                     n_resamples=10_000, alpha=0.05, seed=0, chunk_size=10_000, workers=1):
+    """
+    Bootstrap confidence intervals and permutation p-values for each metric.
+
+    Bootstrap resamples each group with replacement (percentile intervals);
+    permutations shuffle the group labels across all rows at once. Resamples
+    are drawn in chunks, each from its own child of `seed`, so results do not
+    depend on `workers`.
+
+    Args:
+        df (pd.DataFrame): One row per observation.
+        group_col (str): Column holding the group label.
+        metrics (list[str]): Columns to compare.
+        n_resamples (int): Resamples for each of bootstrap and permutation.
+        alpha (float): Confidence intervals cover 1 - alpha.
+        seed (int): Seed for reproducibility.
+        chunk_size (int): Resamples per vectorized pass (capped by MAX_CELLS).
+        workers (int): Processes to spread chunks over.
+
+    Returns:
+        pd.DataFrame: One row per (metric, statistic) with the observed value,
+        bootstrap CI bounds and the two-sided permutation p-value.
+    """
+    data, is_a = _prepare(df, group_col, metrics, group_a, group_b)
+    observed = _statistics(is_a[None].astype(float), (~is_a)[None].astype(float), data)
+
+    chunk_size = max(1, min(chunk_size, MAX_CELLS // max(len(is_a), 1)))
+    sizes = [min(chunk_size, n_resamples - i) for i in range(0, n_resamples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(2 * len(sizes))
+    tasks = [(kind, seeds[k * len(sizes) + i], size, data, is_a)
+             for k, kind in enumerate(["bootstrap", "permutation"]) for i, size in enumerate(sizes)]
+
+    # The analysis scripts run at module level, so workers must be forked
+    if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as executor:
+            parts = list(executor.map(_resample_chunk, tasks))
+    else:
+        parts = [_resample_chunk(task) for task in tasks]
+    draws = {kind: {stat: np.concatenate([p[stat] for k, p in parts if k == kind]) for stat in STATISTICS}
+             for kind in ("bootstrap", "permutation")}
+
+    rows = []
+    for j, metric in enumerate(metrics):
+        for stat in STATISTICS:
+            obs = observed[stat][0, j]
+            boot = draws["bootstrap"][stat][:, j]
+            boot = boot[np.isfinite(boot)]
+            perm = draws["permutation"][stat][:, j]
+            perm = perm[np.isfinite(perm)]
+            deviation = abs(obs - NULL_VALUE[stat])
+            extreme = np.abs(perm - NULL_VALUE[stat]) >= deviation * (1 - 1e-12)
+            low, high = np.quantile(boot, [alpha / 2, 1 - alpha / 2]) if boot.size else (np.nan, np.nan)
+            rows.append({
+                "Metric": metric,
+                "Statistic": stat,
+                "Observed": obs,
+                f"CI {1 - alpha:.0%} Low": low,
+                f"CI {1 - alpha:.0%} High": high,
+                "Permutation p-value": (1 + extreme.sum()) / (perm.size + 1) if np.isfinite(obs) else np.nan,
+            })
+    return pd.DataFrame(rows)
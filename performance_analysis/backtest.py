@@ -0,0 +1,202 @@
+"""
+Fee-aware backtest of every (platform, fund) pair over the monthly return history.
+
+Each pair holds one traditional fund on one platform's fee schedule from
+`portfolios_reprocessed`. At every month-end the portfolio is rebalanced
+back into the fund after that month's costs have been taken from wealth:
+    management fee   expense_ratio / 12
+    trading costs    turnover_rate x transaction_costs / 12
+    net return       (1 + gross) x (1 - fee - trading) - 1
+(all rates annual percentages in the table; missing turnover or
+transaction costs count as zero; see streaming_stats.cost_rates).
+
+The whole (platform x month x fund) grid is one broadcast array. Horizon
+statistics use masked sums over the month axis, with no per-pair loop.
+They follow compute_sharpe_rtios.py: trailing 1y/3y/7y windows ending at
+END_DATE, volatility = monthly std (ddof=1) x sqrt(12) with at least
+MIN_OBS months, Sharpe = (annualized return - average risk-free rate) /
+volatility. Here returns are compounded from the net monthly returns.
+
+The pair stats file has the combined_performance_stats.csv columns (Advisor
+Group, Fund Name, Ticker, <h>_return/volatility/sharpe) plus the platform.
+It must not be fed to the group tests of final_analysis.py: every fund
+appears once per platform, so the Welch and bootstrap tests would treat
+rows that differ only by a scalar fee as independent observations. The
+platform stats file averages each platform's pairs over the funds, one row
+per platform (its Fund Name is the platform), and is the one to compare:
+    python final_analysis.py --input data/performance_backtest/backtest_platform_stats.csv
+
+Usage:
+    python backtest.py --end-date 2024-12-31
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage
+from risk_free import monthly_rf
+from timeseries_store import MONTHLY_RETURNS, TimeSeriesStore
+
+sys.path.append(os.path.join(storage.ROOT_DIR, "costs_analysis"))
+from streaming_stats import AUTOMATED, FILTER_SQL, cost_rates
+
+# --- Configuration ---
+OUTPUT_DIR = "data/performance_backtest"
+STATS_FILE = os.path.join(OUTPUT_DIR, "backtest_pair_stats.csv")
+PLATFORM_STATS_FILE = os.path.join(OUTPUT_DIR, "backtest_platform_stats.csv")
+RETURNS_FILE = os.path.join(OUTPUT_DIR, "backtest_net_returns.parquet")
+END_DATE = "2024-12-31"
+HORIZONS = {"1y": 12, "3y": 36, "7y": 84}
+MIN_OBS = 10  # as in compute_sharpe_rtios.py
+
+
+def load_fee_schedules(conn=None):
+    """Platform fee schedules with monthly management and trading cost rates (fractions)."""
+    df = storage.select("portfolios_reprocessed",
+                        ["platform_name", "advisor_type", "expense_ratio", "transaction_costs", "turnover_rate"],
+                        where=f"{FILTER_SQL} AND expense_ratio IS NOT NULL", conn=conn)
+    df["Advisor Group"] = np.where(df["advisor_type"].isin(AUTOMATED), "Automated", "Traditional")
+    fee, trading = cost_rates(df)
+    df["monthly_fee"] = fee / 12
+    df["monthly_trading"] = trading / 12
+    return df.reset_index(drop=True)
+
+
+def net_returns(gross, schedules):
+    """
+    Net monthly returns of every pair.
+
+    Args:
+        gross (np.ndarray): T x F gross fund returns (NaN = no return).
+        schedules (pd.DataFrame): P fee schedules from `load_fee_schedules`.
+
+    Returns:
+        np.ndarray: P x T x F net returns.
+    """
+    keep = 1 - schedules["monthly_fee"].to_numpy() - schedules["monthly_trading"].to_numpy()
+    return (1 + gross)[None, :, :] * keep[:, None, None] - 1
+
+
+def horizon_stats(net, dates, end_date=END_DATE, horizons=HORIZONS, min_obs=MIN_OBS):
+    """
+    Annualized return, volatility and Sharpe of every pair for each horizon.
+
+    Returns:
+        dict: "<h>_return" / "<h>_volatility" / "<h>_sharpe" -> P x F arrays
+        (percent for returns and volatility, rounded as in the stats CSVs).
+    """
+    dates = pd.DatetimeIndex(dates)
+    end = pd.Timestamp(end_date)
+    rf = monthly_rf(dates)
+    valid = ~np.isnan(net)
+    r0 = np.where(valid, net, 0.0)
+    log_r = np.where(valid, np.log1p(r0), 0.0)
+    out = {}
+    for label, months in horizons.items():
+        window = ((dates > end - pd.DateOffset(months=months)) & (dates <= end)).astype(float)  # T
+        n = np.einsum("t,ptf->pf", window, valid.astype(float))
+        s, ss = np.einsum("t,ptf->pf", window, r0), np.einsum("t,ptf->pf", window, r0 ** 2)
+        log_sum = np.einsum("t,ptf->pf", window, log_r)
+        rf_mean = np.nanmean(np.where(window > 0, rf, np.nan)) if window.any() else np.nan
+        with np.errstate(divide="ignore", invalid="ignore"):
+            enough = n >= min_obs
+            # Compounded over the window's months, annualized by its length
+            ann = np.where(n == months, np.expm1(log_sum * 12 / months), np.nan)
+            vol = np.sqrt(np.maximum((ss - s ** 2 / n) / (n - 1), 0.0) * 12)
+            ann_pct = np.round(ann * 100, 2)
+            sharpe = np.where(enough & (vol > 0), (ann_pct / 100 - rf_mean) / vol, np.nan)
+        out[f"{label}_return"] = ann_pct
+        out[f"{label}_volatility"] = np.where(enough, np.round(vol * 100, 2), np.nan)
+        out[f"{label}_sharpe"] = np.round(sharpe, 2)
+    return out
+
+
+def run_backtest(returns, schedules, fund_names=None, end_date=END_DATE, horizons=HORIZONS):
+    """
+    Backtest every (platform, fund) pair.
+
+    Args:
+        returns (pd.DataFrame): Month-end x ticker gross returns.
+        schedules (pd.DataFrame): Fee schedules from `load_fee_schedules`.
+        fund_names (dict | None): Ticker -> fund name.
+
+    Returns:
+        tuple: (stats DataFrame with one row per pair, long DataFrame of net
+        monthly returns with Date, Platform, Advisor Group, Ticker, Net Return).
+    """
+    returns = returns.sort_index().loc[:end_date]
+    net = net_returns(returns.to_numpy(dtype=float), schedules)
+    stats = horizon_stats(net, returns.index, end_date, horizons)
+
+    n_platforms, n_months, n_funds = net.shape
+    tickers = np.asarray(returns.columns)
+    platform = np.repeat(np.arange(n_platforms), n_funds)
+    fund = np.tile(np.arange(n_funds), n_platforms)
+    names = fund_names or {}
+    stats_df = pd.DataFrame({
+        "Advisor Group": schedules["Advisor Group"].to_numpy()[platform],
+        "Fund Name": [names.get(t) or t for t in tickers[fund]],
+        "Ticker": tickers[fund],
+        "Platform": schedules["platform_name"].to_numpy()[platform],
+        "Advisor Type": schedules["advisor_type"].to_numpy()[platform],
+        "Annual Cost (%)": np.round((schedules["monthly_fee"] + schedules["monthly_trading"]).to_numpy() * 1200, 4)[platform],
+        **{column: values.ravel() for column, values in stats.items()},
+    })
+
+    series_df = pd.DataFrame({
+        "Date": np.tile(np.repeat(returns.index.values, n_funds), n_platforms),
+        "Platform": np.repeat(schedules["platform_name"].to_numpy(), n_months * n_funds),
+        "Advisor Group": np.repeat(schedules["Advisor Group"].to_numpy(), n_months * n_funds),
+        "Ticker": np.tile(tickers, n_platforms * n_months),
+        "Net Return": net.ravel(),
+    }).dropna(subset=["Net Return"])
+    return stats_df, series_df
+
+
+def platform_stats(stats_df):
+    """
+    One row per platform: each metric averaged over the platform's funds.
+
+    This is the input for group comparisons; the pairs of one platform share
+    every fund with the other platforms and are not independent observations.
+    """
+    keys = ["Advisor Group", "Platform", "Advisor Type", "Annual Cost (%)"]
+    metrics = [c for c in stats_df.columns if c.endswith(("_return", "_volatility", "_sharpe"))]
+    grouped = stats_df.groupby(keys, sort=False)
+    df = grouped[metrics].mean().round(2)
+    df.insert(0, "Funds", grouped["Ticker"].nunique())
+    df = df.reset_index()
+    df.insert(1, "Fund Name", df["Platform"])
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Net-of-fee backtest of every platform x fund pair.")
+    parser.add_argument("--end-date", default=END_DATE)
+    parser.add_argument("--stats-out", default=STATS_FILE, help="Per-pair stats (not for group tests)")
+    parser.add_argument("--platform-stats-out", default=PLATFORM_STATS_FILE, help="Per-platform stats for final_analysis.py")
+    parser.add_argument("--returns-out", default=RETURNS_FILE, help="Net return series (.parquet or .csv)")
+    args = parser.parse_args()
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    conn = storage.connect(storage.DB_PATH, readonly=True)
+    schedules = load_fee_schedules(conn)
+    names = storage.select("performance_mutual_funds", ["Ticker", "Name"], conn=conn)
+    returns = TimeSeriesStore(MONTHLY_RETURNS).read()
+
+    stats_df, series_df = run_backtest(returns, schedules, dict(zip(names["Ticker"], names["Name"])), args.end_date)
+    stats_df.to_csv(args.stats_out, index=False)
+    platform_df = platform_stats(stats_df)
+    platform_df.to_csv(args.platform_stats_out, index=False)
+    if args.returns_out.endswith(".parquet"):
+        series_df.to_parquet(args.returns_out, index=False)
+    else:
+        series_df.to_csv(args.returns_out, index=False)
+    print(f"✅ Backtested {len(schedules)} platforms x {returns.shape[1]} funds "
+          f"({len(stats_df):,} pairs, {len(series_df):,} net monthly returns)")
+    print(f"   Pair stats: {args.stats_out}\n   Platform stats ({len(platform_df)} rows, for final_analysis.py): "
+          f"{args.platform_stats_out}\n   Net returns: {args.returns_out}")
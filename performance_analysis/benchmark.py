@@ -0,0 +1,101 @@
+"""
+Benchmark-relative metrics against the index in `data/index.csv`.
+
+`load_index` parses the exported quote file. It has quoted strings,
+thousands separators and newest-first rows. `benchmark_metrics` then
+computes beta, Jensen's alpha, tracking error, information ratio and
+up/down capture for every ticker and horizon at once. Each statistic is a
+masked sum over the returns matrix, formed as one matrix product of the
+(horizon x month) window masks with the (month x ticker) data. The
+single-factor regressions are solved together from those stacked normal
+equations, with no per-fund loop.
+
+Conventions: returns are monthly; alpha, tracking error and active return
+are annualized (x 12, x sqrt(12)); captures compare mean fund and benchmark
+returns over up or down benchmark months. Metrics are NaN when a ticker has
+fewer than MIN_OBS months in the window.
+"""
+import numpy as np
+import pandas as pd
+
+from risk_free import monthly_rf
+
+INDEX_FILE = "data/index.csv"
+HORIZONS = {"1y": 12, "3y": 36, "7y": 84}
+MIN_OBS = 10
+METRICS = ["beta", "alpha", "tracking_error", "information_ratio", "up_capture", "down_capture"]
+
+
+def load_index(path=INDEX_FILE):
+    """Daily index closes as a float Series on an ascending DatetimeIndex."""
+    df = pd.read_csv(path, usecols=["Date", "Price"], thousands=",", encoding="utf-8-sig",
+                     dtype={"Price": "float64"})
+    dates = pd.to_datetime(df["Date"], format="%m/%d/%Y")
+    return pd.Series(df["Price"].to_numpy(), index=pd.DatetimeIndex(dates, name="Date"), name="Index").sort_index()
+
+
+def align_monthly(index_prices, calendar):
+    """Month-end benchmark returns on the fund returns calendar (month-end dates)."""
+    monthly = index_prices.resample("ME").last().pct_change()
+    monthly.index = monthly.index.to_period("M")
+    return monthly.reindex(pd.DatetimeIndex(calendar).to_period("M")).to_numpy()
+
+
+def benchmark_metrics(returns, bench, end_date, horizons=HORIZONS, min_obs=MIN_OBS):
+    """
+    Benchmark-relative metrics of every ticker for every horizon ending at `end_date`.
+
+    Args:
+        returns (pd.DataFrame): Month-end x ticker simple returns.
+        bench (np.ndarray): Benchmark returns aligned with `returns.index`.
+        end_date: Last month included in every window.
+        horizons (dict): Label -> window length in months.
+
+    Returns:
+        pd.DataFrame: Indexed by ticker, one "<horizon>_<metric>" column per pair.
+    """
+    dates = pd.DatetimeIndex(returns.index)
+    end = pd.Timestamp(end_date)
+    # H x T window masks (a month counts if its benchmark return is known)
+    windows = np.array([(dates > end - pd.DateOffset(months=m)) & (dates <= end) for m in horizons.values()],
+                       dtype=float) * ~np.isnan(bench)
+
+    rf = monthly_rf(dates) / 12
+    r = returns.to_numpy(dtype=float)
+    valid = ~np.isnan(r) & ~np.isnan(rf)[:, None]
+    x = np.nan_to_num(bench - rf)                    # benchmark excess return, T
+    y = np.where(valid, r - rf[:, None], 0.0)        # fund excess returns, T x N
+    active = np.where(valid, r - np.nan_to_num(bench)[:, None], 0.0)
+    up, down = (np.nan_to_num(bench) > 0).astype(float), (np.nan_to_num(bench) < 0).astype(float)
+    b0 = np.nan_to_num(bench)
+    m = valid.astype(float)
+    r0 = np.where(valid, r, 0.0)
+
+    # Stacked sums: every (horizon, ticker) pair from one matrix product each
+    n = windows @ m
+    sx, sxx = (windows * x) @ m, (windows * x ** 2) @ m
+    sy, sxy = windows @ y, (windows * x) @ y
+    sa, saa = windows @ active, windows @ active ** 2
+    n_up, n_down = (windows * up) @ m, (windows * down) @ m
+    fund_up, fund_down = (windows * up) @ r0, (windows * down) @ r0
+    bench_up, bench_down = (windows * up * b0) @ m, (windows * down * b0) @ m
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Normal equations of y = alpha + beta * x for all pairs at once
+        det = n * sxx - sx ** 2
+        beta = (n * sxy - sx * sy) / det
+        alpha = (sy - beta * sx) / n * 12
+        te = np.sqrt(np.maximum(saa - sa ** 2 / n, 0.0) / (n - 1)) * np.sqrt(12)
+        info_ratio = (sa / n * 12) / te
+        up_capture = (fund_up / n_up) / (bench_up / n_up)
+        down_capture = (fund_down / n_down) / (bench_down / n_down)
+
+    values = {"beta": beta, "alpha": alpha * 100, "tracking_error": te * 100, "information_ratio": info_ratio,
+              "up_capture": up_capture * 100, "down_capture": down_capture * 100}
+    enough = n >= min_obs
+    out = {}
+    for h, label in enumerate(horizons):
+        for metric in METRICS:
+            column = np.where(enough[h] & np.isfinite(values[metric][h]), values[metric][h], np.nan)
+            out[f"{label}_{metric}"] = np.round(column, 2)
+    return pd.DataFrame(out, index=pd.Index(returns.columns, name="Ticker"))
@@ -0,0 +1,200 @@
+"""
+Bounded-memory performance metrics for large fund universes.
+
+The price store is processed in blocks of tickers sized to a memory budget,
+so peak memory depends on the block size rather than on the universe. Each
+block is read as float64 or float32 and forward-filled in place. As-of
+start/end prices and month-end prices are then plain row lookups, so no
+resampled copy of the daily matrix is built. A forked process pool runs
+the blocks and the per-ticker rows are concatenated in ticker order.
+
+The output has the layout of traditional_performance_stats.csv, with the
+same definitions as compute_annualized_results.py and compute_sharpe_rtios.py.
+- Returns are annualized from as-of prices.
+- Volatility is the ddof=1 standard deviation of the month-end returns in
+  the horizon's months, times sqrt(12), and needs MIN_OBS months.
+- Sharpe is (rounded annualized return - average risk-free rate) / volatility.
+The one difference: months without a price are dropped per ticker, not
+for the whole universe.
+
+Usage:
+    python chunked_metrics.py --memory-mb 1024 --workers 8 --float32
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from streaming_export import peak_rss_mb
+from return_engine import COLUMN_CHUNK, parse_horizon
+from risk_free import monthly_rf, rf_table
+from timeseries_store import PRICES, TimeSeriesStore
+
+# --- Configuration ---
+EXPORT_FILE = "data/performance_traditional/traditional_performance_stats.csv"
+END_DATE = "2024-12-31"
+HORIZONS = ["1y", "3y", "7y"]
+MIN_OBS = 10          # monthly returns required for volatility (as in compute_sharpe_rtios.py)
+MEMORY_MB = 1024      # total budget for price blocks across all workers
+WORKERS = os.cpu_count() or 1
+
+
+def block_size(n_dates, memory_mb=MEMORY_MB, workers=1, dtype=np.float64):
+    """Tickers per block so that every worker's price block fits its share of the budget."""
+    per_ticker = n_dates * (np.dtype(dtype).itemsize + 1)  # values + NaN mask
+    return max(1, int(memory_mb * 1024 ** 2 / max(workers, 1) / max(per_ticker, 1)))
+
+
+def ffill_inplace(values):
+    """Forward-fill NaNs down each column of a T x N array, COLUMN_CHUNK columns at a time."""
+    steps = np.arange(len(values))[:, None]
+    for lo in range(0, values.shape[1], COLUMN_CHUNK):
+        block = values[:, lo:lo + COLUMN_CHUNK]
+        last_valid = np.maximum.accumulate(np.where(np.isnan(block), 0, steps), axis=0)
+        block[:] = np.take_along_axis(block, last_valid, axis=0)
+    return values
+
+
+def month_end_returns(values, dates):
+    """
+    Month-end returns of a daily price block.
+
+    Args:
+        values (np.ndarray): T x N prices, forward-filled in place by this call.
+        dates (np.ndarray): Sorted datetime64 index of length T.
+
+    Returns:
+        tuple: (month-end dates, M-1 x N returns of months 2..M); a month
+        without any price is NaN, as are the returns on either side of it.
+    """
+    months = dates.astype("datetime64[M]")
+    starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+    ends = np.r_[starts[1:] - 1, len(dates) - 1]
+    priced = np.add.reduceat(~np.isnan(values), starts, axis=0) > 0 if len(dates) else np.zeros((0, values.shape[1]))
+    ffill_inplace(values)
+    prices = np.where(priced, values[ends], np.nan).astype(np.float64)
+    month_ends = (months[ends] + 1).astype("datetime64[D]") - 1
+    return month_ends[1:], prices[1:] / prices[:-1] - 1
+
+
+def block_metrics(tickers, store_path=PRICES, horizons=HORIZONS, end_date=END_DATE,
+                  min_obs=MIN_OBS, dtype=np.float64):
+    """Metrics of one ticker block; returns (DataFrame indexed by ticker, worker peak RSS in MB)."""
+    store = TimeSeriesStore(store_path)
+    end = pd.Timestamp(end_date)
+    dates = store.dates.values.astype("datetime64[D]")
+    dates = dates[:np.searchsorted(dates, np.datetime64(end, "D"), "right")]
+    values = np.empty((len(dates), len(tickers)), dtype=dtype)
+    for j, ticker in enumerate(tickers):
+        values[:, j] = store.slice(ticker, end=end_date)
+    monthly_dates, monthly = month_end_returns(values, dates)  # `values` is forward-filled from here on
+    col = np.arange(values.shape[1])
+
+    def asof(at):
+        row = np.searchsorted(dates, np.datetime64(at, "D"), "right") - 1
+        return values[row, col].astype(np.float64) if row >= 0 else np.full(len(col), np.nan)
+
+    end_price = asof(end)
+    out = {}
+    stats = {}
+    for label in horizons:
+        offset, years = parse_horizon(label)
+        with np.errstate(invalid="ignore"):
+            annualized = np.round(((end_price / asof(end - offset)) ** (1 / years) - 1) * 100, 2)
+        out[f"{label}_return"] = annualized
+
+        window = (monthly_dates > np.datetime64(end - offset, "D")) & (monthly_dates <= np.datetime64(end, "D"))
+        r = monthly[window]
+        valid = ~np.isnan(r)
+        n = valid.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(valid, r, 0.0).sum(axis=0) / n
+            vol = np.sqrt((np.where(valid, r - mean, 0.0) ** 2).sum(axis=0) / (n - 1) * 12)
+            rf = np.nanmean(monthly_rf(monthly_dates[window], rf_table)) if window.any() else np.nan
+            sharpe = np.where(vol > 0, (annualized / 100 - rf) / vol, np.nan)
+        enough = n >= min_obs
+        stats[f"{label}_volatility"] = np.where(enough, np.round(vol * 100, 2), np.nan)
+        stats[f"{label}_sharpe"] = np.where(enough, np.round(sharpe, 2), np.nan)
+    out.update(stats)
+    return pd.DataFrame(out, index=pd.Index(tickers, name="Ticker")), peak_rss_mb()
+
+
+def _run_block(job):
+    return block_metrics(*job)
+
+
+def chunked_metrics(store_path=PRICES, horizons=HORIZONS, end_date=END_DATE, memory_mb=MEMORY_MB,
+                    workers=WORKERS, dtype=np.float64, min_obs=MIN_OBS):
+    """
+    Metrics for every ticker in the store, block by block.
+
+    Returns:
+        tuple: (DataFrame in the traditional_performance_stats.csv layout,
+        report dict with tickers, blocks, block_size, seconds, tickers_per_sec,
+        peak_rss_mb of the main process and worker_peak_rss_mb).
+    """
+    start = time.perf_counter()
+    store = TimeSeriesStore(store_path)
+    tickers = store.tickers
+    n_dates = int((store.dates <= pd.Timestamp(end_date)).sum())
+    size = block_size(n_dates, memory_mb, workers, dtype)
+    jobs = [(tickers[lo:lo + size], store_path, horizons, end_date, min_obs, dtype)
+            for lo in range(0, len(tickers), size)]
+
+    # Forked workers (see figures.render_figures); in-process when fork is unavailable
+    can_fork = "fork" in multiprocessing.get_all_start_methods()
+    if workers == 1 or len(jobs) <= 1 or not can_fork:
+        results = [_run_block(job) for job in jobs]
+    else:
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            results = list(executor.map(_run_block, jobs))
+
+    columns = [f"{h}_return" for h in horizons] + [f"{h}_{m}" for h in horizons for m in ("volatility", "sharpe")]
+    frames = [frame for frame, _ in results]
+    df = (pd.concat(frames) if frames else pd.DataFrame(columns=columns)).reset_index()
+    seconds = time.perf_counter() - start
+    report = {
+        "tickers": len(tickers),
+        "blocks": len(jobs),
+        "block_size": size,
+        "seconds": round(seconds, 3),
+        "tickers_per_sec": round(len(tickers) / seconds, 1) if seconds > 0 else float("nan"),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "worker_peak_rss_mb": round(max((rss for _, rss in results), default=float("nan")), 1),
+    }
+    return df, report
+
+
+def print_report(report):
+    print(f"⏱️ {report['tickers']:,} tickers in {report['blocks']} blocks of {report['block_size']:,}: "
+          f"{report['seconds']:.2f}s ({report['tickers_per_sec']:,.0f} tickers/s), "
+          f"peak RSS {report['peak_rss_mb']:.0f} MB (workers {report['worker_peak_rss_mb']:.0f} MB)")
+
+
+def add_arguments(parser):
+    """Block sizing and pool options shared with the metrics scripts' --chunked mode."""
+    parser.add_argument("--memory-mb", type=int, default=MEMORY_MB, help="Memory budget for price blocks")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Block processes")
+    parser.add_argument("--float32", action="store_true", help="Hold prices as float32")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Annualized return, volatility and Sharpe in bounded memory.")
+    parser.add_argument("--horizons", nargs="+", default=HORIZONS)
+    parser.add_argument("--end-date", default=END_DATE)
+    parser.add_argument("--out", default=EXPORT_FILE)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    df, report = chunked_metrics(horizons=args.horizons, end_date=args.end_date, memory_mb=args.memory_mb,
+                                 workers=args.workers, dtype=np.float32 if args.float32 else np.float64)
+    df.to_csv(args.out, index=False)
+    print_report(report)
+    print("✅ Exported performance data:", args.out)
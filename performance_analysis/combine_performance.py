@@ -1,24 +1,43 @@
 import pandas as pd
-import sqlite3
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage
+from entity_resolution import build_mapping, fund_costs
+from benchmark import align_monthly, benchmark_metrics, load_index
+from timeseries_store import MONTHLY_RETURNS, TimeSeriesStore
 
 # --- Paths ---
-DB_PATH = "../data/portfolio_data.db"
+DB_PATH = storage.DB_PATH
 TRAD_FILE = "data/performance_traditional/traditional_performance_stats.csv"
 AUTO_FILE = "data/performance_automated/automated_performance_stats.csv"
 OUTPUT_FILE = "data/performance_combined/combined_performance_stats.csv"
+END_DATE = "2024-12-31"
 os.makedirs("data/performance_combined", exist_ok=True)
 
 # --- Load traditional data + fund names ---
 trad_df = pd.read_csv(TRAD_FILE)
 
-conn = sqlite3.connect(DB_PATH)
-names_df = pd.read_sql_query("SELECT ticker, Name FROM performance_mutual_funds", conn)
-conn.close()
+names_df = storage.select("performance_mutual_funds", ["Ticker", "Name"], conn=storage.connect(DB_PATH, readonly=True))
 names_df.rename(columns={"ticker": "Ticker", "Name": "Fund Name"}, inplace=True)
 trad_df = trad_df.merge(names_df, on="Ticker", how="left")
 trad_df["Advisor Group"] = "Traditional"
 
+# --- Benchmark-relative metrics (beta, alpha, tracking error, IR, capture) ---
+monthly_df = TimeSeriesStore(MONTHLY_RETURNS).read()
+bench = align_monthly(load_index(), monthly_df.index)
+trad_df = trad_df.merge(benchmark_metrics(monthly_df, bench, END_DATE).reset_index(), on="Ticker", how="left")
+
+# --- Cost record matched to each fund (name-based, see entity_resolution.py) ---
+conn = storage.connect(DB_PATH)
+build_mapping(conn)
+costs_df = fund_costs(trad_df["Ticker"], conn=conn).rename(columns={
+    "expense_ratio": "Platform Expense Ratio (%)", "transaction_costs": "Platform Transaction Costs (%)"})
+trad_df = trad_df.merge(costs_df[["Ticker", "Platform", "Portfolio ID", "Match Score",
+                                  "Platform Expense Ratio (%)", "Platform Transaction Costs (%)"]],
+                        on="Ticker", how="left")
+
 # --- Load automated data ---
 auto_df = pd.read_csv(AUTO_FILE)
 
@@ -1,45 +1,49 @@
-import pandas as pd
+import argparse
+
 import numpy as np
-import os
+
+from chunked_metrics import add_arguments, chunked_metrics, print_report
+from return_engine import compute_returns, missing_history, wide_annualized
+from timeseries_store import ANNUAL_RETURNS, PRICES, TimeSeriesStore, write_annual_returns
 
 # --- Config ---
-INPUT_FILE = "data/performance_traditional/traditional_prices.csv"
-EXPORT_FILE = "data/performance_traditional/traditional_annual_returns.csv"
 END_DATE = "2024-12-31"
+HORIZONS = ["1y", "3y", "7y"]
+
+parser = argparse.ArgumentParser(description="Annualized returns of every fund over several horizons.")
+parser.add_argument("--horizons", nargs="+", default=HORIZONS, help="e.g. 1y 3y 7y 10y 6m")
+parser.add_argument("--end-date", default=END_DATE)
+parser.add_argument("--chunked", action="store_true", help="Process the universe in ticker blocks (bounded memory)")
+add_arguments(parser)
+args = parser.parse_args()
+
+if args.chunked:
+    df, report = chunked_metrics(horizons=args.horizons, end_date=args.end_date, memory_mb=args.memory_mb,
+                                 workers=args.workers, dtype=np.float32 if args.float32 else np.float64)
+    returns_df = df[["Ticker"] + [f"{h}_return" for h in args.horizons]]
+    missing = int(returns_df.iloc[:, 1:].isna().sum().sum())
+    if missing:
+        print(f"⚠️ {missing} returns could not be computed (missing price history)")
+    write_annual_returns(returns_df, args.end_date)
+    print_report(report)
+    print("✅ Annualized returns saved to:", ANNUAL_RETURNS)
+    raise SystemExit
 
 # --- Load prices ---
-df = pd.read_csv(INPUT_FILE, index_col="Date", parse_dates=True)
-df = df[df.index <= END_DATE]
-
-# --- Periods ---
-periods = {
-    "1y": "2023-12-31",
-    "3y": "2021-12-31",
-    "7y": "2017-12-31",
-}
-
-# --- Calculate annualized returns ---
-results = []
-
-for ticker in df.columns:
-    ticker_data = df[ticker].dropna()
-    end_price = ticker_data.loc[:END_DATE].iloc[-1]
-
-    entry = {"Ticker": ticker}
+df = TimeSeriesStore(PRICES).read(end=args.end_date)
 
-    for label, start in periods.items():
-        try:
-            start_price = ticker_data.loc[:start].iloc[-1]
-            n_years = int(label[0])
-            annual_return = (end_price / start_price) ** (1 / n_years) - 1
-            entry[f"{label}_return"] = round(annual_return * 100, 2)
-        except Exception:
-            entry[f"{label}_return"] = np.nan
+# --- Calculate annualized returns (all tickers and horizons at once) ---
+results = compute_returns(df, args.horizons, [args.end_date])
 
-    results.append(entry)
+missing = missing_history(results)
+if not missing.empty:
+    print(f"⚠️ {len(missing)} returns could not be computed:")
+    for _, row in missing.iterrows():
+        print(f"   {row['Ticker']} {row['Horizon']}: {row['status']} "
+              f"({row['Start Date'].date()} to {row['End Date'].date()})")
 
-# --- Save to CSV ---
-returns_df = pd.DataFrame(results)
-returns_df.to_csv(EXPORT_FILE, index=False)
+# --- Save to the store ---
+returns_df = wide_annualized(results, args.end_date)
+write_annual_returns(returns_df, args.end_date)
 
-print("✅ Annualized returns saved to:", EXPORT_FILE)
\ No newline at end of file
+print("✅ Annualized returns saved to:", ANNUAL_RETURNS)
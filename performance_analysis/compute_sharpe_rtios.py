@@ -1,29 +1,41 @@
+import argparse
 import pandas as pd
 import numpy as np
 import os
 
+from chunked_metrics import add_arguments, chunked_metrics, print_report
+from covariance import group_diversification, update_ewma
+from risk_free import rf_table
+from timeseries_store import MONTHLY_RETURNS, TimeSeriesStore, read_annual_returns
+
 # --- Config ---
-RETURNS_FILE = "data/performance_traditional/traditional_monthly_returns.csv"
-ANNUAL_RETURNS_FILE = "data/performance_traditional/traditional_annual_returns.csv"
 EXPORT_FILE = "data/performance_traditional/traditional_performance_stats.csv"
+DIVERSIFICATION_FILE = "data/performance_traditional/traditional_diversification_stats.csv"
+END_DATE = "2024-12-31"
+
+parser = argparse.ArgumentParser(description="Volatility, Sharpe ratios and group diversification of every fund.")
+parser.add_argument("--chunked", action="store_true",
+                    help="Compute returns, volatility and Sharpe from prices in ticker blocks (bounded memory; "
+                         "skips the diversification stats)")
+add_arguments(parser)
+args = parser.parse_args()
+
+if args.chunked:
+    final_df, report = chunked_metrics(end_date=END_DATE, memory_mb=args.memory_mb, workers=args.workers,
+                                       dtype=np.float32 if args.float32 else np.float64)
+    final_df.to_csv(EXPORT_FILE, index=False)
+    print_report(report)
+    print("✅ Exported full performance data with volatility & Sharpe ratios:", EXPORT_FILE)
+    raise SystemExit
 
-# US 10Y yields (risk-free rate per year)
-rf_table = {
-    2018: 0.0291,
-    2019: 0.0214,
-    2020: 0.0089,
-    2021: 0.0145,
-    2022: 0.0339,
-    2023: 0.0388,
-    2024: 0.0410
-}
 rf_1y = np.mean([rf_table[y] for y in [2024]])
 rf_3y = np.mean([rf_table[y] for y in [2022, 2023, 2024]])
 rf_7y = np.mean([rf_table[y] for y in [2018, 2019, 2020, 2021, 2022, 2023, 2024]])
 
 # --- Load data ---
-monthly_df = pd.read_csv(RETURNS_FILE, index_col="Date", parse_dates=True)
-annual_df = pd.read_csv(ANNUAL_RETURNS_FILE)
+monthly_df = TimeSeriesStore(MONTHLY_RETURNS).read()
+annual_df = read_annual_returns(END_DATE, ["1y", "3y", "7y"])
+annual_by_ticker = annual_df.set_index("Ticker")
 
 # --- Define periods ---
 monthly_df = monthly_df.sort_index()
@@ -48,9 +60,8 @@ for ticker in monthly_df.columns:
                 entry[f"{label}_volatility"] = round(vol_ann * 100, 2)
 
                 # Sharpe ratio
-                ann_return_row = annual_df[annual_df["Ticker"] == ticker]
-                if not ann_return_row.empty:
-                    r_ann = ann_return_row[f"{label}_return"].values[0] / 100
+                if ticker in annual_by_ticker.index:
+                    r_ann = annual_by_ticker.at[ticker, f"{label}_return"] / 100
                     rf = {"1y": rf_1y, "3y": rf_3y, "7y": rf_7y}[label]
                     sharpe = (r_ann - rf) / vol_ann if vol_ann > 0 else np.nan
                     entry[f"{label}_sharpe"] = round(sharpe, 2)
@@ -67,4 +78,11 @@ stats_df = pd.DataFrame(results)
 final_df = pd.merge(annual_df, stats_df, on="Ticker", how="left")
 final_df.to_csv(EXPORT_FILE, index=False)
 
-print("✅ Exported full performance data with volatility & Sharpe ratios:", EXPORT_FILE)
\ No newline at end of file
+print("✅ Exported full performance data with volatility & Sharpe ratios:", EXPORT_FILE)
+
+# --- Group diversification (average correlation, diversification ratio) ---
+ewma = update_ewma(monthly_df.loc[:END_DATE])
+diversification_df = group_diversification(monthly_df, {"Traditional": list(monthly_df.columns)}, END_DATE, ewma=ewma)
+diversification_df.to_csv(DIVERSIFICATION_FILE, index=False)
+
+print("✅ Exported group correlation & diversification ratios:", DIVERSIFICATION_FILE)
@@ -0,0 +1,281 @@
+"""
+Covariance and correlation of the fund universe from the monthly returns matrix.
+
+- `pairwise_moments`: covariance and correlation over pairwise-complete
+  months, the same as `DataFrame.cov()` / `DataFrame.corr()`, built from
+  mask matrix products one (block x block) tile at a time.
+- `ledoit_wolf`: covariance shrunk towards a scaled identity, with the
+  Ledoit–Wolf optimal intensity.
+- `EWMACovariance`: exponentially weighted covariance updated with one
+  rank-1 step per new month, row block by row block.
+- `average_correlation` / `diversification_ratio`: group-level summaries,
+  tabulated per group and horizon by `group_diversification`.
+
+Every estimator takes `dtype` (float64 by default, float32 to halve memory
+on large universes) and `block` (tickers per tile).
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+BLOCK = 512
+HORIZONS = {"1y": 12, "3y": 36, "7y": 84}
+MIN_OBS = 10  # as in compute_sharpe_rtios.py
+HALFLIFE = 12
+EWMA_STATE = "data/performance_traditional/store/ewma_state.npz"
+
+
+def _blocks(n, block):
+    return [(lo, min(n, lo + block)) for lo in range(0, n, block)]
+
+
+def pairwise_moments(returns, block=BLOCK, dtype=np.float64, ddof=1):
+    """
+    Pairwise-complete covariance and correlation.
+
+    Args:
+        returns (np.ndarray): T x N returns, NaN where missing.
+
+    Returns:
+        tuple: (N x N covariance, N x N correlation); NaN for pairs with
+        fewer than ddof + 1 common months.
+    """
+    returns = np.asarray(returns, dtype=dtype)
+    valid = (~np.isnan(returns)).astype(dtype)
+    x = np.where(valid > 0, returns, 0).astype(dtype)
+    x2 = x * x
+    n = returns.shape[1]
+    cov = np.empty((n, n), dtype=dtype)
+    corr = np.empty((n, n), dtype=dtype)
+    for i0, i1 in _blocks(n, block):
+        xi, mi, x2i = x[:, i0:i1], valid[:, i0:i1], x2[:, i0:i1]
+        for j0, j1 in _blocks(n, block):
+            xj, mj, x2j = x[:, j0:j1], valid[:, j0:j1], x2[:, j0:j1]
+            count = mi.T @ mj                  # common months of each pair
+            si, sj = xi.T @ mj, mi.T @ xj      # sums of i (resp. j) over common months
+            sij = xi.T @ xj
+            with np.errstate(divide="ignore", invalid="ignore"):
+                c = (sij - si * sj / count) / (count - ddof)
+                vi = (x2i.T @ mj - si * si / count) / (count - ddof)
+                vj = (mi.T @ x2j - sj * sj / count) / (count - ddof)
+                r = c / np.sqrt(vi * vj)
+            c[count <= ddof] = np.nan
+            r[count <= ddof] = np.nan
+            cov[i0:i1, j0:j1] = c
+            corr[i0:i1, j0:j1] = np.clip(r, -1, 1)
+    return cov, corr
+
+
+def _gram(x, block):
+    """x.T @ x computed tile by tile (keeps temporaries at block x block)."""
+    n = x.shape[1]
+    out = np.empty((n, n), dtype=x.dtype)
+    for i0, i1 in _blocks(n, block):
+        for j0, j1 in _blocks(n, block):
+            if j0 < i0:
+                out[i0:i1, j0:j1] = out[j0:j1, i0:i1].T
+            else:
+                out[i0:i1, j0:j1] = x[:, i0:i1].T @ x[:, j0:j1]
+    return out
+
+
+def ledoit_wolf(returns, block=BLOCK, dtype=np.float64):
+    """
+    Ledoit–Wolf shrinkage towards mu * I (mu = average variance).
+
+    Missing values are replaced by the column mean (no contribution to any
+    moment); columns without data are dropped to zero variance.
+
+    Returns:
+        tuple: (N x N shrunk covariance, shrinkage intensity in [0, 1]).
+    """
+    returns = np.asarray(returns, dtype=dtype)
+    t, n = returns.shape
+    with np.errstate(invalid="ignore"):
+        mean = np.nanmean(returns, axis=0) if t else np.zeros(n, dtype=dtype)
+    x = np.nan_to_num(returns - np.nan_to_num(mean)).astype(dtype)
+    sample = _gram(x, block) / t
+    mu = np.trace(sample) / n
+    frob = float((sample.astype(np.float64) ** 2).sum())
+    delta = (frob - 2 * mu * np.trace(sample) + n * mu ** 2) / n
+    row_norms = (x.astype(np.float64) ** 2).sum(axis=1)
+    beta = ((row_norms ** 2).sum() / t - frob) / (n * t)
+    shrinkage = 0.0 if delta == 0 else min(max(beta, 0.0), delta) / delta
+    shrunk = (1 - shrinkage) * sample
+    shrunk[np.diag_indices(n)] += shrinkage * mu
+    return shrunk.astype(dtype), shrinkage
+
+
+class EWMACovariance:
+    """
+    Exponentially weighted mean and covariance with rank-1 updates.
+
+    Each new month `r` moves the state with weight alpha = 1 - lam:
+        d = r - mean;  mean += alpha * d;  cov = lam * (cov + alpha * d d^T)
+    Missing values in `r` are treated as equal to the current mean; a fund's
+    first observed month seeds its mean.
+    """
+    def __init__(self, n, halflife=12, dtype=np.float64, block=BLOCK):
+        self.lam = 0.5 ** (1 / halflife)
+        self.block = block
+        self.mean = np.zeros(n, dtype=dtype)
+        self.cov = np.zeros((n, n), dtype=dtype)
+        self.seen = np.zeros(n, dtype=bool)
+        self.count = 0  # months folded in
+
+    def update(self, r):
+        r = np.asarray(r, dtype=self.mean.dtype)
+        known = ~np.isnan(r)
+        first = known & ~self.seen  # a fund's first month only sets its mean
+        self.mean[first] = r[first]
+        self.seen |= known
+        alpha = 1 - self.lam
+        d = np.where(known & ~first, r - self.mean, 0).astype(self.mean.dtype)
+        self.mean += alpha * d
+        scaled = (self.lam * alpha) * d
+        for i0, i1 in _blocks(len(d), self.block):
+            rows = self.cov[i0:i1]
+            rows *= self.lam
+            rows += np.outer(scaled[i0:i1], d)
+        self.count += 1
+
+    @classmethod
+    def from_history(cls, returns, **kwargs):
+        returns = np.asarray(returns)
+        ewma = cls(returns.shape[1], **kwargs)
+        for row in returns:
+            ewma.update(row)
+        return ewma
+
+    def save(self, path, tickers=(), last_date="", digest=""):
+        np.savez(path, mean=self.mean, cov=self.cov, seen=self.seen, lam=self.lam, count=self.count,
+                 tickers=np.asarray(list(tickers), dtype=str), last_date=str(last_date), digest=digest)
+
+    @classmethod
+    def load(cls, path, block=BLOCK):
+        """Returns (state, tickers it was built for, last folded date, digest of the folded rows)."""
+        state = np.load(path)
+        ewma = cls(len(state["mean"]), dtype=state["mean"].dtype, block=block)
+        ewma.lam = float(state["lam"])
+        ewma.mean, ewma.cov, ewma.seen = state["mean"].copy(), state["cov"].copy(), state["seen"].copy()
+        ewma.count = int(state["count"])
+        last_date = str(state["last_date"]) if "last_date" in state else ""
+        digest = str(state["digest"]) if "digest" in state else ""
+        return ewma, list(state["tickers"]), last_date, digest
+
+
+def history_digest(returns, rows):
+    """SHA-256 of the dates and values of the first `rows` months of `returns`."""
+    head = returns.iloc[:rows]
+    h = hashlib.sha256()
+    h.update(pd.DatetimeIndex(head.index).asi8.tobytes())
+    h.update(np.ascontiguousarray(head.to_numpy(dtype=np.float64)).tobytes())
+    return h.hexdigest()
+
+
+def update_ewma(returns, path=EWMA_STATE, halflife=HALFLIFE, dtype=np.float64, block=BLOCK):
+    """
+    Bring the saved EWMA state up to date with `returns` (month x ticker).
+
+    Only months after the ones already folded in are applied, one rank-1
+    update each. The state is rebuilt from scratch when the ticker set or the
+    half-life changed, or when the months it folded in are no longer the
+    first months of `returns` (history revised, rebased or extended back):
+    their last date and a digest of their dates and values must match.
+    """
+    tickers = list(returns.columns)
+    ewma = None
+    if os.path.exists(path):
+        ewma, saved, last_date, digest = EWMACovariance.load(path, block=block)
+        same = saved == tickers and np.isclose(ewma.lam, 0.5 ** (1 / halflife)) and ewma.mean.dtype == dtype
+        aligned = (0 < ewma.count <= len(returns) and str(returns.index[ewma.count - 1]) == last_date
+                   and history_digest(returns, ewma.count) == digest)
+        if not (same and aligned):
+            ewma = None
+    if ewma is None:
+        ewma = EWMACovariance(len(tickers), halflife=halflife, dtype=dtype, block=block)
+    for row in returns.to_numpy(dtype=dtype)[ewma.count:]:
+        ewma.update(row)
+    last_date = str(returns.index[ewma.count - 1]) if ewma.count else ""
+    ewma.save(path, tickers, last_date, history_digest(returns, ewma.count))
+    return ewma
+
+
+def average_correlation(corr, members=None):
+    """Mean off-diagonal correlation among `members` (indices; default all), ignoring NaN."""
+    sub = corr if members is None else corr[np.ix_(members, members)]
+    off = ~np.eye(len(sub), dtype=bool)
+    values = sub[off]
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if values.size else np.nan
+
+
+def diversification_ratio(cov, members=None, weights=None):
+    """
+    (w . sigma) / sqrt(w' Cov w) for `members` (default all), equal-weighted by default.
+
+    1 means no diversification benefit; higher is better. NaN pairs make it NaN.
+    """
+    sub = cov if members is None else cov[np.ix_(members, members)]
+    w = np.full(len(sub), 1 / len(sub)) if weights is None else np.asarray(weights, dtype=float)
+    sigma = np.sqrt(np.diag(sub))
+    portfolio = np.sqrt(w @ sub @ w)
+    return float(w @ sigma / portfolio) if portfolio > 0 else np.nan
+
+
+def group_diversification(returns, groups, end_date, horizons=HORIZONS, min_obs=MIN_OBS,
+                          ewma=None, block=BLOCK, dtype=np.float64):
+    """
+    Average correlation and diversification ratio of each group of funds.
+
+    Args:
+        returns (pd.DataFrame): Month-end x ticker simple returns.
+        groups (dict): Group name -> list of tickers.
+        end_date: Last month of every window.
+        horizons (dict): Label -> window length in months.
+        ewma (EWMACovariance): Optional current EWMA state over `returns.columns`;
+            adds an "ewma" row per group.
+
+    Returns:
+        pd.DataFrame: Group, Horizon, Funds, Average Correlation, Diversification
+        Ratio (pairwise covariance), Diversification Ratio (Ledoit-Wolf), Shrinkage.
+        Funds with fewer than `min_obs` months in a window are left out of it.
+    """
+    dates = pd.DatetimeIndex(returns.index)
+    end = pd.Timestamp(end_date)
+    position = {t: i for i, t in enumerate(returns.columns)}
+    values = returns.to_numpy(dtype=dtype)
+    rows = []
+    for label, months in horizons.items():
+        window = values[(dates > end - pd.DateOffset(months=months)) & (dates <= end)]
+        enough = (~np.isnan(window)).sum(axis=0) >= min_obs
+        for group, tickers in groups.items():
+            members = [position[t] for t in tickers if t in position and enough[position[t]]]
+            row = {"Group": group, "Horizon": label, "Funds": len(members)}
+            if len(members) >= 2:
+                sub = window[:, members]
+                cov, corr = pairwise_moments(sub, block=block, dtype=dtype)
+                shrunk, shrinkage = ledoit_wolf(sub, block=block, dtype=dtype)
+                row.update({
+                    "Average Correlation": average_correlation(corr),
+                    "Diversification Ratio": diversification_ratio(cov),
+                    "Diversification Ratio (LW)": diversification_ratio(shrunk),
+                    "Shrinkage": shrinkage,
+                })
+            rows.append(row)
+    if ewma is not None:
+        sigma = np.sqrt(np.diag(ewma.cov))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = ewma.cov / np.outer(sigma, sigma)
+        for group, tickers in groups.items():
+            members = [position[t] for t in tickers if t in position and sigma[position[t]] > 0]
+            row = {"Group": group, "Horizon": "ewma", "Funds": len(members)}
+            if len(members) >= 2:
+                row.update({"Average Correlation": average_correlation(corr, members),
+                            "Diversification Ratio": diversification_ratio(ewma.cov, members)})
+            rows.append(row)
+    columns = ["Group", "Horizon", "Funds", "Average Correlation", "Diversification Ratio",
+               "Diversification Ratio (LW)", "Shrinkage"]
+    return pd.DataFrame(rows, columns=columns).round(4)
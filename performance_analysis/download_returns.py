@@ -1,6 +1,9 @@
+import argparse
 import os
 import pandas as pd
-import yfinance as yf
+
+from price_cache import BATCH_SIZE, WORKERS, FixtureSource, PriceCache, YahooSource, update_prices
+from timeseries_store import MONTHLY_RETURNS, PRICES, TimeSeriesStore
 
 
 # --- Configuration ---
@@ -14,29 +17,36 @@ END_DATE = "2024-12-31"
 DATA_DIR = "data/performance_traditional"
 os.makedirs(DATA_DIR, exist_ok=True)
 
-# --- Download and store prices ---
-all_data = []
-
-for ticker in TICKERS:
-    print(f"📥 Downloading {ticker}...")
-    data = yf.download(ticker, start=START_DATE, end=END_DATE, auto_adjust=True, progress=False)
-    if not data.empty:
-        close_series = data["Adj Close"]
-        close_series.name = ticker  # instead of .rename(ticker) to avoid shadowed str()
-        all_data.append(close_series)
-    else:
-        print(f"⚠️ No data for {ticker}")
-
-# --- Combine all data into one DataFrame ---
-if not all_data:
+parser = argparse.ArgumentParser(description="Update the local price cache and export traditional fund prices.")
+parser.add_argument("--source", choices=["yahoo", "fixture"], default="yahoo")
+parser.add_argument("--fixture", default="data/fixtures/prices.csv",
+                    help="Wide price CSV served by the fixture source")
+parser.add_argument("--tickers-file", default=None, help="File with one ticker per line (default: TICKERS)")
+parser.add_argument("--end", default=END_DATE, help="Exclusive end date of the update")
+parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Tickers per request")
+parser.add_argument("--workers", type=int, default=WORKERS, help="Concurrent requests")
+args = parser.parse_args()
+
+tickers = TICKERS
+if args.tickers_file:
+    with open(args.tickers_file, encoding="utf-8") as f:
+        tickers = [line.strip() for line in f if line.strip()]
+
+# --- Fetch only what the cache is missing ---
+source = FixtureSource(args.fixture) if args.source == "fixture" else YahooSource()
+cache = PriceCache()
+update_prices(tickers, source, cache, START_DATE, args.end, batch_size=args.batch_size, workers=args.workers)
+
+# --- Write the cached window to the price store ---
+prices_df = cache.to_frame(tickers, start=START_DATE, end=pd.Timestamp(args.end) - pd.Timedelta(days=1))
+cache.close()
+if prices_df.empty:
     raise RuntimeError("❌ No valid data downloaded.")
 
-prices_df = pd.concat(all_data, axis=1)
-prices_df.index.name = "Date"
-prices_df.to_csv(os.path.join(DATA_DIR, "traditional_prices.csv"))
+TimeSeriesStore(PRICES).write(prices_df)
 
 # --- Compute monthly returns ---
 monthly_returns = prices_df.resample("ME").last().pct_change().dropna()
-monthly_returns.to_csv(os.path.join(DATA_DIR, "traditional_monthly_returns.csv"))
+TimeSeriesStore(MONTHLY_RETURNS).write(monthly_returns)
 
-print("✅ Download and export complete.")
\ No newline at end of file
+print("✅ Download and export complete.")
@@ -1,52 +1,29 @@
+import argparse
 import os
-import sqlite3
+import sys
 import pandas as pd
-import yfinance as yf
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage
+from bulk_load import upsert_dataframe
+from metadata_cache import WORKERS, MetadataCache, StaticInfoProvider, YahooInfoProvider, refresh
 
 # --- Configuration ---
-DB_PATH = "../data/portfolio_data.db"
+DB_PATH = storage.DB_PATH
 TABLE_NAME = "performance_mutual_funds"
 
 # --- List of tickers (example) ---
 tickers = ["ACEIX", "PWTYX", "OGIAX", "PRWCX", "MDCPX", "SWOBX", "PGMAX", "OAKBX", "VGSTX", "GOIAX", "MXGPX", "MBAAX", "FSATX"]
 
-# --- Fetch fund metadata using yfinance ---
-def get_summary_info(ticker_list):
-    records = []
-    for ticker in ticker_list:
-        try:
-            print(f"Fetching: {ticker}")
-            info = yf.Ticker(ticker).info
-            records.append({
-                "Ticker": ticker,
-                "Name": info.get("longName"),
-                "Currency": info.get("currency"),
-                "Asset Class": info.get("quoteType"),
-                "Expense Ratio": info.get("annualReportExpenseRatio"),
-                "Net Assets": info.get("totalAssets"),
-                "Inception Date": info.get("fundInceptionDate"),
-                "Morningstar Rating": info.get("morningStarOverallRating")
-            })
-        except Exception as e:
-            print(f"❌ Error for {ticker}: {e}")
-            records.append({
-                "Ticker": ticker,
-                "Name": None,
-                "Currency": None,
-                "Asset Class": None,
-                "Expense Ratio": None,
-                "Net Assets": None,
-                "Inception Date": None,
-                "Morningstar Rating": None
-            })
-    return pd.DataFrame(records)
+# --- Fetch fund metadata (cached, only stale tickers are re-fetched) ---
+def get_summary_info(ticker_list, provider=None, workers=WORKERS, force=False):
+    cache = MetadataCache(storage.connect(DB_PATH))
+    refresh(ticker_list, provider or YahooInfoProvider(), cache, workers=workers, force=force)
+    return pd.DataFrame([{"Ticker": ticker, **cache.get(ticker)} for ticker in ticker_list])
 
 # --- Insert or update in SQLite database ---
 def insert_into_sqlite(df):
-    if not os.path.exists(os.path.dirname(DB_PATH)):
-        os.makedirs(os.path.dirname(DB_PATH))
-
-    conn = sqlite3.connect(DB_PATH)
+    conn = storage.connect(DB_PATH)
     cursor = conn.cursor()
 
     cursor.execute(f"""
@@ -62,34 +39,22 @@ def insert_into_sqlite(df):
         )
     """)
 
-    for _, row in df.iterrows():
-        cursor.execute(f"""
-            INSERT INTO {TABLE_NAME} (Ticker, Name, Currency, Asset_Class, Expense_Ratio, Net_Assets, Inception_Date, Morningstar_Rating)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(Ticker) DO UPDATE SET
-                Name=excluded.Name,
-                Currency=excluded.Currency,
-                Asset_Class=excluded.Asset_Class,
-                Expense_Ratio=excluded.Expense_Ratio,
-                Net_Assets=excluded.Net_Assets,
-                Inception_Date=excluded.Inception_Date,
-                Morningstar_Rating=excluded.Morningstar_Rating
-        """, (
-            row.get("Ticker"),
-            row.get("Name"),
-            row.get("Currency"),
-            row.get("Asset Class"),
-            row.get("Expense Ratio"),
-            row.get("Net Assets"),
-            row.get("Inception Date"),
-            row.get("Morningstar Rating")
-        ))
+    columns = ["Ticker", "Name", "Currency", "Asset_Class", "Expense_Ratio",
+               "Net_Assets", "Inception_Date", "Morningstar_Rating"]
+    upsert_dataframe(conn, df.rename(columns=lambda c: c.replace(" ", "_")), TABLE_NAME, columns,
+                     conflict_key="Ticker")
 
     conn.commit()
-    conn.close()
     print(f"✅ {len(df)} records inserted/updated in '{TABLE_NAME}'")
 
 # --- Run process ---
 if __name__ == "__main__":
-    summary_df = get_summary_info(tickers)
+    parser = argparse.ArgumentParser(description="Fetch fund metadata into the portfolio database.")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Concurrent metadata requests")
+    parser.add_argument("--force", action="store_true", help="Re-fetch every ticker, ignoring the cache")
+    parser.add_argument("--fixture", default=None, help="JSON file {ticker: info} to use instead of Yahoo")
+    args = parser.parse_args()
+
+    provider = StaticInfoProvider(args.fixture) if args.fixture else YahooInfoProvider()
+    summary_df = get_summary_info(tickers, provider=provider, workers=args.workers, force=args.force)
     insert_into_sqlite(summary_df)
\ No newline at end of file
@@ -1,33 +1,39 @@
+import argparse
 import os
+import sys
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
 from datetime import datetime
 from scipy.stats import ttest_ind
-import matplotlib.font_manager as fm
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from figures import BLACK_WHITE, render_figures
+from inference import resampling_tests
+from streaming_export import export_dataframe
 
 # --- Paths & Config ---
 INPUT_FILE = "data/performance_combined/combined_performance_stats.csv"
 PLOT_DIR = "results/phase2_graphs"
 EXPORT_FILE = f"results/phase2_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+parser = argparse.ArgumentParser(description="Phase 2 performance analysis by advisor group.")
+parser.add_argument("--input", default=INPUT_FILE,
+                    help="Stats CSV with an Advisor Group column and one row per independent unit "
+                         "(e.g. backtest_platform_stats.csv of backtest.py, not its per-pair file)")
+parser.add_argument("--plot-dir", default=PLOT_DIR)
+parser.add_argument("--raw-data", choices=["none", "xlsx", "parquet"], default="none",
+                    help="Also export the input rows, streamed to a separate file")
+parser.add_argument("--workers", type=int, default=None, help="Plotting/resampling processes (default: all cores)")
+parser.add_argument("--resamples", type=int, default=0,
+                    help="Bootstrap and permutation resamples, e.g. 100000 (0 = skip)")
+parser.add_argument("--seed", type=int, default=0, help="Seed for the resampling tests")
+parser.add_argument("--force-plots", action="store_true", help="Re-render plots even if unchanged")
+args = parser.parse_args()
+PLOT_DIR = args.plot_dir
 os.makedirs(PLOT_DIR, exist_ok=True)
 
 # --- Load data ---
-df = pd.read_csv(INPUT_FILE)
-
-# --- Force Times New Roman font ---
-plt.rcParams.update({"font.family": "Times New Roman"})  # Set font to Times New Roman
-
-# --- Style configuration ---
-sns.set(style="whitegrid")
-plt.rcParams.update({
-    "axes.edgecolor": "black",
-    "axes.linewidth": 1.2,
-    "xtick.color": "black",
-    "ytick.color": "black",
-    "font.family": "Times New Roman"
-})
+df = pd.read_csv(args.input)
 
 # --- Metrics and labels ---
 metrics = {
@@ -56,47 +62,52 @@ for var, label in metrics.items():
         "p-value": round(p_val, 4)
     })
 
-# --- Barplots by fund ---
-for var, label in metrics.items():
-    plt.figure(figsize=(11, 6))
-    sns.barplot(
-        data=df.sort_values(by=var),
-        x="Fund Name", y=var, hue="Advisor Group", dodge=False,
-        palette={"Automated": "black", "Traditional": "white"},
-        edgecolor="black", linewidth=1.2
-    )
-    plt.xticks(rotation=90, fontsize=8)
-    plt.ylabel(label, fontsize=12)
-    plt.xlabel("")
-    plt.title(f"{label} by Fund", fontsize=14)
-    plt.legend(title="Advisor Group", loc="upper right")
-    plt.tight_layout()
-    filename = os.path.join(PLOT_DIR, f"{var}_barplot.png")
-    plt.savefig(filename, dpi=300)
-    plt.close()
+# --- Resampling: bootstrap CIs and permutation p-values ---
+resampling_df = None
+if args.resamples > 0:
+    resampling_df = resampling_tests(df, "Advisor Group", list(metrics), n_resamples=args.resamples,
+                                     seed=args.seed, workers=args.workers or os.cpu_count())
+    resampling_df["Metric"] = resampling_df["Metric"].map(metrics)
+    print(f"\nBootstrap / Permutation Results ({args.resamples:,} resamples):\n")
+    print(resampling_df.round(4).to_string(index=False))
 
-# --- Boxplots by group ---
+# --- Barplots by fund and boxplots by group ---
+specs = []
 for var, label in metrics.items():
-    plt.figure(figsize=(7, 5))
-    sns.boxplot(
-        data=df, x="Advisor Group", y=var, hue="Advisor Group",
-        palette={"Automated": "black", "Traditional": "white"},
-        linewidth=1.2, fliersize=3, width=0.6,
-        boxprops=dict(edgecolor="black"), medianprops=dict(color="black"),
-    )
-    plt.ylabel(label, fontsize=12)
-    plt.xlabel("")
-    plt.title(f"{label} by Advisor Group", fontsize=13)
-    plt.tight_layout()
-    filename = os.path.join(PLOT_DIR, f"{var}_boxplot.png")
-    plt.savefig(filename, dpi=300)
-    plt.close()
+    specs.append({
+        "path": os.path.join(PLOT_DIR, f"{var}_barplot.png"),
+        "kind": "barplot",
+        "data": df.sort_values(by=var)[["Fund Name", var, "Advisor Group"]],
+        "plot": {"x": "Fund Name", "y": var, "hue": "Advisor Group", "dodge": False,
+                 "palette": BLACK_WHITE, "edgecolor": "black", "linewidth": 1.2},
+        "title": f"{label} by Fund",
+        "ylabel": label,
+        "figsize": (11, 6),
+        "xticks": {"rotation": 90, "fontsize": 8},
+        "legend": {"title": "Advisor Group", "loc": "upper right"},
+    })
+    specs.append({
+        "path": os.path.join(PLOT_DIR, f"{var}_boxplot.png"),
+        "kind": "boxplot",
+        "data": df[["Advisor Group", var]],
+        "plot": {"x": "Advisor Group", "y": var, "hue": "Advisor Group", "palette": BLACK_WHITE,
+                 "linewidth": 1.2, "fliersize": 3, "width": 0.6,
+                 "boxprops": dict(edgecolor="black"), "medianprops": dict(color="black")},
+        "title": f"{label} by Advisor Group",
+        "title_size": 13,
+        "ylabel": label,
+        "figsize": (7, 5),
+    })
+render_figures(specs, workers=args.workers, force=args.force_plots)
 
 # --- Export Excel ---
 summary_df = pd.DataFrame(ttest_results)
 with pd.ExcelWriter(EXPORT_FILE, engine="xlsxwriter") as writer:
-    df.to_excel(writer, index=False, sheet_name="Raw Data")
     summary_df.to_excel(writer, index=False, sheet_name="Welch T-Test")
+    if resampling_df is not None:
+        resampling_df.to_excel(writer, index=False, sheet_name="Resampling")
 
 print(f"\n📊 Export completed: {EXPORT_FILE}")
+if args.raw_data != "none":
+    export_dataframe(df, EXPORT_FILE.replace(".xlsx", f"_raw_data.{args.raw_data}"), sheet_name="Raw Data")
 print(f"🖼️ Graphs saved in: {PLOT_DIR}")
\ No newline at end of file
@@ -0,0 +1,173 @@
+"""
+Fund metadata with per-field freshness, fetched concurrently.
+
+Values are cached per (ticker, field) in `portfolio_data.db` with the time
+they were fetched. A ticker is only re-fetched when one of the fields the
+caller needs is older than that field's TTL. Failed fetches are recorded in
+a negative cache and not retried until a backoff window has passed.
+
+Providers are pluggable: anything with `info(ticker)` returning a dict of
+raw fields (the shape of `yf.Ticker(t).info`).
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+DAY = 24 * 3600
+
+# Output column -> (key in the provider's info dict, freshness window in seconds)
+FIELDS = {
+    "Name": ("longName", 90 * DAY),
+    "Currency": ("currency", 90 * DAY),
+    "Asset Class": ("quoteType", 90 * DAY),
+    "Expense Ratio": ("annualReportExpenseRatio", 30 * DAY),
+    "Net Assets": ("totalAssets", 1 * DAY),
+    "Inception Date": ("fundInceptionDate", 90 * DAY),
+    "Morningstar Rating": ("morningStarOverallRating", 30 * DAY),
+}
+NEGATIVE_TTL = 6 * 3600     # first retry delay after a failed fetch
+NEGATIVE_TTL_MAX = 7 * DAY  # cap for repeated failures
+WORKERS = 8
+
+
+class YahooInfoProvider:
+    def info(self, ticker):
+        import yfinance as yf
+
+        return yf.Ticker(ticker).info
+
+
+class StaticInfoProvider:
+    """
+    Local stand-in provider: serves info dicts from memory or a JSON file
+    ({ticker: info}); unknown tickers fail like a bad symbol would.
+    """
+    def __init__(self, infos):
+        if isinstance(infos, str):
+            with open(infos, encoding="utf-8") as f:
+                infos = json.load(f)
+        self.infos = infos
+        self.calls = []
+
+    def info(self, ticker):
+        self.calls.append(ticker)
+        if ticker not in self.infos:
+            raise KeyError(f"unknown ticker {ticker}")
+        return self.infos[ticker]
+
+
+class MetadataCache:
+    def __init__(self, conn, fields=FIELDS, clock=time.time):
+        self.conn = conn
+        self.fields = fields
+        self.clock = clock
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS fund_metadata_cache (
+                ticker TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value TEXT,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (ticker, field)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS fund_metadata_failures (
+                ticker TEXT PRIMARY KEY,
+                error TEXT,
+                attempts INTEGER NOT NULL,
+                retry_after REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def _fetched_at(self, tickers):
+        fetched = {}
+        for i in range(0, len(tickers), 500):
+            chunk = tickers[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT ticker, field, fetched_at FROM fund_metadata_cache "
+                f"WHERE ticker IN ({', '.join('?' for _ in chunk)})", chunk)
+            for ticker, field, at in rows:
+                fetched[(ticker, field)] = at
+        return fetched
+
+    def stale(self, tickers, fields=None, now=None):
+        """Tickers with any of `fields` missing or past its TTL, excluding those in failure backoff."""
+        now = self.clock() if now is None else now
+        fields = fields or list(self.fields)
+        tickers = list(tickers)
+        fetched = self._fetched_at(tickers)
+        suppressed = {t for t, in self.conn.execute(
+            "SELECT ticker FROM fund_metadata_failures WHERE retry_after > ?", (now,))}
+        return [t for t in tickers if t not in suppressed and any(
+            now - fetched.get((t, f), float("-inf")) >= self.fields[f][1] for f in fields)]
+
+    def put(self, ticker, info, now=None):
+        now = self.clock() if now is None else now
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO fund_metadata_cache (ticker, field, value, fetched_at) VALUES (?, ?, ?, ?)",
+                [(ticker, field, json.dumps(info.get(key)), now) for field, (key, _) in self.fields.items()])
+            self.conn.execute("DELETE FROM fund_metadata_failures WHERE ticker = ?", (ticker,))
+
+    def fail(self, ticker, error, now=None):
+        """Record a failed fetch; the retry window doubles with each consecutive failure."""
+        now = self.clock() if now is None else now
+        row = self.conn.execute("SELECT attempts FROM fund_metadata_failures WHERE ticker = ?", (ticker,)).fetchone()
+        attempts = (row[0] if row else 0) + 1
+        delay = min(NEGATIVE_TTL * 2 ** (attempts - 1), NEGATIVE_TTL_MAX)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO fund_metadata_failures (ticker, error, attempts, retry_after) VALUES (?, ?, ?, ?)",
+                (ticker, str(error), attempts, now + delay))
+
+    def get(self, ticker):
+        """Cached fields of `ticker` (None where unknown)."""
+        record = {field: None for field in self.fields}
+        for field, value in self.conn.execute(
+                "SELECT field, value FROM fund_metadata_cache WHERE ticker = ?", (ticker,)):
+            if field in record:
+                record[field] = json.loads(value)
+        return record
+
+
+def _fetch(provider, ticker, fields):
+    info = provider.info(ticker)
+    # yfinance answers unknown symbols with an (almost) empty dict
+    if not info or not any(info.get(key) is not None for key, _ in fields.values()):
+        raise ValueError("no metadata returned")
+    return info
+
+
+def refresh(tickers, provider, cache, fields=None, workers=WORKERS, force=False):
+    """
+    Re-fetch tickers whose needed fields are stale, `workers` at a time.
+
+    Args:
+        fields (list[str] | None): Fields that must be fresh (default: all).
+        force (bool): Re-fetch every ticker, ignoring TTLs and failure backoff.
+
+    Returns:
+        dict: Counts of fetched and failed tickers, and of skipped ones
+        (fresh, or backing off after a failure).
+    """
+    tickers = list(dict.fromkeys(tickers))
+    todo = tickers if force else cache.stale(tickers, fields)
+    counts = {"fetched": 0, "failed": 0, "skipped": len(tickers) - len(todo)}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_fetch, provider, t, cache.fields): t for t in todo}
+        # Workers only fetch; this thread does every database write
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                cache.put(ticker, future.result())
+                counts["fetched"] += 1
+            except Exception as e:
+                print(f"❌ Error for {ticker}: {e}")
+                cache.fail(ticker, e)
+                counts["failed"] += 1
+    print(f"🔄 Metadata: {counts['fetched']} fetched, {counts['failed']} failed, "
+          f"{counts['skipped']} skipped in {time.perf_counter() - start:.1f}s")
+    return counts
+
@@ -0,0 +1,238 @@
+"""
+Incremental price ingestion into a local SQLite cache.
+
+Each ticker is fetched only from a short overlap window before its last
+cached observation. Closes are dividend- and split-adjusted, so the source
+rescales a ticker's whole history after every new distribution. When the
+re-fetched overlap no longer matches the cache, the ticker's history is
+dropped and fetched again from the start date; otherwise returns spanning
+the ex-date would silently lose the distribution.
+Tickers that share a start date are grouped into multi-ticker requests.
+Requests run in a bounded thread pool with jittered exponential backoff.
+The calling thread is the only writer to the cache.
+
+Data sources are pluggable: anything with `fetch(tickers, start, end)`
+returning a Date-indexed frame of adjusted closes, one column per ticker.
+"""
+import os
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+CACHE_PATH = "data/performance_traditional/prices.db"
+BATCH_SIZE = 50      # tickers per request
+WORKERS = 4          # concurrent requests
+MAX_RETRIES = 5
+BASE_DELAY = 1.0     # seconds, first backoff ceiling
+MAX_DELAY = 30.0
+OVERLAP_DAYS = 10    # calendar days re-fetched before the last cached date
+RESCALE_RTOL = 1e-4  # relative difference on the overlap that means the history was re-adjusted
+
+
+class YahooSource:
+    """Adjusted daily closes from Yahoo Finance, many tickers per request."""
+    def fetch(self, tickers, start, end):
+        import yfinance as yf
+
+        data = yf.download(tickers, start=start, end=end, auto_adjust=True, progress=False,
+                           group_by="column", threads=False)
+        if data is None or data.empty:
+            return pd.DataFrame()
+        close = data["Close"]
+        if isinstance(close, pd.Series):
+            close = close.to_frame(tickers[0])
+        return close
+
+
+class FixtureSource:
+    """
+    Serves prices from a local wide CSV (Date column + one column per ticker),
+    e.g. the `data/fixtures/prices.csv` fixture, so ingestion can run without network.
+    """
+    def __init__(self, path):
+        self.prices = pd.read_csv(path, index_col="Date", parse_dates=True)
+        self.requests = 0
+
+    def fetch(self, tickers, start, end):
+        self.requests += 1
+        columns = [t for t in tickers if t in self.prices.columns]
+        # Same convention as yf.download: `end` is exclusive
+        window = self.prices.loc[(self.prices.index >= start) & (self.prices.index < end), columns]
+        return window.dropna(how="all")
+
+
+class PriceCache:
+    """Daily closes keyed by (ticker, date)."""
+    def __init__(self, path=CACHE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS prices (
+                ticker TEXT NOT NULL,
+                date TEXT NOT NULL,
+                close REAL NOT NULL,
+                PRIMARY KEY (ticker, date)
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+
+    def last_dates(self, tickers):
+        """Ticker -> last cached date (as Timestamp), for tickers with any data."""
+        rows = self.conn.execute("SELECT ticker, MAX(date) FROM prices GROUP BY ticker").fetchall()
+        wanted = set(tickers)
+        return {t: pd.Timestamp(d) for t, d in rows if t in wanted}
+
+    def add(self, frame):
+        """Upsert a wide Date x ticker frame. Returns the number of observations written."""
+        if frame.empty:
+            return 0
+        long = frame.stack().dropna()
+        rows = [(ticker, date.strftime("%Y-%m-%d"), float(close)) for (date, ticker), close in long.items()]
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO prices (ticker, date, close) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def mismatched(self, frame, rtol=RESCALE_RTOL):
+        """Tickers of `frame` whose closes differ from the cached ones on any common date."""
+        if frame.empty:
+            return []
+        cached = self.to_frame(list(frame.columns), start=frame.index.min(), end=frame.index.max())
+        common = cached.index.intersection(frame.index)
+        stale = []
+        for ticker in cached.columns:
+            old, new = cached.loc[common, ticker], frame.loc[common, ticker]
+            both = old.notna() & new.notna()
+            if not np.allclose(new[both], old[both], rtol=rtol, atol=0):
+                stale.append(ticker)
+        return stale
+
+    def drop(self, tickers):
+        """Delete every cached close of `tickers`."""
+        with self.conn:
+            self.conn.executemany("DELETE FROM prices WHERE ticker = ?", [(t,) for t in tickers])
+
+    def to_frame(self, tickers=None, start=None, end=None):
+        """Wide Date x ticker frame of cached closes (`end` inclusive)."""
+        query, params = "SELECT date, ticker, close FROM prices WHERE 1", []
+        if tickers is not None:
+            query += f" AND ticker IN ({', '.join('?' for _ in tickers)})"
+            params += list(tickers)
+        if start is not None:
+            query += " AND date >= ?"
+            params.append(str(pd.Timestamp(start).date()))
+        if end is not None:
+            query += " AND date <= ?"
+            params.append(str(pd.Timestamp(end).date()))
+        long = pd.read_sql_query(query, self.conn, params=params, parse_dates=["date"])
+        wide = long.pivot(index="date", columns="ticker", values="close")
+        if tickers is not None:
+            wide = wide.reindex(columns=[t for t in tickers if t in wide.columns])
+        wide.index.name = "Date"
+        wide.columns.name = None
+        return wide
+
+    def close(self):
+        self.conn.close()
+
+
+def fetch_with_retry(source, tickers, start, end, retries=MAX_RETRIES, sleep=time.sleep):
+    """`source.fetch` with full-jitter exponential backoff on any error."""
+    for attempt in range(retries + 1):
+        try:
+            return source.fetch(tickers, start, end)
+        except Exception:
+            if attempt == retries:
+                raise
+            sleep(random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt)))
+
+
+def plan_requests(tickers, last_dates, start, end, batch_size=BATCH_SIZE, overlap_days=OVERLAP_DAYS):
+    """
+    Group tickers needing data into (tickers, start) requests.
+
+    A ticker's window starts `overlap_days` before its last cached date (or
+    at `start`), so the overlap can be checked against the cache; tickers
+    already covered up to `end` are left out.
+    """
+    end = pd.Timestamp(end)
+    by_start = {}
+    for ticker in tickers:
+        last = last_dates.get(ticker)
+        if last is not None and last + pd.Timedelta(days=1) >= end:
+            continue
+        first = pd.Timestamp(start) if last is None else max(pd.Timestamp(start), last - pd.Timedelta(days=overlap_days))
+        by_start.setdefault(first, []).append(ticker)
+    return [(group[i:i + batch_size], first)
+            for first, group in sorted(by_start.items())
+            for i in range(0, len(group), batch_size)]
+
+
+def _fetch_all(source, requests, end, workers):
+    """Yield (batch, first, frame or exception) for every request, as they complete."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch_with_retry, source, batch, first, end): (batch, first)
+                   for batch, first in requests}
+        for future in as_completed(futures):
+            batch, first = futures[future]
+            try:
+                yield batch, first, future.result()
+            except Exception as e:
+                yield batch, first, e
+
+
+def update_prices(tickers, source, cache, start, end, batch_size=BATCH_SIZE, workers=WORKERS):
+    """
+    Bring the cache up to date for `tickers` over [start, end).
+
+    Tickers whose overlap window no longer matches the cache (the source
+    re-adjusted their history) are re-fetched in full.
+
+    Returns:
+        dict: Counts of requests, observations written, failed requests and
+        rebuilt tickers, and elapsed seconds.
+    """
+    started = time.perf_counter()
+    last_dates = cache.last_dates(tickers)
+    requests = plan_requests(tickers, last_dates, start, end, batch_size)
+    counts = {"requests": len(requests), "observations": 0, "failed": 0, "rebuilt": 0}
+    returned = set()
+    rebuild = []
+    for batch, first, frame in _fetch_all(source, requests, end, workers):
+        if isinstance(frame, Exception):
+            counts["failed"] += 1
+            print(f"❌ {len(batch)} tickers from {first.date()}: {frame}")
+            continue
+        stale = cache.mismatched(frame)
+        rebuild += stale
+        frame = frame.drop(columns=stale)
+        returned.update(frame.columns[frame.notna().any()])
+        counts["observations"] += cache.add(frame)
+
+    if rebuild:
+        print(f"🔁 Re-fetching the full history of {len(rebuild)} re-adjusted tickers: {', '.join(sorted(rebuild))}")
+        cache.drop(rebuild)
+        full = plan_requests(rebuild, {}, start, end, batch_size)
+        counts["requests"] += len(full)
+        for batch, first, frame in _fetch_all(source, full, end, workers):
+            if isinstance(frame, Exception):
+                counts["failed"] += 1
+                print(f"❌ {len(batch)} tickers from {first.date()}: {frame}")
+                continue
+            returned.update(frame.columns[frame.notna().any()])
+            counts["observations"] += cache.add(frame)
+        counts["rebuilt"] = len(rebuild)
+
+    requested = {t for batch, _ in requests for t in batch}
+    for ticker in sorted(requested - returned - set(last_dates)):
+        print(f"⚠️ No data for {ticker}")
+    counts["seconds"] = time.perf_counter() - started
+    print(f"📥 {len(requested)} of {len(tickers)} tickers needed updates: {counts['requests']} requests, "
+          f"{counts['observations']:,} prices written, {counts['rebuilt']} rebuilt, "
+          f"{counts['failed']} failed in {counts['seconds']:.1f}s")
+    return counts
@@ -0,0 +1,131 @@
+"""
+Vectorized as-of returns for a whole price matrix.
+
+For every end date and horizon, the start and end prices of all tickers are
+resolved in one pass. The price used at a date is the last valid
+observation on or before it (a forward-fill), found with `searchsorted` on
+the date index. Cumulative and annualized returns are then array
+operations.
+
+Whenever a return cannot be computed, its `status` says why, so callers can
+report missing history instead of seeing a silent NaN.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+COLUMN_CHUNK = 1_000  # tickers forward-filled at a time (bounds the T x chunk index matrix)
+
+# Status of each (ticker, end date, horizon) result
+OK = "ok"
+NO_END_PRICE = "no price on or before end date"
+NO_START_PRICE = "no price on or before start date"
+
+
+def parse_horizon(label):
+    """
+    Horizon label -> (DateOffset, length in years), e.g. "10y" or "18m".
+
+    Raises:
+        ValueError: For labels that are not <number>y or <number>m.
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*([ym])\s*", label.lower())
+    if not match:
+        raise ValueError(f"Invalid horizon '{label}' (expected e.g. '1y', '10y' or '6m')")
+    n, unit = int(match.group(1)), match.group(2)
+    if unit == "y":
+        return pd.DateOffset(years=n), float(n)
+    return pd.DateOffset(months=n), n / 12
+
+
+def asof_rows(values, dates, at):
+    """
+    Row of the last valid value on or before each date in `at`, per column.
+
+    Args:
+        values (np.ndarray): T x N prices (NaN = missing).
+        dates (np.ndarray): Sorted datetime64 index of length T.
+        at (np.ndarray): K query dates.
+
+    Returns:
+        np.ndarray: K x N row numbers, -1 where there is no such value.
+    """
+    rows = np.searchsorted(dates, at, "right") - 1
+    out = np.full((len(at), values.shape[1]), -1, dtype=np.int64)
+    before_start = rows < 0
+    steps = np.arange(values.shape[0])[:, None]
+    for lo in range(0, values.shape[1], COLUMN_CHUNK):
+        block = values[:, lo:lo + COLUMN_CHUNK]
+        last_valid = np.maximum.accumulate(np.where(np.isnan(block), -1, steps), axis=0)
+        out[:, lo:lo + COLUMN_CHUNK] = last_valid[np.clip(rows, 0, None)]
+    out[before_start] = -1
+    return out
+
+
+def compute_returns(prices, horizons, end_dates):
+    """
+    Cumulative and annualized returns of every ticker for every (end date, horizon).
+
+    A horizon starts at end date minus the horizon ("3y" before 2024-12-31 is
+    2021-12-31). Both prices are as-of prices.
+
+    Args:
+        prices (pd.DataFrame): Date x ticker prices.
+        horizons (list[str]): Labels such as "1y", "3y", "10y", "6m".
+        end_dates (list): End dates.
+
+    Returns:
+        pd.DataFrame: One row per (ticker, end date, horizon) with the dates
+        of the prices used, cumulative_return, annualized_return and status.
+    """
+    dates = prices.index.values.astype("datetime64[ns]")
+    values = prices.to_numpy(dtype=float)
+    tickers = np.asarray(prices.columns)
+    col = np.arange(values.shape[1])
+
+    ends = pd.DatetimeIndex(pd.to_datetime(end_dates))
+    parsed = [parse_horizon(h) for h in horizons]
+    starts = pd.DatetimeIndex([end - offset for end in ends for offset, _ in parsed])
+    end_rows = asof_rows(values, dates, ends.values)                                   # E x N
+    start_rows = asof_rows(values, dates, starts.values).reshape(len(ends), len(parsed), -1)  # E x H x N
+
+    frames = []
+    for e, end in enumerate(ends):
+        end_price = np.where(end_rows[e] >= 0, values[np.clip(end_rows[e], 0, None), col], np.nan)
+        end_on = np.where(end_rows[e] >= 0, dates[np.clip(end_rows[e], 0, None)], np.datetime64("NaT"))
+        for h, (label, (_, years)) in enumerate(zip(horizons, parsed)):
+            rows = start_rows[e, h]
+            start_price = np.where(rows >= 0, values[np.clip(rows, 0, None), col], np.nan)
+            cumulative = end_price / start_price - 1
+            with np.errstate(invalid="ignore"):
+                annualized = (end_price / start_price) ** (1 / years) - 1
+            status = np.where(end_rows[e] < 0, NO_END_PRICE, np.where(rows < 0, NO_START_PRICE, OK))
+            frames.append(pd.DataFrame({
+                "Ticker": tickers,
+                "End Date": end,
+                "Horizon": label,
+                "Start Date": starts[e * len(parsed) + h],
+                "Start Price Date": np.where(rows >= 0, dates[np.clip(rows, 0, None)], np.datetime64("NaT")),
+                "End Price Date": end_on,
+                "cumulative_return": cumulative,
+                "annualized_return": annualized,
+                "status": status,
+            }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def missing_history(results):
+    """Rows of `compute_returns` output that could not be computed."""
+    return results[results["status"] != OK]
+
+
+def wide_annualized(results, end_date, decimals=2):
+    """Ticker x "<horizon>_return" table in percent for one end date (the CSV layout)."""
+    subset = results[results["End Date"] == pd.Timestamp(end_date)]
+    wide = subset.pivot(index="Ticker", columns="Horizon", values="annualized_return")
+    order = list(dict.fromkeys(subset["Horizon"]))
+    wide = (wide[order] * 100).round(decimals)
+    wide.columns = [f"{h}_return" for h in order]
+    tickers = list(dict.fromkeys(subset["Ticker"]))
+    return wide.reindex(tickers).reset_index()
@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+
+# US 10Y yields (risk-free rate per year)
+rf_table = {
+    2018: 0.0291,
+    2019: 0.0214,
+    2020: 0.0089,
+    2021: 0.0145,
+    2022: 0.0339,
+    2023: 0.0388,
+    2024: 0.0410
+}
+
+
+def monthly_rf(dates, table=rf_table):
+    """Annual risk-free rate in force at each date (NaN for years not in the table)."""
+    years = pd.DatetimeIndex(dates).year
+    return np.array([table.get(y, np.nan) for y in years], dtype=float)
@@ -0,0 +1,122 @@
+"""
+Rolling performance panel: annualized return, volatility and Sharpe ratio of
+every ticker at every month-end, for several trailing window lengths.
+
+Window sums come from cumulative sums over the whole returns matrix, so
+each window costs O(1) and the panel costs O(T x N) per window length.
+The sums are taken of log(1 + r), r and r^2. Risk-free rates from
+`rf_table` are aligned per month and averaged over the same window.
+
+Definitions match compute_sharpe_rtios.py: volatility is the monthly
+standard deviation (ddof=1) times sqrt(12), and Sharpe is (annualized
+return - average risk-free rate) / volatility. Here the annualized return
+is compounded from the monthly returns in the window.
+
+Usage:
+    python rolling_panel.py --windows 12 36 84 --out data/performance_traditional/traditional_rolling_panel.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from risk_free import monthly_rf, rf_table
+from timeseries_store import MONTHLY_RETURNS, TimeSeriesStore
+
+WINDOWS = [12, 36, 84]  # months (1y, 3y, 7y)
+MIN_OBS = 10            # valid monthly returns required in a window (as in compute_sharpe_rtios.py)
+METRICS = ["annualized_return", "volatility", "sharpe"]
+EXPORT_FILE = "data/performance_traditional/traditional_rolling_panel.csv"
+
+
+def _window_sums(x, window):
+    """Trailing `window`-row sums of each column; rows with a short history are NaN."""
+    cum = np.zeros((x.shape[0] + 1,) + x.shape[1:])
+    np.cumsum(x, axis=0, out=cum[1:])
+    sums = np.full(x.shape, np.nan)
+    sums[window - 1:] = cum[window:] - cum[:-window]
+    return sums
+
+
+def window_label(months):
+    return f"{months // 12}y" if months % 12 == 0 else f"{months}m"
+
+
+def rolling_metrics(returns, windows=WINDOWS, rf=rf_table, min_obs=MIN_OBS):
+    """
+    Rolling metrics for every date and window.
+
+    Args:
+        returns (pd.DataFrame): Month-end x ticker simple returns.
+        windows (list[int]): Window lengths in months.
+        rf (dict): Year -> annual risk-free rate.
+        min_obs (int): Minimum valid returns in a window.
+
+    Returns:
+        dict: window label -> {metric: Date x ticker DataFrame}.
+    """
+    returns = returns.sort_index()
+    r = returns.to_numpy(dtype=float)
+    valid = ~np.isnan(r)
+    r0 = np.where(valid, r, 0.0)
+    log_r = np.where(valid, np.log1p(r0), 0.0)
+    rf_month = monthly_rf(returns.index, rf)
+    rf_valid = ~np.isnan(rf_month)
+
+    panel = {}
+    for window in windows:
+        n = _window_sums(valid.astype(float), window)
+        s, ss = _window_sums(r0, window), _window_sums(r0 ** 2, window)
+        log_sum = _window_sums(log_r, window)
+        rf_n = _window_sums(rf_valid.astype(float), window)
+        rf_mean = _window_sums(np.where(rf_valid, rf_month, 0.0), window) / window
+        rf_mean[rf_n < window] = np.nan  # every month of the window needs a rate
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            enough = n >= max(min_obs, 2)
+            ann_return = np.where(enough, np.expm1(log_sum * 12 / n), np.nan)
+            variance = np.maximum((ss - s ** 2 / n) / (n - 1), 0.0)
+            vol = np.where(enough, np.sqrt(variance * 12), np.nan)
+            sharpe = np.where(vol > 0, (ann_return - rf_mean[:, None]) / vol, np.nan)
+
+        panel[window_label(window)] = {
+            name: pd.DataFrame(values, index=returns.index, columns=returns.columns)
+            for name, values in zip(METRICS, [ann_return, vol, sharpe])
+        }
+    return panel
+
+
+def tidy_panel(panel):
+    """Long (Date, Ticker, Window, Metric, Value) table without missing values."""
+    frames = []
+    for window, metrics in panel.items():
+        for metric, frame in metrics.items():
+            values = frame.to_numpy()
+            keep = ~np.isnan(values)
+            rows, cols = np.nonzero(keep)
+            frames.append(pd.DataFrame({
+                "Date": frame.index.values[rows],
+                "Ticker": frame.columns.values[cols],
+                "Window": window,
+                "Metric": metric,
+                "Value": values[keep],
+            }))
+    if not frames:
+        return pd.DataFrame(columns=["Date", "Ticker", "Window", "Metric", "Value"])
+    return pd.concat(frames, ignore_index=True).sort_values(["Date", "Ticker", "Window", "Metric"], ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling return/volatility/Sharpe panel for every month-end.")
+    parser.add_argument("--windows", type=int, nargs="+", default=WINDOWS, help="Window lengths in months")
+    parser.add_argument("--min-obs", type=int, default=MIN_OBS)
+    parser.add_argument("--out", default=EXPORT_FILE, help="Output file (.csv or .parquet)")
+    args = parser.parse_args()
+
+    monthly_df = TimeSeriesStore(MONTHLY_RETURNS).read()
+    tidy = tidy_panel(rolling_metrics(monthly_df, args.windows, min_obs=args.min_obs))
+    if args.out.endswith(".parquet"):
+        tidy.to_parquet(args.out, index=False)
+    else:
+        tidy.to_csv(args.out, index=False)
+    print(f"✅ Rolling panel ({len(tidy):,} rows, {tidy['Date'].nunique()} dates) saved to: {args.out}")
@@ -0,0 +1,220 @@
+"""
+Columnar, memory-mapped store for daily/monthly time series (one column per ticker).
+
+Layout of a store directory:
+    dates.npy       sorted datetime64[D] index shared by every column
+    tickers.json    ticker list; a ticker's position is its column number
+    columns/N.f64   raw float64 values of column N, aligned with dates.npy
+
+Opening a store only reads the date index and the ticker list, so open and
+read times do not grow with the number of tickers. Columns are mapped on
+demand; `column` and `slice` return views of the mapped file. A column may
+be shorter than the index: the missing tail is NaN. Appending dates
+therefore only touches the columns that receive values, and adding a
+ticker writes one new file.
+
+Annualized returns are stored too, one store per horizon under
+`annual_returns/` with one row per end date (`write_annual_returns` /
+`read_annual_returns`).
+
+Usage:
+    python timeseries_store.py import-csv data/fixtures/prices.csv prices
+    python timeseries_store.py export-csv prices prices.csv
+    python timeseries_store.py bench --tickers 13 1000 10000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+STORE_DIR = "data/performance_traditional/store"
+PRICES = os.path.join(STORE_DIR, "prices")
+MONTHLY_RETURNS = os.path.join(STORE_DIR, "monthly_returns")
+ANNUAL_RETURNS = os.path.join(STORE_DIR, "annual_returns")
+
+DTYPE = np.dtype("<f8")
+
+
+def _write_atomic(path, write):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+class TimeSeriesStore:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.join(path, "columns"), exist_ok=True)
+        dates_path = os.path.join(path, "dates.npy")
+        self._dates = np.load(dates_path) if os.path.exists(dates_path) else np.array([], dtype="datetime64[D]")
+        tickers_path = os.path.join(path, "tickers.json")
+        self._tickers = []
+        if os.path.exists(tickers_path):
+            with open(tickers_path, encoding="utf-8") as f:
+                self._tickers = json.load(f)
+        self._index = {t: i for i, t in enumerate(self._tickers)}
+
+    def __len__(self):
+        return len(self._dates)
+
+    @property
+    def dates(self):
+        return pd.DatetimeIndex(self._dates, name="Date")
+
+    @property
+    def tickers(self):
+        return list(self._tickers)
+
+    def _column_path(self, ticker):
+        return os.path.join(self.path, "columns", f"{self._index[ticker]}.f64")
+
+    def _rows(self, start=None, end=None):
+        """Row range [lo, hi) of dates within [start, end] (either may be None)."""
+        lo = 0 if start is None else int(np.searchsorted(self._dates, np.datetime64(pd.Timestamp(start), "D"), "left"))
+        hi = len(self._dates) if end is None else int(
+            np.searchsorted(self._dates, np.datetime64(pd.Timestamp(end), "D"), "right"))
+        return lo, max(lo, hi)
+
+    def column(self, ticker):
+        """All values of `ticker` aligned with `dates` (a read-only view when fully written)."""
+        n = len(self._dates)
+        path = self._column_path(ticker)
+        size = min(os.path.getsize(path) // DTYPE.itemsize, n) if os.path.exists(path) else 0
+        if size == n and n:
+            return np.memmap(path, DTYPE, "r", shape=(n,))
+        values = np.full(n, np.nan)
+        if size:
+            values[:size] = np.memmap(path, DTYPE, "r", shape=(size,))
+        return values
+
+    def slice(self, ticker, start=None, end=None):
+        """Values of `ticker` between two dates (inclusive), without copying."""
+        lo, hi = self._rows(start, end)
+        return self.column(ticker)[lo:hi]
+
+    def read(self, tickers=None, start=None, end=None):
+        """Date x ticker DataFrame for a ticker subset and date range (inclusive)."""
+        tickers = self._tickers if tickers is None else [t for t in tickers if t in self._index]
+        lo, hi = self._rows(start, end)
+        values = np.empty((hi - lo, len(tickers)))
+        for j, ticker in enumerate(tickers):
+            values[:, j] = self.column(ticker)[lo:hi]
+        return pd.DataFrame(values, index=self.dates[lo:hi], columns=tickers)
+
+    def write(self, frame):
+        """
+        Upsert a Date x ticker frame: existing dates are overwritten in place,
+        later dates are appended and unknown tickers get a new column.
+
+        Raises:
+            ValueError: If the frame has dates between existing ones that are not in the index.
+        """
+        if frame.empty:
+            return
+        frame = frame.sort_index()
+        dates = pd.DatetimeIndex(frame.index).values.astype("datetime64[D]")
+        last = self._dates[-1] if len(self._dates) else None
+        old = dates[:0] if last is None else dates[dates <= last]
+        positions = np.searchsorted(self._dates, old)
+        if len(old) and not np.array_equal(self._dates[positions], old):
+            raise ValueError(f"{self.path}: can only update existing dates or append after {last}")
+        all_dates = np.concatenate([self._dates, dates[len(old):]])
+
+        new_tickers = [str(t) for t in frame.columns if str(t) not in self._index]
+        if new_tickers:
+            self._index.update({t: len(self._tickers) + i for i, t in enumerate(new_tickers)})
+            self._tickers += new_tickers
+            _write_atomic(os.path.join(self.path, "tickers.json"),
+                          lambda f: f.write(json.dumps(self._tickers).encode()))
+
+        rows = np.searchsorted(all_dates, dates)
+        need = int(rows[-1]) + 1
+        for ticker in frame.columns:
+            path = self._column_path(str(ticker))
+            size = os.path.getsize(path) // DTYPE.itemsize if os.path.exists(path) else 0
+            if size < need:
+                with open(path, "ab") as f:
+                    f.write(np.full(need - size, np.nan, dtype=DTYPE).tobytes())
+            values = np.memmap(path, DTYPE, "r+", shape=(max(size, need),))
+            values[rows] = frame[ticker].to_numpy(dtype=float)
+            values.flush()
+            del values
+
+        # The index is written last: columns running ahead of it are ignored
+        if len(all_dates) != len(self._dates):
+            self._dates = all_dates
+            _write_atomic(os.path.join(self.path, "dates.npy"), lambda f: np.save(f, all_dates))
+
+
+def write_annual_returns(returns_df, end_date, path=ANNUAL_RETURNS):
+    """Store a Ticker + <h>_return table as the `end_date` row of each horizon's store."""
+    for column in [c for c in returns_df.columns if c.endswith("_return")]:
+        row = pd.DataFrame([returns_df[column].to_numpy(dtype=float)], index=pd.DatetimeIndex([end_date]),
+                           columns=returns_df["Ticker"].to_numpy())
+        TimeSeriesStore(os.path.join(path, column[:-len("_return")])).write(row)
+
+
+def read_annual_returns(end_date, horizons, path=ANNUAL_RETURNS):
+    """Ticker + <h>_return table as of `end_date`, in the order tickers were first stored."""
+    columns = {}
+    for horizon in horizons:
+        store = TimeSeriesStore(os.path.join(path, horizon))
+        row = store.read(start=end_date, end=end_date)
+        columns[f"{horizon}_return"] = row.iloc[0] if len(row) else pd.Series(np.nan, index=store.tickers)
+    df = pd.DataFrame(columns)
+    df.index.name = "Ticker"
+    return df.reset_index()
+
+
+def import_csv(csv_path, store_path):
+    """Load a wide CSV (Date column + one column per ticker) into a store."""
+    frame = pd.read_csv(csv_path, index_col="Date", parse_dates=True)
+    TimeSeriesStore(store_path).write(frame)
+    print(f"📦 Imported {frame.shape[1]} tickers x {frame.shape[0]} dates from {csv_path} into {store_path}")
+
+
+def run_benchmark(sizes, n_dates=2_000, n_read=13):
+    """Time opening a store and reading `n_read` tickers as the universe grows."""
+    print(f"{'tickers':>10} {'open (ms)':>10} {'read (ms)':>10}")
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2017-01-02", periods=n_dates)
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = TimeSeriesStore(tmp)
+            for i in range(0, n, 1_000):
+                cols = [f"T{j:05d}" for j in range(i, min(n, i + 1_000))]
+                store.write(pd.DataFrame(rng.normal(size=(n_dates, len(cols))), index=dates, columns=cols))
+            start = time.perf_counter()
+            store = TimeSeriesStore(tmp)
+            opened = time.perf_counter()
+            store.read(store.tickers[-n_read:], start="2020-01-01", end="2022-12-31")
+            done = time.perf_counter()
+        print(f"{n:>10,} {1000 * (opened - start):>10.2f} {1000 * (done - opened):>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the columnar time-series store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import-csv", help="Import a wide CSV into a store")
+    imp.add_argument("csv")
+    imp.add_argument("store", help="Store directory, or 'prices' / 'monthly_returns'")
+    exp = sub.add_parser("export-csv", help="Write a store back to a wide CSV")
+    exp.add_argument("store")
+    exp.add_argument("csv")
+    bench = sub.add_parser("bench", help="Benchmark open/read time against universe size")
+    bench.add_argument("--tickers", type=int, nargs="+", default=[13, 1_000, 10_000])
+    args = parser.parse_args()
+
+    named = {"prices": PRICES, "monthly_returns": MONTHLY_RETURNS}
+    if args.command == "import-csv":
+        import_csv(args.csv, named.get(args.store, args.store))
+    elif args.command == "export-csv":
+        TimeSeriesStore(named.get(args.store, args.store)).read().to_csv(args.csv)
+    else:
+        run_benchmark(args.tickers)
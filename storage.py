@@ -0,0 +1,157 @@
+"""
+Shared SQLite access for every script that uses `data/portfolio_data.db`.
+
+Connections are reused per thread and configured for concurrent use: WAL
+journaling lets analysis scripts read while extraction writes, and schema
+migrations add the indexes the analysis queries rely on.
+"""
+import atexit
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+# --- Configuration ---
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(ROOT_DIR, "data", "portfolio_data.db")
+
+PRAGMAS = [
+    ("journal_mode", "WAL"),       # readers never block the writer (and vice versa)
+    ("synchronous", "NORMAL"),     # safe with WAL, avoids an fsync per commit
+    ("cache_size", -64 * 1024),    # 64 MB page cache (negative = KiB)
+    ("mmap_size", 256 * 1024 * 1024),
+    ("busy_timeout", 30_000),      # ms to wait for a lock instead of failing
+]
+
+# Ordered, idempotent migrations: (name, table, statement). A statement is
+# applied once its table exists; `Ticker` is already indexed as the primary
+# key of performance_mutual_funds.
+MIGRATIONS = [
+    ("001_reprocessed_advisor_type", "portfolios_reprocessed",
+     "CREATE INDEX IF NOT EXISTS idx_reprocessed_advisor_type ON portfolios_reprocessed(advisor_type)"),
+    ("002_reprocessed_excluded", "portfolios_reprocessed",
+     "CREATE INDEX IF NOT EXISTS idx_reprocessed_excluded ON portfolios_reprocessed(excluded, advisor_type)"),
+    ("003_reprocessed_platform_name", "portfolios_reprocessed",
+     "CREATE INDEX IF NOT EXISTS idx_reprocessed_platform_name ON portfolios_reprocessed(platform_name)"),
+    ("004_portfolios_advisor_type", "portfolios",
+     "CREATE INDEX IF NOT EXISTS idx_portfolios_advisor_type ON portfolios(advisor_type)"),
+    ("005_portfolios_platform_name", "portfolios",
+     "CREATE INDEX IF NOT EXISTS idx_portfolios_platform_name ON portfolios(platform_name)"),
+    ("006_portfolios_portfolio_id", "portfolios",
+     "CREATE INDEX IF NOT EXISTS idx_portfolios_portfolio_id ON portfolios(portfolio_id)"),
+]
+
+_local = threading.local()
+_all_connections = []
+_lock = threading.Lock()
+
+
+def _configure(conn, readonly):
+    for name, value in PRAGMAS:
+        if readonly and name == "journal_mode":
+            continue
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+def migrate(conn):
+    """Apply pending migrations whose tables exist. Returns the names applied."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at REAL NOT NULL
+        )
+    """)
+    applied = {r[0] for r in conn.execute("SELECT name FROM schema_migrations")}
+    tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    done = []
+    for name, table, statement in MIGRATIONS:
+        if name in applied or table not in tables:
+            continue
+        conn.execute(statement)
+        conn.execute("INSERT INTO schema_migrations (name, applied_at) VALUES (?, ?)", (name, time.time()))
+        done.append(name)
+    conn.commit()
+    return done
+
+
+def connect(path=DB_PATH, readonly=False):
+    """
+    Return this thread's connection to `path`, opening and configuring it once.
+
+    Args:
+        path (str): Database file.
+        readonly (bool): Open read-only (never takes the write lock).
+    """
+    path = os.path.abspath(path)
+    key = (path, readonly)
+    cache = getattr(_local, "connections", None)
+    if cache is None:
+        cache = _local.connections = {}
+    conn = cache.get(key)
+    if conn is not None:
+        return conn
+
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path)
+    _configure(conn, readonly)
+    if not readonly:
+        migrate(conn)
+    cache[key] = conn
+    with _lock:
+        _all_connections.append(conn)
+    return conn
+
+
+def close(path=DB_PATH, readonly=False):
+    """Close this thread's connection to `path`, if open."""
+    conn = getattr(_local, "connections", {}).pop((os.path.abspath(path), readonly), None)
+    if conn is not None:
+        with _lock:
+            _all_connections.remove(conn)
+        conn.close()
+
+
+def close_all():
+    """Close every connection opened through `connect`."""
+    with _lock:
+        while _all_connections:
+            _all_connections.pop().close()
+    _local.connections = {}
+
+
+atexit.register(close_all)
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def select(table, columns=None, where=None, params=(), conn=None, chunksize=None):
+    """
+    Read only the needed columns of a table into pandas.
+
+    Args:
+        table (str): Table name.
+        columns (list[str] | None): Columns to read (None = all).
+        where (str | None): SQL condition, with `?` placeholders for `params`.
+        conn (sqlite3.Connection | None): Defaults to a read-only shared connection.
+        chunksize (int | None): Return an iterator of DataFrames of this size.
+    """
+    conn = conn or connect(readonly=True)
+    cols = ", ".join(_quote(c) for c in columns) if columns else "*"
+    query = f"SELECT {cols} FROM {_quote(table)}"
+    if where:
+        query += f" WHERE {where}"
+    return pd.read_sql_query(query, conn, params=params, chunksize=chunksize)
+
+
+def iter_rows(query, params=(), conn=None, batch_size=10_000):
+    """Yield result rows of `query` from a cursor, `batch_size` at a time."""
+    cursor = (conn or connect(readonly=True)).execute(query, params)
+    while batch := cursor.fetchmany(batch_size):
+        yield from batch
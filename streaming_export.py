@@ -0,0 +1,250 @@
+"""
+Constant-memory exports of SQLite tables and DataFrames to Excel and Parquet.
+
+Rows are streamed from a cursor in batches: Excel output goes through
+xlsxwriter's constant_memory mode (one row buffered at a time) and is split
+over several sheets at Excel's 1,048,576-row limit; Parquet output is written
+one row group per batch with column projection and compression.
+
+Usage:
+    python streaming_export.py portfolios data/portfolios_export.xlsx
+    python streaming_export.py portfolios data/portfolios.parquet --columns portfolio_id expense_ratio
+"""
+import argparse
+import itertools
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+import storage
+
+EXCEL_MAX_ROWS = 1_048_576  # per sheet, header row included
+SHEET_NAME_MAX = 31
+BATCH_SIZE = 50_000
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (NaN if unknown)."""
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def _sheet_name(base, part):
+    if part == 1:
+        return base[:SHEET_NAME_MAX]
+    suffix = f" ({part})"
+    return base[:SHEET_NAME_MAX - len(suffix)] + suffix
+
+
+def _cell(value):
+    """Value as xlsxwriter accepts it (NaN/NaT/inf become empty cells)."""
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def write_xlsx(output_file, sheets, max_rows=EXCEL_MAX_ROWS):
+    """
+    Stream rows into a workbook, never holding more than one row in memory.
+
+    Args:
+        output_file (str): Path of the .xlsx file.
+        sheets (iterable): (sheet name, column names, row iterable) triples.
+            A sheet with more than `max_rows - 1` rows continues on
+            "<name> (2)", "<name> (3)", ... with the header repeated.
+        max_rows (int): Rows per sheet, header included.
+
+    Returns:
+        int: Number of data rows written.
+    """
+    workbook = xlsxwriter.Workbook(output_file, {
+        "constant_memory": True,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+    })
+    bold = workbook.add_format({"bold": True})
+    total = 0
+    for name, columns, rows in sheets:
+        part, worksheet, r = 0, None, max_rows
+        for row in rows:
+            if r == max_rows:
+                part += 1
+                worksheet = workbook.add_worksheet(_sheet_name(name, part))
+                worksheet.write_row(0, 0, columns, bold)
+                r = 1
+            worksheet.write_row(r, 0, [_cell(v) for v in row])
+            r += 1
+            total += 1
+        if worksheet is None:
+            workbook.add_worksheet(_sheet_name(name, 1)).write_row(0, 0, columns, bold)
+    workbook.close()
+    return total
+
+
+# SQLite declared type -> Arrow type, following SQLite's affinity rules
+def _arrow_type(declared):
+    import pyarrow as pa
+
+    declared = (declared or "").upper()
+    if "INT" in declared:
+        return pa.int64()
+    if any(t in declared for t in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    return pa.string()
+
+
+def sqlite_schema(conn, table, columns=None):
+    """Arrow schema for `columns` of `table` from the declared column types."""
+    import pyarrow as pa
+
+    declared = {r[1]: r[2] for r in conn.execute(f"PRAGMA table_info({storage._quote(table)})")}
+    columns = columns or list(declared)
+    missing = [c for c in columns if c not in declared]
+    if missing:
+        raise ValueError(f"Unknown columns for {table}: {missing}")
+    return pa.schema([(c, _arrow_type(declared[c])) for c in columns])
+
+
+def _record_batch(schema, rows):
+    import pyarrow as pa
+
+    arrays = []
+    for field, values in zip(schema, zip(*rows)):
+        if pa.types.is_string(field.type):
+            values = [None if v is None else str(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_parquet(output_file, schema, batches, compression="zstd"):
+    """
+    Write an iterable of row-tuple batches as one Parquet row group each.
+
+    Returns:
+        int: Number of rows written.
+    """
+    import pyarrow.parquet as pq
+
+    total = 0
+    with pq.ParquetWriter(output_file, schema, compression=compression) as writer:
+        for rows in batches:
+            if rows:
+                writer.write_batch(_record_batch(schema, rows))
+                total += len(rows)
+    return total
+
+
+def _batched(rows, size):
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, size)):
+        yield batch
+
+
+def _format_for(output_file):
+    ext = os.path.splitext(output_file)[1].lower()
+    if ext == ".xlsx":
+        return "xlsx"
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    raise ValueError(f"Unsupported export format: {output_file} (use .xlsx or .parquet)")
+
+
+def _report(label, output_file, rows, start):
+    report = {"rows": rows, "seconds": time.perf_counter() - start, "peak_rss_mb": peak_rss_mb()}
+    print(f"📤 Exported {rows:,} rows of {label} to '{output_file}' in {report['seconds']:.2f}s "
+          f"(peak RSS {report['peak_rss_mb']:.0f} MB)")
+    return report
+
+
+def export_table(table, output_file, columns=None, where=None, params=(), conn=None,
+                 sheet_name=None, compression="zstd", batch_size=BATCH_SIZE):
+    """
+    Stream a table (or a projection of it) to .xlsx or .parquet.
+
+    Args:
+        table (str): Table to export.
+        output_file (str): Target path; the extension selects the format.
+        columns (list[str] | None): Columns to export (None = all).
+        where (str | None): SQL condition, with `?` placeholders for `params`.
+        conn (sqlite3.Connection | None): Defaults to a read-only shared connection.
+        sheet_name (str | None): Excel sheet name (defaults to the table name).
+        compression (str): Parquet codec ("zstd", "snappy", "gzip", "none").
+        batch_size (int): Rows fetched per cursor batch.
+
+    Returns:
+        dict: rows, seconds and peak_rss_mb of the export.
+    """
+    fmt = _format_for(output_file)
+    conn = conn or storage.connect(readonly=True)
+    start = time.perf_counter()
+    cursor = conn.execute("SELECT {} FROM {}{}".format(
+        ", ".join(storage._quote(c) for c in columns) if columns else "*",
+        storage._quote(table), f" WHERE {where}" if where else ""), params)
+    names = [d[0] for d in cursor.description]
+
+    def rows():
+        while batch := cursor.fetchmany(batch_size):
+            yield from batch
+
+    if fmt == "xlsx":
+        count = write_xlsx(output_file, [(sheet_name or table, names, rows())])
+    else:
+        count = write_parquet(output_file, sqlite_schema(conn, table, names),
+                              _batched(rows(), batch_size), compression=compression)
+    return _report(f"'{table}'", output_file, count, start)
+
+
+def export_dataframe(df, output_file, sheet_name="Raw Data", compression="zstd", batch_size=BATCH_SIZE):
+    """
+    Export an in-memory DataFrame with the same writers (no pandas Excel
+    formatting pass, sheets split at the row limit).
+
+    Returns:
+        dict: rows, seconds and peak_rss_mb of the export.
+    """
+    fmt = _format_for(output_file)
+    start = time.perf_counter()
+    columns = [str(c) for c in df.columns]
+    if fmt == "xlsx":
+        count = write_xlsx(output_file, [(sheet_name, columns, df.itertuples(index=False, name=None))])
+    else:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        count = 0
+        with pq.ParquetWriter(output_file, schema, compression=compression) as writer:
+            for i in range(0, len(df), batch_size):
+                chunk = df.iloc[i:i + batch_size]
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                count += len(chunk)
+    return _report(f"'{sheet_name}'", output_file, count, start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a SQLite table to Excel or Parquet.")
+    parser.add_argument("table")
+    parser.add_argument("output", help="Output file (.xlsx or .parquet)")
+    parser.add_argument("--columns", nargs="+", default=None, help="Columns to export (default: all)")
+    parser.add_argument("--where", default=None, help="SQL filter, e.g. \"excluded IS NULL\"")
+    parser.add_argument("--compression", default="zstd", help="Parquet compression codec")
+    parser.add_argument("--db", default=storage.DB_PATH)
+    args = parser.parse_args()
+
+    export_table(args.table, args.output, columns=args.columns, where=args.where,
+                 conn=storage.connect(args.db, readonly=True), compression=args.compression)
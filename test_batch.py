@@ -0,0 +1,68 @@
+import hashlib
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "costs_analysis"))
+pytest.importorskip("fitz")
+pytest.importorskip("openai")
+os.environ.setdefault("OPENAI_API_KEY", "stub")  # main.py builds a client at import time
+import batch
+import main
+
+
+@pytest.fixture
+def batch_files(tmp_path):
+    """Requests file, manifest and fake results for three documents, as `prepare` and `fake-results` write them."""
+    requests_path = tmp_path / "requests.jsonl"
+    manifest = {}
+    with open(requests_path, "w", encoding="utf-8") as f:
+        for i in range(3):
+            doc_hash = hashlib.sha256(f"adv_{i}".encode()).hexdigest()
+            doc_id = batch.doc_id_for(doc_hash)
+            manifest[doc_id] = {"filename": f"adv_{i}.pdf", "doc_hash": doc_hash}
+            f.write(json.dumps({"custom_id": doc_id, "method": "POST", "url": batch.ENDPOINT, "body": {}}) + "\n")
+    manifest_path = tmp_path / "requests.jsonl.manifest.json"
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+    results_path = tmp_path / "results.jsonl"
+    batch.write_fake_results(str(requests_path), str(results_path))
+    return str(results_path), str(manifest_path)
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "DB_PATH", str(tmp_path / "portfolio_data.db"))
+    conn, _ = main.init_db()
+    yield conn
+    conn.close()
+
+
+def test_ingest_is_idempotent(batch_files, conn):
+    results_path, manifest_path = batch_files
+
+    first = batch.ingest_batch_results(results_path, manifest_path, conn=conn)
+    rows = conn.execute("SELECT * FROM portfolios ORDER BY portfolio_id").fetchall()
+    second = batch.ingest_batch_results(results_path, manifest_path, conn=conn)
+
+    assert first == {"ingested": 3, "skipped": 0, "failed": 0}
+    assert second == {"ingested": 0, "skipped": 3, "failed": 0}
+    assert conn.execute("SELECT * FROM portfolios ORDER BY portfolio_id").fetchall() == rows
+    assert len(rows) == 3
+
+
+def test_failed_request_is_retried_by_the_next_ingest(batch_files, conn):
+    results_path, manifest_path = batch_files
+    with open(results_path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    failed = dict(lines[0], response={"status_code": 500, "body": {}})
+    with open(results_path, "w", encoding="utf-8") as f:
+        f.write("".join(json.dumps(line) + "\n" for line in [failed] + lines[1:]))
+
+    assert batch.ingest_batch_results(results_path, manifest_path, conn=conn)["failed"] == 1
+    batch.write_fake_results(os.path.join(os.path.dirname(results_path), "requests.jsonl"), results_path)
+
+    assert batch.ingest_batch_results(results_path, manifest_path, conn=conn) == {
+        "ingested": 1, "skipped": 2, "failed": 0}
+    assert conn.execute("SELECT COUNT(*) FROM portfolios").fetchone()[0] == 3
@@ -0,0 +1,73 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "performance_analysis"))
+from metadata_cache import DAY, NEGATIVE_TTL, NEGATIVE_TTL_MAX, MetadataCache, StaticInfoProvider, refresh
+
+INFOS = {
+    "AAA": {"longName": "Fund A", "currency": "USD", "totalAssets": 1e9, "annualReportExpenseRatio": 0.001},
+    "BBB": {"longName": "Fund B", "currency": "EUR", "totalAssets": 2e9, "annualReportExpenseRatio": 0.002},
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def cache(clock):
+    conn = sqlite3.connect(":memory:")
+    yield MetadataCache(conn, clock=clock)
+    conn.close()
+
+
+def test_fields_are_refetched_after_their_ttl(cache, clock):
+    provider = StaticInfoProvider(INFOS)
+    refresh(["AAA", "BBB"], provider, cache, workers=2)
+
+    clock.now += 2 * DAY
+    assert refresh(["AAA", "BBB"], provider, cache, fields=["Name", "Expense Ratio"])["skipped"] == 2
+    assert refresh(["AAA"], provider, cache, fields=["Net Assets"])["fetched"] == 1
+    assert sorted(provider.calls) == ["AAA", "AAA", "BBB"]
+    assert cache.get("BBB")["Currency"] == "EUR"
+
+
+def test_failed_ticker_backs_off_exponentially(cache, clock):
+    provider = StaticInfoProvider(INFOS)
+    assert refresh(["ZZZ"], provider, cache)["failed"] == 1
+
+    clock.now += NEGATIVE_TTL - 1
+    assert refresh(["ZZZ"], provider, cache)["skipped"] == 1
+    clock.now += 1
+    assert refresh(["ZZZ"], provider, cache)["failed"] == 1
+
+    # The second failure doubles the window
+    clock.now += NEGATIVE_TTL
+    assert cache.stale(["ZZZ"]) == []
+    clock.now += NEGATIVE_TTL
+    assert cache.stale(["ZZZ"]) == ["ZZZ"]
+    assert provider.calls == ["ZZZ", "ZZZ"]
+
+
+def test_backoff_is_capped_and_cleared_by_a_success(cache, clock):
+    for _ in range(10):
+        cache.fail("AAA", "timeout")
+    assert cache.stale(["AAA"], now=clock.now + NEGATIVE_TTL_MAX) == ["AAA"]
+
+    refresh(["AAA"], StaticInfoProvider(INFOS), cache, force=True)
+    assert cache.get("AAA")["Name"] == "Fund A"
+    # After a success the next failure starts again from the first window
+    cache.fail("AAA", "timeout")
+    assert cache.stale(["AAA"], fields=["Net Assets"], now=clock.now + DAY) == ["AAA"]
@@ -0,0 +1,69 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "performance_analysis"))
+from price_cache import FixtureSource, PriceCache, update_prices
+
+START, MIDDLE, END = "2024-01-01", "2024-07-01", "2025-01-01"
+
+
+def write_fixture(path, prices):
+    prices.to_csv(path)
+    return FixtureSource(path)
+
+
+@pytest.fixture
+def prices():
+    dates = pd.bdate_range(START, "2024-12-31", name="Date")
+    rng = np.random.default_rng(0)
+    walk = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size=(len(dates), 2)), axis=0))
+    return pd.DataFrame(walk, index=dates, columns=["AAA", "BBB"])
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PriceCache(str(tmp_path / "prices.db"))
+    yield cache
+    cache.close()
+
+
+def test_incremental_fetch_only_requests_new_dates(tmp_path, prices, cache):
+    source = write_fixture(tmp_path / "prices.csv", prices)
+    update_prices(["AAA", "BBB"], source, cache, START, MIDDLE)
+
+    counts = update_prices(["AAA", "BBB"], source, cache, START, END)
+
+    new = prices.loc[prices.index >= MIDDLE]
+    assert counts["rebuilt"] == 0
+    assert counts["requests"] == 1
+    assert counts["observations"] < prices.size
+    assert counts["observations"] >= new.size
+    pd.testing.assert_frame_equal(cache.to_frame(["AAA", "BBB"]), prices, check_freq=False)
+
+
+def test_up_to_date_tickers_are_not_requested(tmp_path, prices, cache):
+    source = write_fixture(tmp_path / "prices.csv", prices)
+    update_prices(["AAA", "BBB"], source, cache, START, END)
+
+    counts = update_prices(["AAA", "BBB"], source, cache, START, END)
+
+    assert counts["requests"] == 0
+
+
+def test_readjusted_overlap_refetches_full_history(tmp_path, prices, cache):
+    update_prices(["AAA", "BBB"], write_fixture(tmp_path / "old.csv", prices), cache, START, MIDDLE)
+    # A distribution after the first fetch rescales all of AAA's earlier closes
+    adjusted = prices.copy()
+    adjusted["AAA"] *= 0.98
+    source = write_fixture(tmp_path / "new.csv", adjusted)
+
+    counts = update_prices(["AAA", "BBB"], source, cache, START, END)
+
+    assert counts["rebuilt"] == 1
+    cached = cache.to_frame(["AAA", "BBB"])
+    pd.testing.assert_series_equal(cached["AAA"], adjusted["AAA"], check_freq=False, check_names=False)
+    pd.testing.assert_series_equal(cached["BBB"], prices["BBB"], check_freq=False, check_names=False)
@@ -0,0 +1,87 @@
+import functools
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "costs_analysis"))
+openai = pytest.importorskip("openai")
+import scheduler
+from stub_llm_server import STUB_RESPONSE, StubHandler
+
+
+class FakeExtractor:
+    """Stand-in for ADVExtractor that sends one request through the scheduler's `call`."""
+    def __init__(self, name):
+        self.name = name
+
+    def get_fee_structure(self, llm_client, call):
+        request = {"model": "stub", "messages": [{"role": "user", "content": self.name * 40}]}
+
+        def send():
+            response = llm_client.chat.completions.create(**request)
+            return response.choices[0].message.content
+
+        return f"{self.name}:{call(send, request)}"
+
+
+@pytest.fixture
+def stub_client(monkeypatch):
+    """Client pointed at a local stub that answers half of the requests with 429/5xx."""
+    monkeypatch.setattr(StubHandler, "latency", 0.0)
+    monkeypatch.setattr(StubHandler, "fail_rate", 0.5)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield openai.OpenAI(api_key="stub", base_url=f"http://127.0.0.1:{server.server_port}/v1")
+    server.shutdown()
+    server.server_close()
+
+
+def test_results_in_input_order_under_retries(stub_client, monkeypatch):
+    monkeypatch.setattr(scheduler, "call_with_retry",
+                        functools.partial(scheduler.call_with_retry, max_retries=30, base_delay=0.01))
+    extractors = [FakeExtractor(f"doc{i:02d}") for i in range(20)]
+
+    results = list(scheduler.extract_concurrently(extractors, stub_client, workers=8))
+
+    assert [e for e, _ in results] == extractors
+    assert [r for _, r in results] == [f"{e.name}:{STUB_RESPONSE}" for e in extractors]
+
+
+def test_failed_extraction_is_yielded_in_place():
+    class Echo(FakeExtractor):
+        def get_fee_structure(self, llm_client, call):
+            return self.name
+
+    class Broken(FakeExtractor):
+        def get_fee_structure(self, llm_client, call):
+            raise ValueError(self.name)
+
+    class Client:
+        def with_options(self, **kwargs):
+            return self
+
+    extractors = [Echo("a"), Broken("b"), Echo("c")]
+
+    results = list(scheduler.extract_concurrently(extractors, Client(), workers=3))
+
+    assert [r for _, r in results[::2]] == ["a", "c"]
+    assert isinstance(results[1][1], ValueError)
+
+
+def test_rate_limiter_waits_for_the_window():
+    now = [0.0]
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    limiter = scheduler.RateLimiter(rpm=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(3):
+        limiter.acquire()
+
+    assert waits == [60.0]